@@ -0,0 +1,143 @@
+# cli.py - Headless batch lookups (no Eel, Kivy or gTTS)
+#
+#   python cli.py words.txt --source "Aozora Corpus.csv" --format jsonl --top 3 > out.jsonl
+#
+# Reads one word (or query, see search.query) per line and writes its
+# match count and the context of its first N hits, as TSV (word, count,
+# then one column per example) or JSONL. The corpus is loaded once; the
+# word list is then split into batches answered by a pool of worker
+# processes, which inherit the loaded corpus when they are forked.
+
+import argparse
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+
+from config import DEFAULT_CONTEXT_SENTENCES, DEFAULT_SOURCE_FILE, LOAD_WORKERS
+from corpus.parallel import batched, ordered_pool_map
+from library import CorpusLibrary
+from search.query import QueryError
+
+LOOKUP_BATCH_WORDS = 50
+
+# The session answering lookups in this process: set up before the pool
+# forks, or loaded on first use by a spawned worker.
+_session = None
+
+
+def _load_corpus(library, source_path):
+    """Load `source_path` in full. Loading reports progress on stdout, which may be the output."""
+    with redirect_stdout(sys.stderr):
+        return library.load_corpus(source_path, background=False)
+
+
+def _session_for(source_path, context_size):
+    global _session
+    if _session is None:
+        library = CorpusLibrary()
+        corpus = _load_corpus(library, source_path)
+        if corpus is None:
+            raise SystemExit(f"Could not load {source_path}.")
+        _session = library.new_session(corpus)
+    _session.context_size = context_size
+    return _session
+
+
+def _lookup_batch(task):
+    """Look up a batch of words; one result dict per word."""
+    source_path, context_size, top, words = task
+    session = _session_for(source_path, context_size)
+    results = []
+    for word in words:
+        try:
+            count, examples = session.lookup(word, top)
+        except QueryError as e:
+            results.append({"word": word, "error": str(e)})
+            continue
+        results.append({"word": word, "count": count, "examples": examples})
+    return results
+
+
+def _tsv_field(text):
+    return text.replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def format_tsv(result, joiner):
+    if "error" in result:
+        return '\t'.join([_tsv_field(result["word"]), '', _tsv_field(f"error: {result['error']}")])
+    fields = [_tsv_field(result["word"]), str(result["count"])]
+    fields.extend(_tsv_field(joiner.join(e["context"])) for e in result["examples"])
+    return '\t'.join(fields)
+
+
+def format_jsonl(result, joiner):
+    return json.dumps(result, ensure_ascii=False)
+
+
+FORMATS = {'tsv': format_tsv, 'jsonl': format_jsonl}
+
+
+def read_words(f):
+    for line in f:
+        word = line.strip()
+        if word:
+            yield word
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up counts and example contexts for a word list.")
+    parser.add_argument('words', help="word list, one word or query per line ('-' for stdin)")
+    parser.add_argument(
+        '--source', default=os.path.basename(DEFAULT_SOURCE_FILE),
+        help="source file, by name (resources/ or the app folder) or path (default: %(default)s)",
+    )
+    parser.add_argument('--format', choices=sorted(FORMATS), default='tsv')
+    parser.add_argument('--top', type=int, default=3, help="example contexts per word (default: %(default)s)")
+    parser.add_argument(
+        '--context', type=int, default=DEFAULT_CONTEXT_SENTENCES,
+        help="sentences per context, as in the GUI (default: %(default)s)",
+    )
+    parser.add_argument('--workers', type=int, default=LOAD_WORKERS, help="worker processes (default: %(default)s)")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    library = CorpusLibrary()
+    source_path = args.source if os.path.exists(args.source) else library.resolve_source_path(args.source)
+    if not source_path:
+        parser.error(f"source not found: {args.source}")
+
+    # Load in this process first so forked workers share the corpus.
+    global _session
+    corpus = _load_corpus(library, source_path)
+    if corpus is None or not len(corpus.store):
+        raise SystemExit(f"Could not load {source_path}.")
+    _session = library.new_session(corpus)
+    # Sources shown one line per sentence (<br>) get a space between context sentences.
+    joiner = ' ' if corpus.joiner else ''
+    write_line = FORMATS[args.format]
+
+    words_in = sys.stdin if args.words == '-' else open(args.words, encoding='utf-8')
+    out = open(args.output, 'w', encoding='utf-8', newline='\n') if args.output else sys.stdout
+    tasks = (
+        (source_path, args.context, args.top, batch)
+        for batch in batched(read_words(words_in), LOOKUP_BATCH_WORDS)
+    )
+    looked_up = 0
+    try:
+        for results in ordered_pool_map(_lookup_batch, tasks, args.workers):
+            for result in results:
+                out.write(write_line(result, joiner) + '\n')
+            looked_up += len(results)
+            if looked_up % 1000 < len(results):
+                print(f"Looked up {looked_up} words...", file=sys.stderr)
+        print(f"Looked up {looked_up} words.", file=sys.stderr)
+    finally:
+        if words_in is not sys.stdin:
+            words_in.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
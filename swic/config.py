@@ -17,5 +17,89 @@ KV_FILE = 'context_finder.kv'
 # Default number of sentences to show before and after the matching sentence
 DEFAULT_CONTEXT_SENTENCES = 2
 
+# Search engine per source. Keys are matched as substrings of the lowercased
+# filename; values are 'scan' (no index), 'ngram' (character bigram/trigram
+# postings) or 'suffix_array' (whole-corpus suffix array: fastest queries,
+# but the build takes about a second per 200k characters and several times
+# the text size in memory while it runs). Opt in per source, e.g.
+# {'buncha': 'suffix_array'}.
+SEARCH_ENGINES = {}
+DEFAULT_SEARCH_ENGINE = 'ngram'
+
+# Keep a binary cache of each parsed source next to it (<source>.swcache) so
+# reloads skip parsing and sentence splitting while the source is unchanged.
+CORPUS_CACHE_ENABLED = True
+
+# Worker processes used to split documents into sentences when parsing a
+# source (1 = split in-process). Only sources with many documents use them.
+LOAD_WORKERS = os.cpu_count() or 1
+
+# Memory budget for loaded corpora (store + search index) kept resident, so
+# switching back to a recently used source needs no reload.
+CORPUS_LRU_MAX_BYTES = 2 * 1024 ** 3
+
+# Memory budget for cached query results (compressed match sets), reused when
+# the same word is searched again on the same loaded source.
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Federated ("All sources") search: hits returned per source. A search
+# returns at once; the frontend polls for sources that answer later.
+FEDERATED_RESULTS_PER_SOURCE = 5
+
+# Kuromoji (IPADIC) dictionary bundled for the frontend; the backend
+# tokenizer reads the same files.
+KUROMOJI_DICT_DIR = os.path.join(os.path.dirname(__file__), 'web', 'kuromoji', 'dict')
+
+# Tokenize each loaded source once and keep a lemma index (saved next to the
+# source as <source>.swlemma), so ~食べる also finds 食べた and 食べない.
+# The first build of a large source takes minutes; it runs in the background
+# once the source is searchable. Disable to skip it.
+LEMMA_INDEX_ENABLED = True
+
+# Also count every word (by dictionary form) per source, per author/title
+# (Aozora) or series (Buncha) and per neighbouring word, saved next to the
+# source as <source>.swstats. Needs the kuromoji dictionary, like the lemma
+# index, and is counted in the same tokenization pass.
+STATS_ENABLED = True
+
+# Collocates returned per side by a word statistics lookup.
+STATS_COLLOCATES = 20
+
+# Sentences whose furigana data is kept in memory (readings are computed on
+# the backend and sent with results when the Readings toggle is on).
+READING_CACHE_SENTENCES = 20000
+
+# Largest number of rendered results returned by one get_results_page call.
+RESULTS_PAGE_MAX = 200
+
+# Facet values (authors, titles, series) listed per search, most matches first.
+FACET_VALUES_MAX = 50
+
+# Concordance (KWIC) view: characters of context shown on each side of a
+# hit, and the most lines returned by one concordance call.
+KWIC_CONTEXT_CHARS = 25
+KWIC_PAGE_MAX = 500
+
+# Text-to-speech: 'gtts' (Google, needs network) or 'stub' (silent audio,
+# for offline use and tests), and the language passed to the engine.
+TTS_ENGINE = 'gtts'
+TTS_LANG = 'ja'
+
+# Synthesized audio is kept on disk, one file per (text, lang, engine), so
+# replaying an example needs no new synthesis. The oldest files are deleted
+# beyond the budget. With TTS_PREFETCH, reading a result aloud also
+# synthesizes the next and previous results' contexts in the background.
+TTS_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'tts_cache')
+TTS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+TTS_PREFETCH = True
+
+# Server mode (python server.py): where it listens, and how long an idle
+# client's search session (cursor and settings) is kept. Beyond
+# SERVER_MAX_SESSIONS the least recently used session is dropped.
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8080
+SERVER_SESSION_IDLE_SECONDS = 60 * 60
+SERVER_MAX_SESSIONS = 1000
+
 # Font size list (used in original app, kept for reference/future use)
 FONT_SIZE_LIST = [16, 18, 20, 24, 28] 
@@ -0,0 +1,20 @@
+"""
+Corpus storage and persistence.
+
+`SentenceStore` holds a loaded corpus in compact array-backed form and is
+filled through `SentenceStoreBuilder`. `load_cache` / `save_cache` keep a
+store in a binary file next to its source so reloading skips parsing and
+sentence splitting; `load_sidecar` / `save_sidecar` do the same for other
+data derived from a source. `load_store` ties parsing, splitting and caching
+together for a source file and has no UI dependencies, so worker
+processes can load corpora with it. `CorpusLRU` keeps several loaded
+corpora resident within a byte budget.
+"""
+
+from .store import SentenceStore, SentenceStoreBuilder
+from .cache import cache_path_for, load_cache, load_sidecar, save_cache, save_sidecar
+from .lru import CorpusLRU, LoadedCorpus
+from .loader import (
+    build_store, joiner_for, load_store, parse_source, sentence_metadata,
+    split_text_into_sentences,
+)
@@ -0,0 +1,272 @@
+"""
+Versioned binary cache of a parsed corpus, stored next to its source file.
+
+Layout (integers in native byte order, recorded in the header):
+
+    magic (8 bytes) | version (u32) | header length (u32) | JSON header
+    | padding to 8 | sections...
+
+The JSON header records the source fingerprint (size, mtime_ns, content
+hash), the parser that produced the data, the interned metadata table,
+document-level metadata and the byte offset and length of each section.
+The sections are the `SentenceStore` buffers: the `array('Q')` sentence
+offset table, the `array('I')` per-sentence metadata ids, the `array('Q')`
+document start indices and, last and page-aligned, the UTF-8 sentence
+text. On load the text is mapped with mmap and used in place, so no
+sentence is decoded up front.
+
+`save_sidecar` / `load_sidecar` use the same preamble and fingerprint check
+for other data derived from a source (e.g. the lemma index), with plain
+unaligned sections that are read into memory.
+
+When a source's mtime moved but its content hash still matches, the new
+mtime is written back into the header in place (see `_restamp`), so only
+the first load after a copy or touch pays for hashing the source.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Optional, Tuple
+
+from .store import SentenceStore
+
+CACHE_MAGIC = b'SWICCORP'
+CACHE_VERSION = 2
+CACHE_SUFFIX = '.swcache'
+SIDECAR_MAGIC = b'SWICSIDE'
+SIDECAR_VERSION = 1
+
+_PREAMBLE = struct.Struct('<8sII')
+_HASH_CHUNK = 1 << 20
+
+
+def cache_path_for(source_path: str) -> str:
+    return source_path + CACHE_SUFFIX
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(path: str) -> Dict:
+    st = os.stat(path)
+    return {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'hash': hash_file(path),
+    }
+
+
+def _is_current(source_path: str, stored: Dict) -> bool:
+    """
+    Size and mtime matching is trusted as-is. If only the mtime moved (file
+    copied or touched), fall back to comparing content hashes; on a match
+    `stored` takes the new mtime, for the caller to `_restamp`.
+    """
+    st = os.stat(source_path)
+    if st.st_size != stored.get('size'):
+        return False
+    if st.st_mtime_ns == stored.get('mtime_ns'):
+        return True
+    if hash_file(source_path) != stored.get('hash'):
+        return False
+    stored['mtime_ns'] = st.st_mtime_ns
+    return True
+
+
+def _restamp(path: str, header: Dict, header_len: int) -> None:
+    """
+    Rewrite the JSON header of the cache or sidecar file at `path` in
+    place, padded with spaces to its old length so no section moves. A
+    header that no longer fits, or a file that cannot be written, is left
+    as it is: the next load just hashes the source again.
+    """
+    data = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    if len(data) > header_len:
+        return
+    try:
+        with open(path, 'r+b') as f:
+            f.seek(_PREAMBLE.size)
+            f.write(data.ljust(header_len))
+    except OSError:
+        pass
+
+
+def _align(n: int, boundary: int = 8) -> int:
+    return (n + boundary - 1) // boundary * boundary
+
+
+def save_cache(source_path: str, store: SentenceStore, parser_name: str) -> None:
+    """Write `store` to the cache file for `source_path`."""
+    # The text goes last, aligned so it can be mapped on its own.
+    section_data = [
+        ('offsets', store.offsets.tobytes()),
+        ('meta_ids', store.meta_ids.tobytes()),
+        ('doc_starts', store.doc_starts.tobytes()),
+        ('text', store.text),
+    ]
+
+    header = {
+        'source': _fingerprint(source_path),
+        'parser': parser_name,
+        'byteorder': sys.byteorder,
+        'meta_table': store.meta_table,
+        'doc_meta': store.doc_meta,
+        'sections': {},
+    }
+
+    # Section offsets depend on the header size, which depends on the
+    # offsets; repeat until the header stops growing.
+    sections_start = -1
+    next_start = 0
+    while next_start != sections_start:
+        sections_start = next_start
+        pos = sections_start
+        for name, data in section_data:
+            if name == 'text':
+                pos = _align(pos, mmap.ALLOCATIONGRANULARITY)
+            header['sections'][name] = [pos, len(data)]
+            pos = _align(pos + len(data))
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        next_start = _align(_PREAMBLE.size + len(header_bytes))
+
+    cache_path = cache_path_for(source_path)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(CACHE_MAGIC, CACHE_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, data in section_data:
+            pos = header['sections'][name][0]
+            f.write(b'\0' * (pos - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, cache_path)
+
+
+def _read_header(f) -> Tuple[Optional[Dict], int]:
+    """The cache file's header and its length in bytes; None if it is not a current cache."""
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) < _PREAMBLE.size:
+        return None, 0
+    magic, version, header_len = _PREAMBLE.unpack(preamble)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None, 0
+    return json.loads(f.read(header_len).decode('utf-8')), header_len
+
+
+def load_cache(source_path: str, parser_name: str) -> Optional[SentenceStore]:
+    """
+    Return the cached `SentenceStore` for `source_path`, or None if there is
+    no cache or it is stale, from another format version, or was produced by
+    a different parser. The returned store reads its text from an mmap.
+    """
+    cache_path = cache_path_for(source_path)
+    if not os.path.exists(cache_path):
+        return None
+
+    with open(cache_path, 'rb') as f:
+        header, header_len = _read_header(f)
+        if (
+            header is None
+            or header.get('byteorder') != sys.byteorder
+            or header.get('parser') != parser_name
+        ):
+            return None
+        mtime_ns = header['source'].get('mtime_ns')
+        if not _is_current(source_path, header['source']):
+            return None
+
+        def column(name, typecode):
+            pos, length = header['sections'][name]
+            f.seek(pos)
+            values = array(typecode)
+            values.frombytes(f.read(length))
+            return values
+
+        offsets = column('offsets', 'Q')
+        meta_ids = column('meta_ids', 'I')
+        doc_starts = column('doc_starts', 'Q')
+
+        text_pos, text_len = header['sections']['text']
+        if text_len:
+            text = mmap.mmap(
+                f.fileno(), text_len, access=mmap.ACCESS_READ, offset=text_pos
+            )
+        else:
+            text = b''
+
+    if header['source']['mtime_ns'] != mtime_ns:
+        _restamp(cache_path, header, header_len)
+    return SentenceStore(
+        text,
+        offsets,
+        [tuple(meta) for meta in header['meta_table']],
+        meta_ids,
+        doc_starts,
+        [tuple(meta) for meta in header['doc_meta']],
+    )
+
+
+def save_sidecar(source_path: str, suffix: str, header: Dict, sections: Dict[str, bytes]) -> None:
+    """
+    Write `header` (JSON-serialisable) and named byte `sections` to
+    `source_path + suffix`, stamped with the source fingerprint.
+    """
+    header = dict(header, source=_fingerprint(source_path), byteorder=sys.byteorder)
+    header['sections'] = {}
+    pos = 0
+    for name, data in sections.items():
+        header['sections'][name] = [pos, len(data)]
+        pos += len(data)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+
+    path = source_path + suffix
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(SIDECAR_MAGIC, SIDECAR_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for data in sections.values():
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_sidecar(source_path: str, suffix: str) -> Optional[Tuple[Dict, Dict[str, bytes]]]:
+    """
+    Return (header, sections) written by `save_sidecar`, or None if the file
+    is missing, from another format version or byte order, or stale.
+    """
+    path = source_path + suffix
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            return None
+        magic, version, header_len = _PREAMBLE.unpack(preamble)
+        if magic != SIDECAR_MAGIC or version != SIDECAR_VERSION:
+            return None
+        header = json.loads(f.read(header_len).decode('utf-8'))
+        if header.get('byteorder') != sys.byteorder:
+            return None
+        mtime_ns = header['source'].get('mtime_ns')
+        if not _is_current(source_path, header['source']):
+            return None
+
+        base = f.tell()
+        sections = {}
+        for name, (pos, length) in header['sections'].items():
+            f.seek(base + pos)
+            sections[name] = f.read(length)
+
+    if header['source']['mtime_ns'] != mtime_ns:
+        _restamp(path, header, header_len)
+    return header, sections
@@ -0,0 +1,267 @@
+"""
+Source loading: parse a source file (or reuse its corpus cache), split the
+documents into sentences and return a `SentenceStore`.
+
+Kept free of any UI imports so it can run in worker processes.
+"""
+
+import os
+import re
+from array import array
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sources import get_parser_for_filename
+
+from .cache import cache_path_for, load_cache, save_cache
+from .parallel import batched, ordered_pool_map
+from .store import SENTENCE_END, SentenceStore, SentenceStoreBuilder
+
+# progress(stage, **counts) receives 'reading' (bytes_read, total_bytes),
+# 'splitting' (documents, total_documents, sentences) and 'parsed'
+# (documents) events while a source loads. With streaming parsers reading
+# and splitting interleave, and total_documents is None until the end.
+ProgressCallback = Callable[..., None]
+
+READ_CHUNK_CHARS = 4 * 1024 * 1024
+SPLIT_PROGRESS_EVERY = 500  # documents
+SPLIT_BATCH_DOCUMENTS = 64  # documents per task when splitting in parallel
+
+PackedDocument = Tuple[Optional[List[str]], bytes, array, Optional[List[List[str]]]]
+
+
+def _no_progress(stage, **counts):
+    pass
+
+
+def split_text_into_sentences(text_content):
+    """
+    Splits Japanese text content into sentences based only on true terminators 
+    (。！？.!?), ensuring punctuation stays attached and commas (、) are ignored.
+    """
+    text_content = text_content.replace('\r', ' ').replace('\n', ' ')
+
+    # Split AFTER terminal punctuation, keeping the punctuation attached.
+    delimiters = r'(?<=[。！？\.!\?])\s*'
+    
+    sentences = re.split(delimiters, text_content)
+
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def joiner_for(parser_name: str) -> str:
+    """How to join context sentences for display."""
+    # For Anime parser, show one line per original line using <br>
+    return '<br>' if parser_name == 'BunchaAnimeParser' else ''
+
+
+class ProgressReader:
+    """
+    Wraps an open text file and reports bytes consumed while a parser reads
+    it, whether through `read` or line iteration.
+    """
+
+    LINES_PER_REPORT = 20000
+
+    def __init__(self, f, total_bytes: int, progress: ProgressCallback):
+        self._f = f
+        self._total = total_bytes
+        self._progress = progress
+        self._lines = 0
+
+    def _report(self):
+        self._progress('reading', bytes_read=self._f.buffer.tell(), total_bytes=self._total)
+
+    def read(self, size: int = -1) -> str:
+        if size is not None and size >= 0:
+            data = self._f.read(size)
+            self._report()
+            return data
+        chunks = []
+        while True:
+            chunk = self._f.read(READ_CHUNK_CHARS)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._report()
+        return ''.join(chunks)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = next(self._f)
+        self._lines += 1
+        if self._lines % self.LINES_PER_REPORT == 0:
+            self._report()
+        return line
+
+
+def _document_sentences(doc: Dict):
+    """Return (sentences, per-sentence metadata or None) for one parsed document."""
+    if 'sentences' in doc and isinstance(doc['sentences'], list):
+        sentences = [s for s in doc['sentences'] if isinstance(s, str) and s.strip()]
+        # Per-sentence metadata if provided (e.g., Anime)
+        if 'sentence_meta' in doc and isinstance(doc['sentence_meta'], list):
+            metas = [m if isinstance(m, list) else [] for m in doc['sentence_meta']]
+            if len(metas) != len(sentences):
+                metas = metas[:len(sentences)] + [[]] * max(0, len(sentences) - len(metas))
+        else:
+            metas = None
+    else:
+        sentences = split_text_into_sentences(doc['text'])
+        metas = None
+    return sentences, metas
+
+
+def pack_document(doc: Dict) -> PackedDocument:
+    """
+    Split one parsed document and encode it for
+    `SentenceStoreBuilder.add_encoded_document`: normalised metadata, the
+    NUL-terminated UTF-8 sentences, their byte lengths and per-sentence
+    metadata (or None).
+    """
+    sentences, metas = _document_sentences(doc)
+    meta = doc.get('metadata')
+    meta = [str(m).strip() for m in meta] if isinstance(meta, list) else None
+    encoded = [s.encode('utf-8') + SENTENCE_END for s in sentences]
+    return meta, b''.join(encoded), array('I', map(len, encoded)), metas
+
+
+def _pack_batch(docs: List[Dict]) -> List[PackedDocument]:
+    return [pack_document(doc) for doc in docs]
+
+
+def build_store(
+    documents: Iterable[Dict],
+    progress: ProgressCallback = _no_progress,
+    total_documents: Optional[int] = None,
+    workers: int = 1,
+) -> SentenceStore:
+    """
+    Split parsed documents into sentences and pack them into a SentenceStore.
+    `documents` may be a generator; each document is released once added.
+
+    With `workers` > 1, batches of documents are split in a process pool
+    once there is more than one batch; results come back packed and are
+    appended in document order, so sentence indices do not depend on the
+    worker count.
+    """
+    builder = SentenceStoreBuilder()
+    doc_count = 0
+    next_report = SPLIT_PROGRESS_EVERY
+
+    batches = batched(documents, SPLIT_BATCH_DOCUMENTS)
+    first = next(batches, [])
+    if workers > 1 and len(first) == SPLIT_BATCH_DOCUMENTS:
+        packed_batches = ordered_pool_map(_pack_batch, chain([first], batches), workers)
+    else:
+        # Small sources never pay for starting a pool.
+        packed_batches = map(_pack_batch, chain([first], batches))
+
+    for packed in packed_batches:
+        for doc in packed:
+            builder.add_encoded_document(*doc)
+        doc_count += len(packed)
+        if doc_count >= next_report:
+            next_report = doc_count + SPLIT_PROGRESS_EVERY
+            progress('splitting', documents=doc_count,
+                     total_documents=total_documents, sentences=len(builder))
+    progress('splitting', documents=doc_count,
+             total_documents=doc_count, sentences=len(builder))
+    return builder.build()
+
+
+def parse_source(
+    source_path: str,
+    parser=None,
+    progress: ProgressCallback = _no_progress,
+    workers: int = 1,
+) -> Optional[SentenceStore]:
+    """
+    Stream the source through the parser's `iter_parse` and split documents
+    into a SentenceStore as they arrive. Returns None if nothing parsed.
+    """
+    filename_only = os.path.basename(source_path)
+    if parser is None:
+        parser = get_parser_for_filename(filename_only)
+    print(f"Using parser: {parser.__class__.__name__} for {filename_only}.")
+
+    total = os.path.getsize(source_path)
+    with open(source_path, 'r', encoding='utf-8', newline='') as f:
+        reader = ProgressReader(f, total, progress)
+        store = build_store(
+            parser.iter_parse(reader, source_path), progress, workers=workers
+        )
+
+    if not store.document_count:
+        print(
+            f"Error: No documents successfully parsed from {filename_only}."
+        )
+        return None
+
+    print(f"Loaded {store.document_count} documents.")
+    progress('parsed', documents=store.document_count)
+    return store
+
+
+def load_store(
+    source_path: str,
+    use_cache: bool = True,
+    progress: Optional[ProgressCallback] = None,
+    workers: int = 1,
+) -> Tuple[SentenceStore, str]:
+    """
+    Return (store, parser class name) for `source_path`, from the corpus cache
+    when it is current, otherwise by parsing the source (and refreshing the
+    cache). An unparseable source yields an empty store. `workers` > 1
+    splits documents in a process pool (not allowed inside daemon workers).
+    """
+    filename_only = os.path.basename(source_path)
+    parser = get_parser_for_filename(filename_only)
+    parser_name = parser.__class__.__name__
+
+    store = None
+    if use_cache:
+        try:
+            store = load_cache(source_path, parser_name)
+        except Exception as e:
+            print(f"Ignoring unreadable corpus cache: {e}")
+
+    if store is not None:
+        print(f"Loaded {filename_only} from corpus cache.")
+        return store, parser_name
+
+    store = parse_source(source_path, parser, progress or _no_progress, workers)
+    if store is None:
+        return SentenceStore.empty(), parser_name
+
+    if use_cache:
+        # Failures here only cost the next load.
+        try:
+            save_cache(source_path, store, parser_name)
+            print(f"Corpus cache written: {cache_path_for(source_path)}")
+        except Exception as e:
+            print(f"Could not write corpus cache: {e}")
+    return store, parser_name
+
+
+def sentence_metadata(store: SentenceStore, index: int, source_path: str) -> List[str]:
+    """
+    Return display metadata for sentence `index`:
+    - If per-sentence metadata is available (e.g., Anime), return that.
+    - Else, for Aozora sources, return document-level metadata.
+    - Otherwise, return empty list to keep UI unchanged.
+    """
+    if not 0 <= index < len(store):
+        return []
+
+    # 1) Per-sentence metadata (Anime)
+    per_sent = store.metadata(index)
+    if per_sent:
+        return list(per_sent)
+
+    # 2) Aozora document-level metadata
+    if 'aozora' in os.path.basename(source_path).lower():
+        return list(store.doc_metadata(store.doc_index(index)))
+    return []
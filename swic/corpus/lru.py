@@ -0,0 +1,95 @@
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+
+_load_ids = itertools.count(1)
+
+
+class LoadedCorpus:
+    """
+    A source that is ready to search: its store, built engine, optional
+    lemma index, word statistics and metadata facets, and display joiner.
+    `key` identifies this particular load, so data derived from an earlier
+    load of the same file (e.g. cached results) never matches it. The
+    lemma index and statistics may be attached after the corpus is in use;
+    `analyzed` is set once they are final.
+    """
+
+    def __init__(self, source_path: str, store, engine, joiner: str, lemmas=None, stats=None, facets=None):
+        self.source_path = source_path
+        self.key = (source_path, next(_load_ids))
+        self.store = store
+        self.engine = engine
+        self.joiner = joiner
+        self.lemmas = lemmas  # LemmaIndex, or None when unavailable
+        self.lemma_error = ''  # Why `lemmas` is None, if it failed to load
+        self.analyzed = threading.Event()  # Set when `lemmas` and `stats` are final
+        self.stats = stats  # CorpusStats, or None when unavailable
+        self.facets = facets  # FacetIndex over the source's metadata, or None
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.source_path)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.store.nbytes
+            + getattr(self.engine, 'nbytes', 0)
+            + getattr(self.lemmas, 'nbytes', 0)
+            + getattr(self.stats, 'nbytes', 0)
+            + getattr(self.facets, 'nbytes', 0)
+        )
+
+
+class CorpusLRU:
+    """
+    Keeps recently used corpora resident within a byte budget. The most
+    recently added corpus always stays, even if it alone exceeds the budget.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # source path -> LoadedCorpus
+        self._lock = threading.Lock()
+
+    def __contains__(self, source_path: str) -> bool:
+        with self._lock:
+            return source_path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(c.nbytes for c in self._entries.values())
+
+    def values(self) -> List[LoadedCorpus]:
+        """The resident corpora, least recently used first."""
+        with self._lock:
+            return list(self._entries.values())
+
+    def get(self, source_path: str) -> Optional[LoadedCorpus]:
+        with self._lock:
+            corpus = self._entries.get(source_path)
+            if corpus is not None:
+                self._entries.move_to_end(source_path)
+            return corpus
+
+    def put(self, corpus: LoadedCorpus) -> None:
+        with self._lock:
+            self._entries[corpus.source_path] = corpus
+            self._entries.move_to_end(corpus.source_path)
+            total = sum(c.nbytes for c in self._entries.values())
+            while total > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                total -= evicted.nbytes
+                print(f"Evicted {evicted.source_path} from corpus cache.")
+
+    def discard(self, source_path: str) -> None:
+        with self._lock:
+            self._entries.pop(source_path, None)
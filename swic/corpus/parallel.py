@@ -0,0 +1,77 @@
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+# Set by multithreaded hosts (the Eel GUI, the server) through avoid_fork().
+_fork_allowed = True
+
+
+def avoid_fork() -> None:
+    """
+    Never fork workers from this process. Call at startup from hosts that
+    run other threads (GUI loaders, request handlers, gevent): a forked
+    child inherits locks those threads may hold and can deadlock on them.
+    """
+    global _fork_allowed
+    _fork_allowed = False
+
+
+def process_context():
+    """
+    Multiprocessing context for corpus workers. 'fork' is used while this
+    process is single-threaded (e.g. the batch CLI), so workers share the
+    loaded corpus and skip re-importing the entry module. Otherwise workers
+    come from 'forkserver', whose server is a fresh single-threaded process,
+    or the platform default (spawn on Windows).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and _fork_allowed and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    if 'forkserver' in methods:
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ordered_pool_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+    max_pending: int = 0,
+) -> Iterator[R]:
+    """
+    Like `Executor.map`, yielding results in input order, but pulls from
+    `items` lazily and keeps at most `max_pending` tasks in flight (default
+    twice the worker count), so a streaming input is never fully buffered.
+    With one worker it runs in-process.
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    max_pending = max_pending or workers * 2
+    with ProcessPoolExecutor(max_workers=workers, mp_context=process_context()) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,201 @@
+"""
+Compact, array-backed sentence storage.
+
+A `SentenceStore` keeps every sentence of a corpus in one contiguous UTF-8
+buffer (sentences end with a NUL byte) addressed through an `array('Q')`
+offset table, per-sentence metadata as small integer ids into a table of
+interned tuples, and document boundaries as an `array('Q')` of first
+sentence indices resolved with bisect. It behaves as a read-only sequence
+of `str`, so search engines can index it like a list.
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+SENTENCE_END = b'\x00'
+
+# A stoppable buffer scan searches this many bytes at a time, checking for
+# cancellation in between, so it stops promptly even when hits are rare.
+SCAN_WINDOW_BYTES = 1 << 20
+
+Meta = Tuple[str, ...]
+
+
+class SentenceStore:
+
+    def __init__(
+        self,
+        text,
+        offsets: array,
+        meta_table: List[Meta],
+        meta_ids: array,
+        doc_starts: array,
+        doc_meta: List[Meta],
+    ):
+        # `text` is bytes-like: bytes, or an mmap when loaded from cache.
+        self.text = text
+        self.offsets = offsets        # len == sentence count + 1
+        self.meta_table = meta_table  # meta_table[0] is always ()
+        self.meta_ids = meta_ids
+        self.doc_starts = doc_starts  # First sentence index of each document
+        self.doc_meta = doc_meta
+
+    @classmethod
+    def empty(cls) -> 'SentenceStore':
+        return SentenceStoreBuilder().build()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._sentence(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('sentence index out of range')
+        return self._sentence(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._sentence(i)
+
+    def _sentence(self, index: int) -> str:
+        start, end = self.offsets[index], self.offsets[index + 1] - 1
+        return str(self.text[start:end], 'utf-8')
+
+    @property
+    def document_count(self) -> int:
+        return len(self.doc_starts)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the store's buffers."""
+        return (
+            len(self.text)
+            + self.offsets.itemsize * len(self.offsets)
+            + self.meta_ids.itemsize * len(self.meta_ids)
+            + self.doc_starts.itemsize * len(self.doc_starts)
+        )
+
+    def metadata(self, index: int) -> Meta:
+        """Per-sentence metadata (e.g. the Buncha anime label), or ()."""
+        return self.meta_table[self.meta_ids[index]]
+
+    def doc_index(self, index: int) -> int:
+        """Index of the document that contains sentence `index`."""
+        return bisect_right(self.doc_starts, index) - 1
+
+    def doc_metadata(self, doc_index: int) -> Meta:
+        if 0 <= doc_index < len(self.doc_meta):
+            return self.doc_meta[doc_index]
+        return ()
+
+    def iter_scan(self, word: str, stop=None) -> Iterator[int]:
+        """
+        Yield indices of sentences containing `word`, in order, by searching
+        the whole buffer with `find` without decoding any sentence. With a
+        `stop` event the buffer is searched SCAN_WINDOW_BYTES at a time and
+        the scan ends early once it is set.
+        """
+        pattern = word.encode('utf-8')
+        if not pattern or SENTENCE_END in pattern:
+            return
+        text, offsets = self.text, self.offsets
+        if stop is None:
+            pos = text.find(pattern)
+            while pos != -1:
+                index = bisect_right(offsets, pos) - 1
+                yield index
+                # Skip the rest of this sentence; one hit per sentence is enough.
+                pos = text.find(pattern, offsets[index + 1])
+            return
+
+        size, overlap = len(text), len(pattern) - 1
+        start = 0
+        while start < size and not stop.is_set():
+            window_end = start + SCAN_WINDOW_BYTES
+            # Matches starting in [start, window_end), including any that run past it
+            pos = text.find(pattern, start, window_end + overlap)
+            if pos == -1:
+                start = window_end
+                continue
+            index = bisect_right(offsets, pos) - 1
+            yield index
+            start = offsets[index + 1]
+
+    def scan(self, word: str) -> List[int]:
+        return list(self.iter_scan(word))
+
+
+class SentenceStoreBuilder:
+    """Accumulates documents in load order and produces a `SentenceStore`."""
+
+    def __init__(self):
+        self._text = bytearray()
+        self._offsets = array('Q', [0])
+        self._meta_table: List[Meta] = [()]
+        self._interned = {(): 0}
+        self._meta_ids = array('I')
+        self._doc_starts = array('Q')
+        self._doc_meta: List[Meta] = []
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _intern(self, meta: Optional[Iterable[str]]) -> int:
+        key = tuple(meta or ())
+        meta_id = self._interned.get(key)
+        if meta_id is None:
+            meta_id = self._interned[key] = len(self._meta_table)
+            self._meta_table.append(key)
+        return meta_id
+
+    def add_document(
+        self,
+        metadata: Optional[Iterable[str]],
+        sentences: Sequence[str],
+        sentence_meta: Optional[Sequence[Optional[Iterable[str]]]] = None,
+    ) -> None:
+        self._doc_starts.append(len(self))
+        self._doc_meta.append(tuple(metadata or ()))
+        text, offsets, meta_ids = self._text, self._offsets, self._meta_ids
+        for i, s in enumerate(sentences):
+            text += s.encode('utf-8')
+            text += SENTENCE_END
+            offsets.append(len(text))
+            meta_ids.append(self._intern(sentence_meta[i]) if sentence_meta else 0)
+
+    def add_encoded_document(
+        self,
+        metadata: Optional[Iterable[str]],
+        encoded: bytes,
+        lengths: Sequence[int],
+        sentence_meta: Optional[Sequence[Optional[Iterable[str]]]] = None,
+    ) -> None:
+        """
+        Add a document whose sentences are already UTF-8 encoded and
+        NUL-terminated back to back in `encoded`; `lengths` gives each
+        sentence's byte length including the terminator.
+        """
+        self._doc_starts.append(len(self))
+        self._doc_meta.append(tuple(metadata or ()))
+        offsets, meta_ids = self._offsets, self._meta_ids
+        end = len(self._text)
+        for i, length in enumerate(lengths):
+            end += length
+            offsets.append(end)
+            meta_ids.append(self._intern(sentence_meta[i]) if sentence_meta else 0)
+        self._text += encoded
+
+    def build(self) -> SentenceStore:
+        # The bytearray is handed over as-is to avoid copying the buffer.
+        return SentenceStore(
+            self._text,
+            self._offsets,
+            self._meta_table,
+            self._meta_ids,
+            self._doc_starts,
+            self._doc_meta,
+        )
@@ -0,0 +1,245 @@
+# library.py - Loaded corpora and the caches shared by all searches
+
+import os
+import threading
+
+from config import (
+    RESOURCES_DIR, SEARCH_ENGINES, DEFAULT_SEARCH_ENGINE, CORPUS_CACHE_ENABLED,
+    CORPUS_LRU_MAX_BYTES, LOAD_WORKERS, RESULT_CACHE_MAX_BYTES,
+    KUROMOJI_DICT_DIR, LEMMA_INDEX_ENABLED, READING_CACHE_SENTENCES, STATS_ENABLED,
+)
+from corpus import CorpusLRU, LoadedCorpus, joiner_for, load_store
+from morph import DictionaryError, ReadingCache, Tokenizer
+from search import ResultCache, get_engine_for_filename
+from search.lemma_index import LemmaIndex, analyze_sentences, load_lemma_index
+from search.facets import FacetIndex
+from search.stats import CorpusStats, load_stats, metadata_groups
+from session import SearchSession
+
+
+class CorpusLibrary:
+    """
+    Finds sources, loads and indexes them, and owns what every search over
+    them shares: resident corpora (an LRU within a byte budget), the result
+    cache and the tokenizer with its reading cache. A LoadedCorpus is never
+    modified after loading, except that its lemma index and word statistics
+    are attached once built, so any number of SearchSessions may read it.
+    """
+
+    def __init__(self):
+        # Recently used corpora stay resident so switching back is instant.
+        self.corpora = CorpusLRU(CORPUS_LRU_MAX_BYTES)
+        self.result_cache = ResultCache(RESULT_CACHE_MAX_BYTES)
+        self._tokenizer = None  # Shared morph.Tokenizer, loaded on first use
+        self._tokenizer_error = ''  # Why the dictionary could not be loaded
+        self._tokenizer_lock = threading.Lock()
+        self._readings = None  # ReadingCache, created with the tokenizer
+
+    def detect_sources(self):
+        """Detect all CSV sources in both the app folder and the resources folder."""
+        detected = []
+        # 1) resources dir (if exists)
+        if os.path.isdir(RESOURCES_DIR):
+            for f in os.listdir(RESOURCES_DIR):
+                if f.lower().endswith('.csv'):
+                    detected.append(('resources', f))
+        # 2) app folder (same folder as this file)
+        app_dir = os.path.dirname(__file__)
+        for f in os.listdir(app_dir):
+            if f.lower().endswith('.csv'):
+                detected.append(('.', f))
+
+        # De-duplicate by filename, prefer resources/ over root
+        seen = set()
+        ordered = []
+        for folder, fname in detected:
+            if fname not in seen:
+                seen.add(fname)
+                ordered.append((folder, fname))
+
+        files = [fname for _, fname in ordered]
+        files.sort()
+        print(f"Detected sources (resources/ and app dir): {files}")
+        return files
+
+
+    def resolve_source_path(self, filename):
+        """Return the path of a source file (checks resources/ then app folder), or None."""
+        candidate_paths = [
+            os.path.join(RESOURCES_DIR, filename),
+            os.path.join(os.path.dirname(__file__), filename),
+        ]
+        for p in candidate_paths:
+            if os.path.exists(p):
+                return p
+        return None
+
+    def load_corpus(self, path, progress=None, background=True):
+        """
+        Return a LoadedCorpus for `path` from the LRU, or load, index and add
+        it. None on failure. The corpus is returned as soon as it can be
+        searched; its lemma index and word statistics follow on a thread
+        (see LoadedCorpus.analyzed), or before returning unless `background`.
+        """
+        corpus = self.corpora.get(path)
+        if corpus is not None:
+            return corpus
+
+        print(f"Loading text database from {path}...")
+        try:
+            filename_only = os.path.basename(path)
+            store, parser_name = load_store(
+                path, use_cache=CORPUS_CACHE_ENABLED, progress=progress,
+                workers=LOAD_WORKERS,
+            )
+            print(f"Total sentences: {len(store)}")
+
+            if progress is not None:
+                progress("indexing", sentences=len(store))
+            engine = get_engine_for_filename(
+                filename_only, SEARCH_ENGINES, DEFAULT_SEARCH_ENGINE
+            )
+            engine.build(store)
+            print(f"Search index built: {engine.__class__.__name__}.")
+        except Exception as e:
+            print(f"Failed to load data: {e}")
+            return None
+
+        # Author/title or series of each sentence, for facets and statistics.
+        groups = metadata_groups(store, parser_name)
+        facets = FacetIndex(groups, len(store))
+
+        corpus = LoadedCorpus(path, store, engine, joiner_for(parser_name), facets=facets)
+        # Results computed against an earlier load of this file are stale.
+        self.result_cache.invalidate(path)
+        if len(store):
+            self.corpora.put(corpus)
+
+        if not (LEMMA_INDEX_ENABLED or STATS_ENABLED) or not len(store):
+            corpus.analyzed.set()
+        elif background:
+            threading.Thread(
+                target=self._analyze, args=(corpus, groups, progress), daemon=True
+            ).start()
+        else:
+            self._analyze(corpus, groups, progress)
+        return corpus
+
+    def get_tokenizer(self):
+        """The shared tokenizer, or None if the kuromoji dictionary cannot be loaded."""
+        with self._tokenizer_lock:
+            if self._tokenizer is None and not self._tokenizer_error:
+                try:
+                    self._tokenizer = Tokenizer(KUROMOJI_DICT_DIR)
+                    self._readings = ReadingCache(self._tokenizer, READING_CACHE_SENTENCES)
+                except DictionaryError as e:
+                    self._tokenizer_error = f"the kuromoji dictionary could not be loaded: {e}"
+                    print(f"Inflection search and readings unavailable: {e}")
+            return self._tokenizer
+
+    def morph_status(self):
+        """
+        Whether inflection search and readings can work: {available, error},
+        `error` saying why not (e.g. a missing dictionary file) for display.
+        """
+        available = self.get_tokenizer() is not None
+        return {"available": available, "error": self._tokenizer_error}
+
+    def _analyze(self, corpus, groups, progress=None):
+        """
+        Attach the lemma index and word statistics to a loaded corpus: each
+        from its sidecar file when current, the rest built together in one
+        tokenization pass over the store. Sets `corpus.analyzed` when done.
+        """
+        try:
+            tokenizer = self.get_tokenizer()
+            if tokenizer is None:
+                corpus.lemma_error = self._tokenizer_error
+                return
+            path, store = corpus.source_path, corpus.store
+            if CORPUS_CACHE_ENABLED:
+                if LEMMA_INDEX_ENABLED:
+                    corpus.lemmas = load_lemma_index(path, store, tokenizer, KUROMOJI_DICT_DIR)
+                if STATS_ENABLED:
+                    corpus.stats = load_stats(path, store, groups, tokenizer, KUROMOJI_DICT_DIR)
+
+            lemmas = LemmaIndex(tokenizer, store) if LEMMA_INDEX_ENABLED and corpus.lemmas is None else None
+            stats = CorpusStats(tokenizer) if STATS_ENABLED and corpus.stats is None else None
+            if lemmas is None and stats is None:
+                return
+            if stats is not None:
+                stats.begin(groups)
+            stage = "lemmatizing" if lemmas is not None else "counting"
+            if progress is not None:
+                progress(stage, sentences=0, total_sentences=len(store))
+            done = 0
+            for batch in analyze_sentences(store, tokenizer, KUROMOJI_DICT_DIR, LOAD_WORKERS):
+                for analysis in batch:
+                    if lemmas is not None:
+                        lemmas.add(analysis)
+                    if stats is not None:
+                        stats.add(analysis)
+                done += len(batch)
+                if progress is not None:
+                    progress(stage, sentences=done, total_sentences=len(store))
+            if stats is not None:
+                stats.finish()
+
+            for table, name in ((lemmas, "lemma index"), (stats, "word statistics")):
+                if table is not None and CORPUS_CACHE_ENABLED:
+                    try:
+                        table.save(path, KUROMOJI_DICT_DIR)
+                    except Exception as e:
+                        print(f"Could not write {name}: {e}")
+            if lemmas is not None:
+                corpus.lemmas = lemmas
+            if stats is not None:
+                corpus.stats = stats
+        except Exception as e:
+            print(f"Failed to analyze {corpus.name}: {e}")
+            if corpus.lemmas is None:
+                corpus.lemma_error = f"the lemma index could not be built ({e})"
+        finally:
+            corpus.analyzed.set()
+            if progress is not None:
+                progress("analyzed", message=self._analysis_message(corpus))
+
+    @staticmethod
+    def _analysis_message(corpus):
+        if corpus.lemmas is not None:
+            return f"Inflection search is ready for {corpus.name}."
+        if corpus.lemma_error:
+            return f"Inflection search is unavailable for {corpus.name}: {corpus.lemma_error}."
+        return ""
+
+    def source_frequencies(self, word, corpora=None):
+        """
+        How often `word` occurs in each of `corpora` (default: the resident
+        ones), as {source, count, per_million} dicts, most frequent first.
+        Sources without word statistics are left out.
+        """
+        if corpora is None:
+            corpora = self.corpora.values()
+        rows = []
+        for corpus in corpora:
+            stats = corpus.stats
+            if stats is None:
+                continue
+            count = stats.frequency(word)
+            rows.append({
+                "source": corpus.name,
+                "count": count,
+                "per_million": round(count * 1e6 / stats.tokens, 1) if stats.tokens else 0.0,
+            })
+        rows.sort(key=lambda r: -r["count"])
+        return rows
+
+    def get_reading_cache(self):
+        """The shared ReadingCache, or None if the tokenizer is unavailable."""
+        if self.get_tokenizer() is None:
+            return None
+        return self._readings
+
+    def new_session(self, corpus):
+        """A SearchSession over `corpus` that shares this library's caches."""
+        return SearchSession(corpus, self.result_cache, self.get_reading_cache)
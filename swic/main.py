@@ -3,121 +3,144 @@
 import os
 import re
 import threading
-import tempfile
 import time
 # urllib no longer needed for font download
 
-# ---- Kivy parts kept (for reference or reuse later) ----
-from kivy.core.audio import SoundLoader
-from gtts import gTTS
+_import_started = time.perf_counter()
 
 # ---- New import for web interface ----
 import eel
 
 # Import configuration settings
 from config import (
-    RESOURCES_DIR, DEFAULT_SOURCE_FILE,
-    DEFAULT_CONTEXT_SENTENCES
+    DEFAULT_SOURCE_FILE, SEARCH_ENGINES, DEFAULT_SEARCH_ENGINE,
+    CORPUS_CACHE_ENABLED, FEDERATED_RESULTS_PER_SOURCE, KUROMOJI_DICT_DIR, LEMMA_INDEX_ENABLED,
+    TTS_ENGINE, TTS_LANG, TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_PREFETCH,
 )
-from sources import get_parser_for_filename
+from corpus import LoadedCorpus, SentenceStore, split_text_into_sentences
+from corpus.parallel import avoid_fork
+from library import CorpusLibrary
+from search import LinearScanEngine
+from search.federated import FederatedSearcher
+from search.query import QueryError
+from tts import AudioCache, PlaybackWorker, get_synthesizer
 
+print(f"Imported modules in {time.perf_counter() - _import_started:.2f}s.")
 
-# --- Utility Functions (font download removed; web uses Google Fonts) ---
 
+# --- Utility Functions (font download removed; web uses Google Fonts) ---
 
-# --- Core Logic (adapted for Eel) ---
-def split_text_into_sentences(text_content):
-    """
-    Splits Japanese text content into sentences based only on true terminators 
-    (。！？.!?), ensuring punctuation stays attached and commas (、) are ignored.
-    """
-    text_content = text_content.replace('\r', ' ').replace('\n', ' ')
+# Kivy's audio player (kept from the Kivy version) is imported on the first
+# read-aloud: Kivy alone takes seconds to import.
+_SoundLoader = None
 
-    # Split AFTER terminal punctuation, keeping the punctuation attached.
-    delimiters = r'(?<=[。！？\.!\?])\s*'
-    
-    sentences = re.split(delimiters, text_content)
 
-    return [s.strip() for s in sentences if s.strip()]
+def _sound_loader():
+    global _SoundLoader
+    if _SoundLoader is None:
+        started = time.perf_counter()
+        from kivy.core.audio import SoundLoader
+        _SoundLoader = SoundLoader
+        print(f"Loaded audio backend in {time.perf_counter() - started:.2f}s.")
+    return _SoundLoader
 
 
-class ContextFinderLayout:
+# --- Core Logic (adapted for Eel) ---
+class ContextFinderLayout(CorpusLibrary):
     
     """
     Core logic class for Japanese context search, reused for both
-    Kivy and Eel interfaces.
+    Kivy and Eel interfaces. The desktop app is a single client: one
+    SearchSession over whichever corpus is active.
     """
 
     def __init__(self):
-        self.context_size = DEFAULT_CONTEXT_SENTENCES
-        self.all_sentences = []
-        self.all_sentence_metadata = []  # Per-sentence metadata when available
-        self.match_indices = []
-        self.current_match_index = -1
-        self.current_word = ''
+        super().__init__()
+        self.store = SentenceStore.empty()  # Sentences, per-sentence metadata and document boundaries
+        self.session = None  # SearchSession over the active corpus: query, cursor, display settings
         self.current_source = DEFAULT_SOURCE_FILE
         self.sources = self.detect_sources()
-        self._joiner = ''  # How to join context sentences for display
-        
-        # New properties for metadata handling
-        self.documents = []           # Stores parsed document objects: {metadata: list, text: str}
-        self.sentence_to_doc_map = [] # Maps sentence index in all_sentences to doc index in documents
-        
-        self.load_data()
-
-    def detect_sources(self):
-        """Detect all CSV sources in both the app folder and the resources folder."""
-        detected = []
-        # 1) resources dir (if exists)
-        if os.path.isdir(RESOURCES_DIR):
-            for f in os.listdir(RESOURCES_DIR):
-                if f.lower().endswith('.csv'):
-                    detected.append(('resources', f))
-        # 2) app folder (same folder as this file)
-        app_dir = os.path.dirname(__file__)
-        for f in os.listdir(app_dir):
-            if f.lower().endswith('.csv'):
-                detected.append(('.', f))
-
-        # De-duplicate by filename, prefer resources/ over root
-        seen = set()
-        ordered = []
-        for folder, fname in detected:
-            if fname not in seen:
-                seen.add(fname)
-                ordered.append((folder, fname))
-
-        files = [fname for _, fname in ordered]
-        files.sort()
-        print(f"Detected sources (resources/ and app dir): {files}")
-        return files
+        self.search_index = LinearScanEngine()  # Replaced by load_data
+        self.federated = None  # FederatedSearcher, started on first all-sources search
 
+        self._load_generation = 0  # Bumped per set_source; stale async loads don't activate
+        self.load_status = {"stage": "idle"}
+        self.on_load_progress = None  # Callable(event dict), e.g. pushes to the frontend
+        self.corpus = None  # Active LoadedCorpus
+        self.audio_cache = None  # tts.AudioCache, created on the first read-aloud
+        self.player = None  # tts.PlaybackWorker, created on the first read-aloud
+
+        # Start with nothing loaded so the window can open at once; the
+        # current source is loaded by load_data or load_in_background.
+        self._activate(self._empty_corpus(self.current_source))
 
     def set_source(self, filename):
         """Change current source and reload (checks resources/ then app folder)."""
-        # Try resources/
-        candidate_paths = [
-            os.path.join(RESOURCES_DIR, filename),
-            os.path.join(os.path.dirname(__file__), filename),
-        ]
-        new_path = None
-        for p in candidate_paths:
-            if os.path.exists(p):
-                new_path = p
-                break
-
-        if new_path:
-            self.current_source = new_path
-            print(f"Switching source to: {self.current_source}")
-            self.load_data()
-            # Reset search state
-            self.match_indices = []
-            self.current_match_index = -1
-            self.current_word = ''
-            return f"Source switched to {filename} ({len(self.all_sentences)} sentences)"
-        else:
+        new_path = self.resolve_source_path(filename)
+
+        if not new_path:
             return f"File not found: {filename}"
 
+        print(f"Switching source to: {new_path}")
+        self._load_generation += 1
+        resident = self.corpora.get(new_path)
+        if resident is not None:
+            self._activate(resident)
+            message = f"Source switched to {filename} ({len(self.store)} sentences)"
+            self._report_progress(filename, "done", message=message)
+            return message
+
+        self._start_load(new_path, filename)
+        return f"Loading {filename}..."
+
+    def load_in_background(self):
+        """Load the current source on a thread (from its cache when current), reporting progress."""
+        self._load_generation += 1
+        self._start_load(self.current_source, os.path.basename(self.current_source))
+
+    def _start_load(self, path, filename):
+        # Parse and index off the UI thread; progress events report the rest.
+        self._report_progress(filename, "loading", message=f"Loading {filename}...")
+        threading.Thread(
+            target=self._load_source_async,
+            args=(path, filename, self._load_generation),
+            daemon=True,
+        ).start()
+
+    def _load_source_async(self, path, filename, generation):
+        def progress(stage, **counts):
+            # The lemma index and statistics of a source switched away
+            # from keep building, but no longer report.
+            if generation == self._load_generation:
+                self._report_progress(filename, stage, **counts)
+
+        started = time.perf_counter()
+        corpus = self.load_corpus(path, progress)
+        if generation != self._load_generation:
+            return  # A newer set_source superseded this load
+        if corpus is None:
+            self._report_progress(filename, "error", message=f"Failed to load {filename}.")
+            return
+        seconds = time.perf_counter() - started
+        print(f"Loaded {filename} in {seconds:.2f}s.")
+        self._activate(corpus)
+        self._report_progress(
+            filename, "done", seconds=round(seconds, 2),
+            message=f"Source switched to {filename} ({len(self.store)} sentences)",
+        )
+
+    def is_loading(self):
+        return self.load_status.get("stage") not in ("idle", "done", "error")
+
+    def _report_progress(self, filename, stage, **info):
+        event = dict(info, source=filename, stage=stage)
+        self.load_status = event
+        if self.on_load_progress is not None:
+            try:
+                self.on_load_progress(event)
+            except Exception as e:
+                print(f"Could not report load progress: {e}")
+
     def parse_aozora_data(self, content):
         """
         Parses the raw file content using the strict Aozora format: 
@@ -178,215 +201,156 @@ class ContextFinderLayout:
 
 
     def load_data(self):
-        """Loads Japanese text corpus and metadata into memory using per-source parsers."""
-        print(f"Loading text database from {self.current_source}...")
-        self.documents = []
-        self.all_sentences = []
-        self.all_sentence_metadata = []
-        self.sentence_to_doc_map = []  # Reset map
-
-        try:
-            with open(self.current_source, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            content = content.strip()
-
-            filename_only = os.path.basename(self.current_source)
-            parser = get_parser_for_filename(filename_only)
-            self.documents = parser.parse(content, self.current_source)
-            print(f"Using parser: {parser.__class__.__name__} for {filename_only}.")
-
-            # For Anime parser, show one line per original line using <br>
-            self._joiner = '<br>' if parser.__class__.__name__ == 'BunchaAnimeParser' else ''
-
-            if not self.documents:
-                print(
-                    f"Error: No documents successfully parsed from {filename_only}."
-                )
-                return
-
-            print(f"Loaded {len(self.documents)} documents.")
-
-            for doc_index, doc in enumerate(self.documents):
-                if 'sentences' in doc and isinstance(doc['sentences'], list):
-                    sentences = [s for s in doc['sentences'] if isinstance(s, str) and s.strip()]
-                    # Per-sentence metadata if provided (e.g., Anime)
-                    if 'sentence_meta' in doc and isinstance(doc['sentence_meta'], list):
-                        metas = [m if isinstance(m, list) else [] for m in doc['sentence_meta']]
-                        if len(metas) != len(sentences):
-                            metas = metas[:len(sentences)] + [[]] * max(0, len(sentences) - len(metas))
-                    else:
-                        metas = [[] for _ in sentences]
-                else:
-                    sentences = split_text_into_sentences(doc['text'])
-                    metas = [[] for _ in sentences]
-                self.all_sentences.extend(sentences)
-                self.all_sentence_metadata.extend(metas)
-                self.sentence_to_doc_map.extend([doc_index] * len(sentences))
-
-            print(f"Total sentences: {len(self.all_sentences)}")
-
-        except Exception as e:
-            print(f"Failed to load data: {e}")
-            self.documents = []
-            self.all_sentences = []
-            self.sentence_to_doc_map = []
-
-    # --- Context handling logic ---
-    
-    def _get_context_metadata(self):
-        """
-        Return metadata for the current match:
-        - If per-sentence metadata is available (e.g., Anime), return that.
-        - Else, for Aozora sources, return document-level metadata.
-        - Otherwise, return empty list to keep UI unchanged.
-        """
-        filename = os.path.basename(self.current_source).lower()
+        """Loads the current source (or reuses it if resident) and makes it the active corpus."""
+        corpus = self.load_corpus(self.current_source)
+        if corpus is None:
+            corpus = self._empty_corpus(self.current_source)
+        self._activate(corpus)
+
+    @staticmethod
+    def _empty_corpus(path):
+        return LoadedCorpus(path, SentenceStore.empty(), LinearScanEngine(), '')
+
+    @property
+    def lemma_index(self):
+        """LemmaIndex of the active corpus, once built."""
+        return self.corpus.lemmas if self.corpus is not None else None
+
+    def _activate(self, corpus):
+        """Make `corpus` the searched source and reset the search state."""
+        self.corpus = corpus
+        self.current_source = corpus.source_path
+        self.store = corpus.store
+        self.search_index = corpus.engine
+        if self.session is None:
+            self.session = self.new_session(corpus)
+        else:
+            self.session.set_corpus(corpus)
 
-        if self.current_match_index == -1 or not self.match_indices:
-            return []
-
-        target_sentence_index = self.match_indices[self.current_match_index]
-        
-        if 0 <= target_sentence_index < len(self.sentence_to_doc_map):
-            # 1) Per-sentence metadata (Anime)
-            if 0 <= target_sentence_index < len(self.all_sentence_metadata):
-                per_sent = self.all_sentence_metadata[target_sentence_index]
-                if isinstance(per_sent, list) and len(per_sent) > 0:
-                    return per_sent
-
-            # 2) Aozora document-level metadata
-            if 'aozora' in filename:
-                doc_index = self.sentence_to_doc_map[target_sentence_index]
-                if 0 <= doc_index < len(self.documents):
-                    meta = self.documents[doc_index].get('metadata', [])
-                    if isinstance(meta, list):
-                        return meta
-        return []
+    # --- Search (delegated to the session) ---
 
     def search_word_js(self, word):
         """
         Search wrapper for the Eel interface.
         Returns a dictionary with 'text', 'count', and 'metadata'.
+        `word` may be a plain word or a query (see search.query): terms with
+        AND/OR/NOT, "phrases", /regex/, ~lemma and NEAR/N proximity.
         """
-        word = word.strip()
-        if not word:
-            return {"text": "Please enter a word.", "count": 0, "metadata": []}
-
-        if not self.all_sentences:
-            return {"text": f"Data not loaded from {os.path.basename(self.current_source)}.", "count": 0, "metadata": []}
-
-        self.current_word = word
-        self.match_indices = [
-            i for i, s in enumerate(self.all_sentences) if word in s
-        ]
-
-        total_count = len(self.match_indices)
-
-        if not self.match_indices:
-            # No results found, return the message and 0 count
-            return {"text": f"No results found for '{word}'.", "count": 0, "metadata": []}
-
-        self.current_match_index = 0
-        
-        # Success case: Return the first context text, the total count, and metadata
-        return {
-            "text": self._get_context_text(),
-            "count": total_count,
-            "metadata": self._get_context_metadata()
-        }
-
-    def _get_context_text(self):
-        """Return the current context text as string."""
-        if self.current_match_index == -1 or not self.match_indices:
-            return ""
-
-        target_index = self.match_indices[self.current_match_index]
-
-        # interpret context_size as total window size (1 = only target)
-        half_window = max(0, (self.context_size - 1) // 2)
-        start = max(0, target_index - half_window)
-        end = min(len(self.all_sentences), target_index + half_window + 1)
-
-        context_sentences = self.all_sentences[start:end]
-
-        output_lines = []
-        # The frontend expects the highlighted word to be wrapped in <strong> tags
-        strong_tag_start = '<strong>'
-        strong_tag_end = '</strong>'
-        
-        for i, s in enumerate(context_sentences):
-            idx = start + i
-            if idx == target_index:
-                # Highlight the word in the target sentence
-                highlighted = s.replace(self.current_word, f"{strong_tag_start}{self.current_word}{strong_tag_end}")
-                output_lines.append(highlighted)
-            else:
-                output_lines.append(s)
-
-        formatted = self._joiner.join(output_lines)
-        return formatted
+        if self.is_loading() and not len(self.store):
+            name = self.load_status.get("source", "")
+            return {"text": f"Still loading {name}, please wait...", "count": 0, "metadata": []}
+        return self.session.search(word)
 
     def next_result(self):
         """Get the next matching result and its associated metadata."""
-        if self.current_match_index < len(self.match_indices) - 1:
-            self.current_match_index += 1
-        else: # Loop back to start
-            self.current_match_index = 0
-            
-        return {
-            "text": self._get_context_text(),
-            "metadata": self._get_context_metadata()
-        }
+        return self.session.next_result()
 
     def prev_result(self):
         """Get the previous matching result and its associated metadata."""
-        if self.current_match_index > 0:
-            self.current_match_index -= 1
-        else: # Loop back to end
-            self.current_match_index = len(self.match_indices) - 1
-            
-        return {
-            "text": self._get_context_text(),
-            "metadata": self._get_context_metadata()
-        }
-
-    def read_context(self):
-        """Play the current text aloud."""
-        text = self._get_context_text()
-        # Remove any <strong> or <b> tags before passing to TTS
-        text = re.sub(r'<strong[^>]*>.*?</strong>|<b[^>]*>.*?</b>', lambda m: re.sub(r'<[^>]+>', '', m.group(0)), text)
+        return self.session.prev_result()
+
+    def get_results_page(self, offset, limit):
+        """Render hits [offset, offset + limit) of the current search in one call."""
+        return self.session.get_results_page(offset, limit)
+
+    def count_results(self):
+        """Finish counting the current search now; returns the exact total."""
+        return self.session.count_results()
+
+    def set_readings_enabled(self, enabled):
+        """Turn furigana data on or off; returns the current context's readings."""
+        return self.session.set_readings_enabled(enabled)
+
+    def federated_search_js(self, word):
+        """
+        Search every detected source in parallel worker processes. Returns
+        at once with per-source counts/statuses and merged, source-labelled
+        results; sources that have not answered yet are 'pending' until
+        collected by federated_results_js.
+        """
+        word = word.strip()
+        if not word:
+            return {"sources": [], "results": [], "complete": True}
+
+        if self.federated is None:
+            paths = [self.resolve_source_path(f) for f in self.detect_sources()]
+            self.federated = FederatedSearcher(
+                [p for p in paths if p],
+                SEARCH_ENGINES, DEFAULT_SEARCH_ENGINE, CORPUS_CACHE_ENABLED,
+                KUROMOJI_DICT_DIR if LEMMA_INDEX_ENABLED else None,
+            )
+        try:
+            return self.federated.search(word, limit=FEDERATED_RESULTS_PER_SOURCE)
+        except QueryError as e:
+            return {"sources": [], "results": [], "complete": True, "error": f"Invalid query: {e}"}
+
+    def federated_results_js(self):
+        """Replies that arrived for the latest federated query since it was sent."""
+        if self.federated is None:
+            return {"sources": [], "results": [], "complete": True}
+        return self.federated.collect()
+
+    def _get_audio_cache(self):
+        """The TTS audio cache with the configured synthesizer, created on first use."""
+        if self.audio_cache is None:
+            self.audio_cache = AudioCache(
+                TTS_CACHE_DIR, get_synthesizer(TTS_ENGINE), TTS_CACHE_MAX_BYTES
+            )
+        return self.audio_cache
+
+    def _get_player(self):
+        """The single TTS playback worker, created on first use."""
+        if self.player is None:
+            self.player = PlaybackWorker(
+                self._get_audio_cache(), TTS_LANG, lambda path: _sound_loader().load(path)
+            )
+        return self.player
+
+    def read_context(self, position=None):
+        """
+        Play the current text aloud, or hit `position` when the frontend
+        navigated locally. Replaces whatever is being read; asking again for
+        the text being read does nothing.
+        """
+        text = self.session.context_text(position)
         if not text:
             return "Nothing to read."
 
-        threading.Thread(target=self._tts_playback, args=(text,)).start()
+        player = self._get_player()
+        player.request(text)
+        if TTS_PREFETCH:
+            # Stepping on and reading again is the common next move.
+            current = self.session.cursor.position
+            self.audio_cache.prefetch(
+                [self.session.hit_context_text(current + 1), self.session.hit_context_text(current - 1)],
+                TTS_LANG,
+            )
         return "Reading aloud..."
 
-    def _tts_playback(self, text):
-        """Internal TTS playback."""
-        temp_file = None
-        try:
-            tts = gTTS(text=text, lang='ja')
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as tmp:
-                temp_file = tmp.name
-            tts.save(temp_file)
-
-            sound = SoundLoader.load(temp_file)
-            if sound:
-                sound.play()
-                while sound.state == 'play':
-                    time.sleep(0.1)
-                sound.unload()
-        except Exception as e:
-            print(f"TTS error: {e}")
-        finally:
-            if temp_file and os.path.exists(temp_file):
-                os.remove(temp_file)
+    def stop_reading(self):
+        if self.player is not None:
+            self.player.stop()
+
+    def tts_status(self):
+        """Read-aloud state: 'idle', 'synthesizing', 'playing' or 'error' (with 'error' set)."""
+        if self.player is None:
+            return {"state": "idle", "text": "", "pending": False, "error": ""}
+        return self.player.status()
 
 
 # --- Eel Web App Bridge ---
+# Corpora load on background threads next to gevent's, so worker pools must
+# not fork this process.
+avoid_fork()
 app_logic = ContextFinderLayout()
-eel.init('web')
+
+
+def _push_load_progress(event):
+    """Forward source loading progress to the frontend."""
+    eel.source_load_progress(event)
+
+
+app_logic.on_load_progress = _push_load_progress
 
 
 @eel.expose
@@ -396,10 +360,7 @@ def search_word(word):
 
 @eel.expose
 def set_context_size(size):
-    try:
-        app_logic.context_size = int(size)
-    except ValueError:
-        app_logic.context_size = 1
+    app_logic.session.set_context_size(size)
 
 
 @eel.expose
@@ -413,8 +374,67 @@ def prev_result():
 
 
 @eel.expose
-def read_context():
-    return app_logic.read_context()
+def set_readings_enabled(enabled):
+    """Include furigana data with results; returns readings for the current context."""
+    return app_logic.set_readings_enabled(enabled)
+
+
+@eel.expose
+def get_results_page(offset, limit):
+    """Rendered contexts, metadata and positions for a range of results."""
+    return app_logic.get_results_page(offset, limit)
+
+
+@eel.expose
+def count_results():
+    """Exact result total, counting the remaining matches if needed."""
+    return app_logic.count_results()
+
+
+@eel.expose
+def read_context(position=None):
+    return app_logic.read_context(position)
+
+
+@eel.expose
+def stop_reading():
+    app_logic.stop_reading()
+
+
+@eel.expose
+def get_tts_status():
+    """Read-aloud state, polled by the frontend while reading."""
+    return app_logic.tts_status()
+
+
+@eel.expose
+def set_facet_filter(dimension, value=None):
+    """Restrict searches to one author, title or series (empty value: any)."""
+    return app_logic.session.set_facet_filter(dimension, value)
+
+
+@eel.expose
+def get_facets():
+    """Match counts of the current search per author, title or series."""
+    return app_logic.session.facets()
+
+
+@eel.expose
+def concordance(word, order='right', offset=0, limit=100):
+    """Key-word-in-context lines for a word, sorted by right or left context."""
+    return app_logic.session.concordance(word, order, offset, limit)
+
+
+@eel.expose
+def word_stats(word):
+    """Frequency, per-group counts and collocates of a word in the active source."""
+    return app_logic.session.word_stats(word)
+
+
+@eel.expose
+def source_frequencies(word):
+    """How often a word occurs in each loaded source."""
+    return app_logic.source_frequencies(word)
 
 
 @eel.expose
@@ -427,19 +447,39 @@ def set_source(filename):
     """Switch the active source file by filename (in RESOURCES_DIR)."""
     return app_logic.set_source(filename)
 
+@eel.expose
+def get_load_status():
+    """Latest source loading progress event (same shape as the pushed events)."""
+    return app_logic.load_status
+
+@eel.expose
+def get_morph_status():
+    """Whether inflection search and readings are available, and why not."""
+    return app_logic.morph_status()
+
+@eel.expose
+def federated_search(word):
+    """Search all detected sources at once."""
+    return app_logic.federated_search_js(word)
+
+@eel.expose
+def federated_results():
+    """Poll for late federated replies (sources still loading or counting)."""
+    return app_logic.federated_results_js()
+
 @eel.expose
 def get_current_state():
     """
     Return the current match index and total count for accurate status updates 
-    in the frontend during navigation.
+    in the frontend during navigation. While 'final' is False the total is
+    still being counted and only a lower bound.
     """
-    return {
-        "current": app_logic.current_match_index,
-        "total": len(app_logic.match_indices)
-    }
+    return app_logic.session.state()
 
 # --- Start Web UI ---
 if __name__ == '__main__':
     print("Starting Eel web interface...")
     eel.init('web')
+    # The window opens while the corpus loads; progress is pushed to it.
+    app_logic.load_in_background()
     eel.start('index.html', size=(1000, 700), mode=None)
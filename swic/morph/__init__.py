@@ -0,0 +1,13 @@
+"""
+Japanese morphological analysis on the backend.
+
+`Tokenizer` reads the kuromoji.js IPADIC dictionary bundled for the
+frontend (web/kuromoji/dict) and segments text the same way kuromoji.js
+does, giving each token its part of speech, dictionary form (lemma) and
+reading. `ReadingCache` turns sentences into furigana data for display.
+`DictionaryError` is raised when the dictionary files are missing.
+"""
+
+from .dictionary import DictionaryError, KuromojiDictionary
+from .tokenizer import Token, Tokenizer
+from .readings import ReadingCache, katakana_to_hiragana, sentence_readings
@@ -0,0 +1,210 @@
+"""
+Reader for the kuromoji.js IPADIC dictionary files (web/kuromoji/dict).
+
+The files are the gzipped, little-endian buffers kuromoji.js builds:
+
+    base.dat / check.dat    double-array trie over UTF-8 surface forms + NUL
+    tid.dat                 token info: left id, right id, cost (int16) and
+                            offset of the feature string (int32), 10 bytes
+    tid_pos.dat             NUL-terminated "surface,pos,...,reading" strings
+    tid_map.dat             trie record id -> token info offsets
+    cc.dat                  int16 connection costs, preceded by dimensions
+    unk*.dat                the same tables for unknown-word classes, plus
+                            the char.def category maps and class definitions
+"""
+
+import gzip
+import os
+import sys
+from array import array
+from typing import Dict, List, NamedTuple, Tuple
+
+DICTIONARY_FILES = (
+    'base.dat.gz', 'check.dat.gz',
+    'tid.dat.gz', 'tid_pos.dat.gz', 'tid_map.dat.gz',
+    'cc.dat.gz',
+    'unk.dat.gz', 'unk_pos.dat.gz', 'unk_map.dat.gz',
+    'unk_char.dat.gz', 'unk_compat.dat.gz', 'unk_invoke.dat.gz',
+)
+
+NOT_FOUND = -1
+TERM_CODE = 0  # Trie keys end with a NUL byte
+DEFAULT_CATEGORY = 'DEFAULT'
+
+
+class DictionaryError(Exception):
+    """Raised when the dictionary directory is missing files or unreadable."""
+
+
+class CharacterClass(NamedTuple):
+    class_id: int
+    class_name: str
+    is_always_invoke: bool
+    is_grouping: bool
+    max_length: int
+
+
+def _read(dict_dir: str, filename: str) -> bytes:
+    with gzip.open(os.path.join(dict_dir, filename), 'rb') as f:
+        return f.read()
+
+
+def _int_array(data: bytes, typecode: str) -> array:
+    values = array(typecode)
+    values.frombytes(data[:len(data) - len(data) % values.itemsize])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+class TokenInfoTable:
+    """
+    Token info entries (tid.dat / unk.dat), their feature strings and the
+    record id -> entry offsets mapping. Offsets for record `r` are
+    `targets[target_starts[r]:target_starts[r + 1]]`.
+    """
+
+    def __init__(self, info: bytes, features: bytes, target_map: bytes):
+        self._info = info
+        self._features = features
+        self.target_starts, self.targets = self._load_target_map(target_map)
+
+    @staticmethod
+    def _load_target_map(data: bytes) -> Tuple[array, array]:
+        ints = _int_array(data, 'i')
+        key_count = ints[0] if ints else 0
+        entries: Dict[int, array] = {}
+        pos = 1
+        # The buffer is zero-padded past the last record, so stop at the count.
+        while len(entries) < key_count and pos + 1 < len(ints):
+            key, size = ints[pos], ints[pos + 1]
+            entries[key] = ints[pos + 2:pos + 2 + size]
+            pos += 2 + size
+
+        starts = array('I', [0] * (max(entries, default=-1) + 2))
+        targets = array('i')
+        for key in range(len(starts) - 1):
+            targets.extend(entries.get(key, ()))
+            starts[key + 1] = len(targets)
+        return starts, targets
+
+    def targets_of(self, record_id: int) -> array:
+        if not 0 <= record_id < len(self.target_starts) - 1:
+            return array('i')
+        return self.targets[self.target_starts[record_id]:self.target_starts[record_id + 1]]
+
+    def entry(self, offset: int) -> Tuple[int, int, int]:
+        """(left_id, right_id, word_cost) of the entry at `offset`."""
+        info = self._info
+        return (
+            int.from_bytes(info[offset:offset + 2], 'little', signed=True),
+            int.from_bytes(info[offset + 2:offset + 4], 'little', signed=True),
+            int.from_bytes(info[offset + 4:offset + 6], 'little', signed=True),
+        )
+
+    def features(self, offset: int) -> List[str]:
+        pos_id = int.from_bytes(self._info[offset + 6:offset + 10], 'little', signed=True)
+        end = self._features.find(b'\0', pos_id)
+        if end < 0:
+            end = len(self._features)
+        return self._features[pos_id:end].decode('utf-8').split(',')
+
+
+class CharacterDefinition:
+    """char.def: the category of every BMP character and how unknown words of it are built."""
+
+    def __init__(self, category_map: bytes, compat_map: bytes, invoke_def: bytes):
+        self.category_map = category_map  # code point -> class id
+        self.compat_map = _int_array(compat_map, 'I')  # code point -> class id bitset
+        self.classes = self._load_classes(invoke_def)
+        self._by_name = {c.class_name: c for c in self.classes}
+
+    @staticmethod
+    def _load_classes(data: bytes) -> List[CharacterClass]:
+        classes = []
+        pos = 0
+        while pos + 1 < len(data):
+            is_always_invoke, is_grouping = data[pos], data[pos + 1]
+            max_length = int.from_bytes(data[pos + 2:pos + 6], 'little', signed=True)
+            end = data.find(b'\0', pos + 6)
+            if end < 0:
+                break
+            name = data[pos + 6:end].decode('utf-8')
+            if not name:
+                break  # Zero padding after the last class
+            classes.append(CharacterClass(
+                len(classes), name, is_always_invoke == 1, is_grouping == 1, max_length
+            ))
+            pos = end + 1
+        return classes
+
+    def lookup(self, ch: str) -> CharacterClass:
+        code = ord(ch)
+        if code < len(self.category_map):
+            class_id = self.category_map[code]
+            if class_id < len(self.classes):
+                return self.classes[class_id]
+        return self._by_name[DEFAULT_CATEGORY]
+
+
+class KuromojiDictionary:
+    """All dictionary tables needed to tokenize, loaded from `dict_dir`."""
+
+    def __init__(self, dict_dir: str):
+        missing = [f for f in DICTIONARY_FILES if not os.path.exists(os.path.join(dict_dir, f))]
+        if missing:
+            raise DictionaryError(
+                f"missing in {dict_dir}: {', '.join(missing)} "
+                "(copy the complete node_modules/kuromoji/dict folder there)"
+            )
+        try:
+            self.base = _int_array(_read(dict_dir, 'base.dat.gz'), 'i')
+            self.check = _int_array(_read(dict_dir, 'check.dat.gz'), 'i')
+            self.token_info = TokenInfoTable(
+                _read(dict_dir, 'tid.dat.gz'),
+                _read(dict_dir, 'tid_pos.dat.gz'),
+                _read(dict_dir, 'tid_map.dat.gz'),
+            )
+            costs = _int_array(_read(dict_dir, 'cc.dat.gz'), 'h')
+            self.unknown = TokenInfoTable(
+                _read(dict_dir, 'unk.dat.gz'),
+                _read(dict_dir, 'unk_pos.dat.gz'),
+                _read(dict_dir, 'unk_map.dat.gz'),
+            )
+            self.char_def = CharacterDefinition(
+                _read(dict_dir, 'unk_char.dat.gz'),
+                _read(dict_dir, 'unk_compat.dat.gz'),
+                _read(dict_dir, 'unk_invoke.dat.gz'),
+            )
+        except (OSError, ValueError, IndexError) as e:
+            raise DictionaryError(f"cannot read dictionary in {dict_dir}: {e}") from e
+
+        # cc.dat: forward dimension, backward dimension, then the matrix.
+        self.forward_size, self.backward_size = costs[0], costs[1]
+        self.costs = costs
+
+    def connection_cost(self, right_id: int, left_id: int) -> int:
+        return self.costs[right_id * self.backward_size + left_id + 2]
+
+    def common_prefixes(self, data: bytes, char_ends: List[int], start: int, first_char: int):
+        """
+        Yield (char_length, record_id) for each dictionary word that is a
+        prefix of `data[start:]`. `char_ends[k]` is the byte offset where
+        character k ends, so only whole-character prefixes are reported;
+        `first_char` is the index of the character starting at `start`.
+        """
+        base, check = self.base, self.check
+        size = len(check)
+        parent = 0
+        pos = start
+        for k in range(first_char, len(char_ends)):
+            end = char_ends[k]
+            while pos < end:
+                child = base[parent] + data[pos]
+                if not 0 <= child < size or check[child] != parent:
+                    return
+                parent = child
+                pos += 1
+            leaf = base[parent] + TERM_CODE
+            if 0 <= leaf < size and check[leaf] == parent and base[leaf] <= 0:
+                yield k - first_char + 1, -base[leaf] - 1
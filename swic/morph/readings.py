@@ -0,0 +1,63 @@
+"""
+Furigana data for display: each sentence becomes a list of
+[surface, reading] pairs, the reading in hiragana and only given for
+tokens that contain kanji. The frontend places the ruby text itself.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Hashable, List
+
+from .tokenizer import Tokenizer
+
+# Same ranges the frontend uses to decide which characters get ruby.
+_KANJI = re.compile(r'[\u4E00-\u9FFF\u3400-\u4DBF\uF900-\uFAFF\u3005\u3007]')
+_KATAKANA_TO_HIRAGANA = {c: c - 0x60 for c in range(0x30A1, 0x30F7)}
+
+
+def katakana_to_hiragana(text: str) -> str:
+    return text.translate(_KATAKANA_TO_HIRAGANA)
+
+
+def sentence_readings(tokenizer: Tokenizer, sentence: str) -> List[List[str]]:
+    readings = []
+    for token in tokenizer.tokenize(sentence):
+        reading = ''
+        if token.reading and _KANJI.search(token.surface):
+            reading = katakana_to_hiragana(token.reading)
+        readings.append([token.surface, reading])
+    return readings
+
+
+class ReadingCache:
+    """
+    Readings of recently displayed sentences, keyed by (corpus key, sentence
+    index) and evicted least-recently-used first beyond `max_sentences`.
+    Stepping through results re-displays overlapping context windows, so
+    most sentences are tokenized once.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, max_sentences: int):
+        self.tokenizer = tokenizer
+        self.max_sentences = max_sentences
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, corpus_key: Hashable, index: int, sentence: str) -> List[List[str]]:
+        key = (corpus_key, index)
+        with self._lock:
+            readings = self._entries.get(key)
+            if readings is not None:
+                self._entries.move_to_end(key)
+                return readings
+
+        readings = sentence_readings(self.tokenizer, sentence)
+        with self._lock:
+            self._entries[key] = readings
+            while len(self._entries) > self.max_sentences:
+                self._entries.popitem(last=False)
+        return readings
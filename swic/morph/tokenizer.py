@@ -0,0 +1,149 @@
+"""
+Morphological analysis with the kuromoji.js dictionary: a Python port of
+kuromoji's lattice construction and Viterbi search, so the backend splits
+text exactly as the browser does.
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Optional
+
+from .dictionary import KuromojiDictionary
+
+# kuromoji.js tokenizes each clause separately, splitting after 、 and 。.
+_CLAUSE_END = re.compile(r'(?<=[、。])')
+
+# IPADIC feature columns (after the surface form).
+_POS, _BASIC_FORM, _READING = 1, 7, 8
+
+
+class Token(NamedTuple):
+    surface: str
+    start: int  # Character offset in the tokenized text
+    pos: str  # Part of speech (品詞)
+    basic_form: str  # Dictionary form; the surface when the dictionary has none
+    reading: str  # Katakana reading, '' when unknown
+    known: bool  # Found in the dictionary (False for unknown-word guesses)
+
+    @property
+    def lemma(self) -> str:
+        return self.basic_form
+
+
+class _Node:
+    __slots__ = ('start', 'length', 'left_id', 'right_id', 'cost', 'known', 'entry', 'prev')
+
+    def __init__(self, start, length, left_id, right_id, cost, known, entry, prev):
+        self.start = start
+        self.length = length
+        self.left_id = left_id
+        self.right_id = right_id
+        self.cost = cost  # Cost of the best path from BOS through this node
+        self.known = known
+        self.entry = entry  # Token info offset
+        self.prev = prev
+
+
+class Tokenizer:
+    """
+    Splits Japanese text into tokens. Construction loads the dictionary
+    (tens of MB, about a second); share one instance.
+    """
+
+    def __init__(self, dict_dir: Optional[str] = None, dictionary: Optional[KuromojiDictionary] = None):
+        if dictionary is None:
+            dictionary = KuromojiDictionary(dict_dir)
+        self.dic = dictionary
+
+    def tokenize(self, text: str) -> List[Token]:
+        tokens = []
+        offset = 0
+        for clause in _CLAUSE_END.split(text):
+            if clause:
+                tokens.extend(self._tokenize_clause(clause, offset))
+                offset += len(clause)
+        return tokens
+
+    def lemmas(self, text: str) -> List[str]:
+        return [t.basic_form for t in self.tokenize(text)]
+
+    def _best_path(self, text: str) -> List[_Node]:
+        """
+        Build the lattice left to right and keep, for every node, only its
+        cheapest predecessor (nodes that start at a position are complete
+        once every node ending there is known).
+        """
+        dic = self.dic
+        token_info, unknown, char_def = dic.token_info, dic.unknown, dic.char_def
+        costs, backward_size = dic.costs, dic.backward_size
+
+        data = text.encode('utf-8')
+        char_ends = []
+        pos = 0
+        for ch in text:
+            pos += len(ch.encode('utf-8'))
+            char_ends.append(pos)
+
+        n = len(text)
+        bos = _Node(0, 0, 0, 0, 0, True, -1, None)
+        ends_at: List[List[_Node]] = [[] for _ in range(n + 1)]
+        ends_at[0].append(bos)
+
+        def connect(start, length, known, entry, left_id, right_id, word_cost):
+            best, best_cost = None, None
+            for prev in ends_at[start]:
+                c = prev.cost + costs[prev.right_id * backward_size + left_id + 2] + word_cost
+                if best_cost is None or c < best_cost:
+                    best, best_cost = prev, c
+            ends_at[start + length].append(
+                _Node(start, length, left_id, right_id, best_cost, known, entry, best)
+            )
+
+        for start in range(n):
+            if not ends_at[start]:
+                continue  # Unreachable position
+            byte_start = char_ends[start - 1] if start else 0
+            found = False
+            for length, record_id in dic.common_prefixes(data, char_ends, byte_start, start):
+                found = True
+                for entry in token_info.targets_of(record_id):
+                    left_id, right_id, word_cost = token_info.entry(entry)
+                    connect(start, length, True, entry, left_id, right_id, word_cost)
+
+            head = char_def.lookup(text[start])
+            if not found or head.is_always_invoke:
+                length = 1
+                if head.is_grouping:
+                    name = head.class_name
+                    while start + length < n and char_def.lookup(text[start + length]).class_name == name:
+                        length += 1
+                for entry in unknown.targets_of(head.class_id):
+                    left_id, right_id, word_cost = unknown.entry(entry)
+                    connect(start, length, False, entry, left_id, right_id, word_cost)
+
+        best, best_cost = None, None
+        for prev in ends_at[n]:
+            c = prev.cost + costs[prev.right_id * backward_size + 2]  # EOS left id is 0
+            if best_cost is None or c < best_cost:
+                best, best_cost = prev, c
+
+        path = []
+        while best is not None and best is not bos:
+            path.append(best)
+            best = best.prev
+        path.reverse()
+        return path
+
+    def _tokenize_clause(self, text: str, offset: int) -> Iterator[Token]:
+        for node in self._best_path(text):
+            surface = text[node.start:node.start + node.length]
+            table = self.dic.token_info if node.known else self.dic.unknown
+            features = table.features(node.entry)
+            features += [''] * (_READING + 1 - len(features))
+            basic_form = features[_BASIC_FORM]
+            if not basic_form or basic_form == '*':
+                basic_form = surface
+            reading = features[_READING] if node.known else ''
+            yield Token(
+                surface, offset + node.start, features[_POS], basic_form,
+                '' if reading == '*' else reading, node.known,
+            )
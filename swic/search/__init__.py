@@ -0,0 +1,54 @@
+"""
+Search engines over the loaded sentence list.
+
+Engines share the `BaseSearchEngine` interface: build once after
+`load_data`, then answer literal substring queries with sorted
+sentence indices. `get_engine_for_filename` picks the engine for a
+source from a filename-substring mapping (see `SEARCH_ENGINES` in
+config.py), so large corpora can pay for a heavier index while small
+ones skip the build. `FederatedSearcher` (search.federated) queries
+several sources at once, one resident corpus per worker process. `ResultCache` keeps finished
+match sets compressed so repeated queries skip the engine. `search.query`
+parses boolean/regex/proximity queries and plans them over an engine;
+queries report their match offsets, which `search.highlight` turns into
+escaped, highlighted HTML. `search.concordance` lists a word's
+occurrences sorted by their right or left context (KWIC), and
+`search.facets` filters and counts matches by author, title or series.
+"""
+
+from typing import Dict, Optional
+
+from .base import BaseSearchEngine
+from .cursor import MatchCursor
+from .linear_scan import LinearScanEngine
+from .ngram_index import NgramIndex
+from .result_cache import ResultCache
+from .suffix_array import SuffixArrayIndex
+
+
+ENGINES = {
+    'scan': LinearScanEngine,
+    'ngram': NgramIndex,
+    'suffix_array': SuffixArrayIndex,
+}
+
+
+def get_engine(name: str) -> BaseSearchEngine:
+    try:
+        return ENGINES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown search engine: {name!r}") from None
+
+
+def get_engine_for_filename(
+    filename: str,
+    engine_map: Optional[Dict[str, str]] = None,
+    default: str = 'ngram',
+) -> BaseSearchEngine:
+    name = (filename or "").lower()
+
+    for key, engine_name in (engine_map or {}).items():
+        if key.lower() in name:
+            return get_engine(engine_name)
+
+    return get_engine(default)
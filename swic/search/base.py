@@ -0,0 +1,70 @@
+import threading
+from typing import Iterator, List, Optional, Sequence
+
+# Scans that can be stopped check their stop event after this many sentences.
+STOP_CHECK_SENTENCES = 4096
+
+
+def stoppable(items, stop: threading.Event):
+    """`items`, ending early once `stop` is set (checked every STOP_CHECK_SENTENCES items)."""
+    for n, item in enumerate(items):
+        if n % STOP_CHECK_SENTENCES == 0 and stop.is_set():
+            return
+        yield item
+
+
+def iter_scan_sentences(
+    sentences: Sequence[str], word: str, stop: Optional[threading.Event] = None
+) -> Iterator[int]:
+    """
+    Lazy linear scan for `word`. Uses the sequence's own `iter_scan` when it
+    has one (a `SentenceStore` searches its whole buffer without decoding).
+    The scan ends early once `stop` is set.
+    """
+    if not word:
+        return iter(())
+    iter_scan = getattr(sentences, 'iter_scan', None)
+    if iter_scan is not None:
+        return iter_scan(word, stop)
+    if stop is None:
+        return (i for i, s in enumerate(sentences) if word in s)
+    return (i for i, s in stoppable(enumerate(sentences), stop) if word in s)
+
+
+def scan_sentences(sentences: Sequence[str], word: str) -> List[int]:
+    return list(iter_scan_sentences(sentences, word))
+
+
+class BaseSearchEngine:
+    """
+    Interface for sentence-level substring search engines. Call `build` once
+    with the loaded sentences; `iter_matches` then yields the indices of all
+    sentences that contain the query as a literal substring, in ascending
+    order and as lazily as the engine allows.
+
+    `iter_matches` takes an optional `stop` event: once it is set, long
+    scans end early, leaving the hits incomplete. Background counts use it
+    to give up promptly when their search is superseded, even while no
+    hits turn up.
+    """
+
+    def build(self, sentences: Sequence[str]) -> None:
+        raise NotImplementedError
+
+    def iter_matches(self, word: str, stop: Optional[threading.Event] = None) -> Iterator[int]:
+        raise NotImplementedError
+
+    def find(self, word: str) -> List[int]:
+        return list(self.iter_matches(word))
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index, for corpus memory budgets."""
+        return 0
+
+    def match_count(self, word: str) -> Optional[int]:
+        """
+        Number of matching sentences if the engine can tell without
+        enumerating them, else None.
+        """
+        return None
@@ -0,0 +1,57 @@
+"""
+Key-word-in-context (KWIC) concordances.
+
+A concordance lists every occurrence of a literal word with the text
+around it, in corpus order or sorted by the context to its right or its
+left (nearest character first), which lines up recurring patterns such
+as 〜てしまう. Engines with their own `concordance` answer it
+(`SuffixArrayIndex` lists occurrences in suffix order, already sorted by
+right context); with other engines the matching sentences are scanned
+for occurrences and sorted on the first SORT_KEY_CHARS characters of
+their context.
+"""
+
+from typing import List, Sequence, Tuple
+
+from .highlight import find_spans
+
+ORDERS = ('right', 'left', 'corpus')
+
+# Occurrences are sorted on at most this many characters of context (right
+# context of the suffix array excepted); ties beyond it keep corpus order.
+SORT_KEY_CHARS = 32
+
+Occurrence = Tuple[int, int]  # Sentence index, character offset
+
+
+def concordance(engine, sentences: Sequence[str], word: str, order: str = 'right') -> List[Occurrence]:
+    """Every occurrence of `word` as (sentence index, offset), in `order` (see ORDERS)."""
+    if order not in ORDERS:
+        raise ValueError(f"Unknown concordance order: {order!r}")
+    if not word:
+        return []
+    ordered = getattr(engine, 'concordance', None)
+    if ordered is not None:
+        return ordered(word, order)
+
+    # Each matching sentence is read once, for its occurrences and their keys.
+    occurrences: List[Occurrence] = []
+    keys: List[str] = []
+    length = len(word)
+    for i in engine.iter_matches(word):
+        sentence = sentences[i]
+        for start, _ in find_spans(sentence, word):
+            occurrences.append((i, start))
+            if order == 'right':
+                keys.append(sentence[start + length:start + length + SORT_KEY_CHARS])
+            elif order == 'left':
+                keys.append(sentence[max(0, start - SORT_KEY_CHARS):start][::-1])
+    if order == 'corpus':
+        return occurrences
+    return [occurrences[k] for k in sorted(range(len(keys)), key=keys.__getitem__)]
+
+
+def kwic_line(sentence: str, offset: int, length: int, width: int) -> Tuple[str, str, str]:
+    """(left, match, right) of one occurrence, with up to `width` characters either side."""
+    end = offset + length
+    return sentence[max(0, offset - width):offset], sentence[offset:end], sentence[end:end + width]
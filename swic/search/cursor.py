@@ -0,0 +1,149 @@
+import threading
+from array import array
+from typing import Callable, Iterator, List, Optional
+
+
+class MatchCursor:
+    """
+    Walks the matches of one query without materialising them up front.
+
+    Hits are pulled from the engine's lazy `iter_matches` only as far as
+    navigation needs and remembered in a compact `array('I')`, so `prev`
+    can step back. The total is either supplied by the engine's index, or
+    counted on a background thread over a second iterator; `final` turns
+    True once it is exact. Going backwards past the first hit has to know
+    the last one, so it drains the remaining matches.
+
+    Whichever pass first sees every match hands the complete, sorted hit
+    array to `on_complete` (e.g. to fill a result cache).
+    """
+
+    def __init__(
+        self,
+        matches: Iterator[int],
+        total: Optional[int] = None,
+        on_complete: Optional[Callable[[array], None]] = None,
+    ):
+        self._matches = matches
+        self._hits = array('I')
+        self._exhausted = False
+        self._total = total
+        self._counted = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._on_complete = on_complete
+        self.position = -1
+
+    @classmethod
+    def empty(cls) -> 'MatchCursor':
+        return cls(iter(()), 0)
+
+    # --- Counting ---
+
+    @property
+    def final(self) -> bool:
+        return self._total is not None
+
+    @property
+    def count(self) -> int:
+        """Exact total once final, otherwise the number of hits seen so far."""
+        with self._lock:
+            if self._total is not None:
+                return self._total
+            return max(len(self._hits), self._counted)
+
+    def count_in_background(self, make_iter: Callable[[threading.Event], Iterator[int]]) -> None:
+        """
+        Start counting all matches on a daemon thread unless the total is
+        known. `make_iter(stop)` returns the matches, ending early once
+        `stop` is set (see BaseSearchEngine.iter_matches), so a count that
+        close() cancels stops scanning even while no hits turn up.
+        """
+        if self.final:
+            return
+        threading.Thread(target=self._count, args=(make_iter,), daemon=True).start()
+
+    def _count(self, make_iter: Callable[[threading.Event], Iterator[int]]) -> None:
+        hits = array('I')
+        for i in make_iter(self._stop):
+            hits.append(i)
+            if len(hits) % 4096 == 0:
+                if self._stop.is_set() or self.final:
+                    return
+                self._counted = len(hits)
+        self._complete(hits)  # A no-op if stopped, as the hits may be incomplete
+
+    def _complete(self, hits: array) -> None:
+        """Record the exact total and report the full hit list once."""
+        with self._lock:
+            if self._total is not None or self._stop.is_set():
+                return
+            self._total = len(hits)
+        if self._on_complete is not None:
+            self._on_complete(hits)
+
+    def close(self) -> None:
+        """Stop any background count; call when the cursor is replaced."""
+        self._stop.set()
+
+    # --- Navigation ---
+
+    def _fetch(self, index: int) -> bool:
+        """Pull hits until `index` is available; False if there are fewer matches."""
+        hits = self._hits
+        while len(hits) <= index and not self._exhausted:
+            nxt = next(self._matches, None)
+            if nxt is None:
+                self._exhausted = True
+                self._complete(hits)
+            else:
+                hits.append(nxt)
+        return index < len(hits)
+
+    @property
+    def current(self) -> Optional[int]:
+        """Sentence index of the current hit, or None before the first move."""
+        if self.position < 0:
+            return None
+        return self._hits[self.position]
+
+    def page(self, offset: int, limit: int) -> List[int]:
+        """Sentence indices of hits [offset, offset + limit); fewer past the end."""
+        if offset < 0 or limit <= 0:
+            return []
+        self._fetch(offset + limit - 1)
+        return self._hits[offset:offset + limit].tolist()
+
+    def seek(self, position: int) -> Optional[int]:
+        """Make hit `position` current if it exists; returns the current hit."""
+        if position >= 0 and self._fetch(position):
+            self.position = position
+        return self.current
+
+    def drain(self) -> int:
+        """Pull every remaining hit; returns the exact total."""
+        while self._fetch(len(self._hits)):
+            pass
+        return len(self._hits)
+
+    def first(self) -> Optional[int]:
+        self.position = 0 if self._fetch(0) else -1
+        return self.current
+
+    def next(self) -> Optional[int]:
+        if self.position < 0:
+            return self.first()
+        if self._fetch(self.position + 1):
+            self.position += 1
+        else:  # Loop back to start
+            self.position = 0
+        return self.current
+
+    def prev(self) -> Optional[int]:
+        if self.position < 0:
+            return self.first()
+        if self.position > 0:
+            self.position -= 1
+        else:  # Loop back to end
+            self.position = self.drain() - 1
+        return self.current
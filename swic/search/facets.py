@@ -0,0 +1,140 @@
+"""
+Metadata facets: filtering and counting matches by author, title or series.
+
+For each grouping dimension of a source (author and title for Aozora,
+series for Buncha Anime; see search.stats.metadata_groups) every value
+keeps the runs of consecutive sentences that carry it, which is compact
+since works and episodes are contiguous, and every sentence its value id.
+
+Filtering works on bitmaps (Python ints, bit i for sentence i): a
+selection becomes a bitmap once when it is chosen, the match set of a
+query once per query (`bitmap_of`), and restricting the matches is then
+a single AND. Facet counts tally the value ids of the matches.
+"""
+
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .stats import Groups
+
+_NONZERO_BYTE = re.compile(rb'[^\x00]')
+_BYTE_BITS = [tuple(b for b in range(8) if v >> b & 1) for v in range(256)]
+
+
+def bitmap_of(indices: Iterable[int], size: int) -> int:
+    """Bitmap (bit i set for each i in `indices`) of sentence indices below `size`."""
+    buf = bytearray((size + 7) // 8)
+    for i in indices:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def bitmap_indices(bits: int) -> array:
+    """The set bits of `bits` as sorted sentence indices."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    out = array('I')
+    for m in _NONZERO_BYTE.finditer(data):
+        base = m.start() * 8
+        out.extend(base + b for b in _BYTE_BITS[data[m.start()]])
+    return out
+
+
+def _runs(groups: Sequence[int]) -> Iterable[Tuple[int, int, int]]:
+    """(group, start, end) of each run of equal group ids."""
+    start = 0
+    for i in range(1, len(groups) + 1):
+        if i == len(groups) or groups[i] != groups[start]:
+            yield groups[start], start, i
+            start = i
+
+
+def _set_range(buf: bytearray, start: int, end: int) -> None:
+    """Set bits [start, end) of a little-endian bit buffer."""
+    while start < end and start & 7:
+        buf[start >> 3] |= 1 << (start & 7)
+        start += 1
+    full_end = end & ~7
+    if start < full_end:
+        buf[start >> 3:full_end >> 3] = b'\xff' * ((full_end - start) >> 3)
+        start = full_end
+    while start < end:
+        buf[start >> 3] |= 1 << (start & 7)
+        start += 1
+
+
+class FacetIndex:
+    """
+    dimension -> value -> the runs of sentences carrying it, built once per
+    loaded source, plus each sentence's value id for counting. A selection
+    is {dimension: value}; sentences must match every entry.
+    """
+
+    def __init__(self, groups: Dict[str, Groups], size: int):
+        self.size = size  # Sentence count
+        self.dimensions: Dict[str, List[str]] = {}  # dimension -> value labels
+        self._value_ids: Dict[str, Dict[str, int]] = {}
+        self._groups: Dict[str, array] = {}  # dimension -> value id of each sentence
+        self._runs: Dict[str, List[array]] = {}  # dimension -> flat (start, end) pairs per value
+        for dimension, (labels, sentence_groups) in groups.items():
+            self.dimensions[dimension] = labels
+            self._value_ids[dimension] = {label: i for i, label in enumerate(labels)}
+            self._groups[dimension] = sentence_groups
+            runs = [array('I') for _ in labels]
+            for value_id, start, end in _runs(sentence_groups):
+                runs[value_id].extend((start, end))
+            self._runs[dimension] = runs
+
+    def __bool__(self) -> bool:
+        return bool(self.dimensions)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            sum(r.itemsize * len(r) for runs in self._runs.values() for r in runs)
+            + sum(g.itemsize * len(g) for g in self._groups.values())
+        )
+
+    def _value_id(self, dimension: str, value: str) -> int:
+        ids = self._value_ids.get(dimension)
+        if ids is None:
+            raise ValueError(f"Unknown facet for this source: {dimension!r}")
+        value_id = ids.get(value)
+        if value_id is None:
+            raise ValueError(f"Unknown {dimension}: {value!r}")
+        return value_id
+
+    def bitmap(self, dimension: str, value: str) -> int:
+        """Bitmap of the sentences whose `dimension` is `value`. Raises ValueError if unknown."""
+        value_id = self._value_id(dimension, value)
+        runs = self._runs[dimension][value_id]
+        buf = bytearray((self.size + 7) // 8)
+        for k in range(0, len(runs), 2):
+            _set_range(buf, runs[k], runs[k + 1])
+        return int.from_bytes(buf, 'little')
+
+    def mask(self, selection: Dict[str, str]) -> Optional[int]:
+        """Bitmap of the sentences matching every entry of `selection`; None when it is empty."""
+        mask = None
+        for dimension, value in selection.items():
+            bits = self.bitmap(dimension, value)
+            mask = bits if mask is None else mask & bits
+        return mask
+
+    def contains(self, selection: Dict[str, str], index: int) -> bool:
+        """Whether sentence `index` matches every entry of `selection`."""
+        return all(
+            self._groups[d][index] == self._value_id(d, value) for d, value in selection.items()
+        )
+
+    def counts(self, hits: Iterable[int], dimension: str, limit: Optional[int] = None) -> Tuple[List[Tuple[str, int]], int]:
+        """
+        (value, matches) for the values of `dimension` among the sentence
+        indices `hits`, most matches first and at most `limit`, and the
+        number of such values.
+        """
+        labels = self.dimensions[dimension]
+        counted = Counter(map(self._groups[dimension].__getitem__, hits))
+        ranked = [(labels[value_id], n) for value_id, n in counted.most_common(limit)]
+        return ranked, len(counted)
@@ -0,0 +1,334 @@
+"""
+Federated search: one resident corpus per worker process, queried in
+parallel.
+
+Each source gets a long-lived worker that loads its store (through the
+corpus cache), builds the source's configured engine and then answers
+queries over a pipe. Queries use the full query language (see
+search.query); ~lemma terms are answered from a source's saved lemma
+index when it has a current one. `FederatedSearcher.search` sends the
+query to every worker and returns at once with whatever replies are
+already in; `collect` picks up later ones, so a source that is still
+loading or slow on a huge corpus never holds back the others or the
+caller.
+
+`ResidentFederatedSearch` gives the same replies for corpora already
+loaded in this process (the server's), answering on one background
+thread per source.
+"""
+
+import os
+import threading
+import time
+from itertools import islice, zip_longest
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional
+
+from corpus import load_store, sentence_metadata
+from corpus.parallel import process_context
+from morph import Tokenizer
+
+from . import get_engine_for_filename
+from .highlight import highlight
+from .lemma_index import load_lemma_index
+from .query import Query
+
+
+class _NewRequest:
+    """Stop event for a worker's scans: set once the next request is waiting on its pipe."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def is_set(self) -> bool:
+        return self._conn.poll()
+
+
+def first_hits(query: Query, store, engine, lemmas, limit: int, stop):
+    """
+    (first `limit` matching sentence indices, match count or None if not
+    known yet, iterator over the remaining matches) for one source. Plain
+    words stay lazy; other queries are evaluated in full. Scans end early
+    once `stop` is set.
+    """
+    word = query.literal
+    if word is None:
+        hits = query.evaluate(store, engine, lemmas, stop)
+        return list(hits[:limit]), None if stop.is_set() else len(hits), iter(())
+    matches = engine.iter_matches(word, stop)
+    hits = list(islice(matches, limit))
+    count = engine.match_count(word)
+    if count is None and len(hits) < limit and not stop.is_set():
+        count = len(hits)
+    return hits, count, matches
+
+
+def hit_entries(query: Query, store, engine, lemmas, indices, source_path: str) -> List[Dict]:
+    """Reply entries for hit sentences, the query's matches highlighted."""
+    return [
+        {
+            'sentence': i,
+            'text': highlight(store[i], [(s.start, s.end) for s in query.spans(store, engine, [i], lemmas)]),
+            'metadata': sentence_metadata(store, i, source_path),
+        }
+        for i in indices
+    ]
+
+
+def merged_reply(query_id, names, replies: Dict, unanswered: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    The reply to a federated search: per-source counts and statuses plus
+    the hits of all answered sources merged round-robin, each labelled
+    with its source. `replies` maps a source name to ('result', {'count',
+    'hits'}) or ('error', message). A source without a reply has its
+    status from `unanswered` ('loading' or 'error'), else 'pending'.
+    """
+    unanswered = unanswered or {}
+    sources = []
+    per_source_hits = []
+    for name in names:
+        reply = replies.get(name)
+        if reply is None:
+            status = unanswered.get(name, 'pending')
+            sources.append({'source': name, 'status': status, 'count': None})
+            continue
+        kind, payload = reply
+        if kind == 'error':
+            sources.append({'source': name, 'status': 'error', 'count': None, 'error': payload})
+            continue
+        # A count of None means the source is still counting; the hits
+        # are already usable.
+        sources.append({
+            'source': name,
+            'status': 'ok' if payload['count'] is not None else 'counting',
+            'count': payload['count'],
+        })
+        per_source_hits.append([dict(hit, source=name) for hit in payload['hits']])
+
+    results = [
+        hit
+        for group in zip_longest(*per_source_hits)
+        for hit in group if hit is not None
+    ]
+    return {
+        'query_id': query_id,
+        'complete': all(s['status'] in ('ok', 'error') for s in sources),
+        'sources': sources,
+        'results': results,
+    }
+
+
+def _source_worker(conn, source_path, engine_map, default_engine, use_cache, dict_dir):
+    """Worker loop: load one corpus, then answer (query_id, query text, limit) requests."""
+    try:
+        store, _ = load_store(source_path, use_cache=use_cache)
+        engine = get_engine_for_filename(
+            os.path.basename(source_path), engine_map, default_engine
+        )
+        engine.build(store)
+    except Exception as e:
+        conn.send(('error', None, str(e)))
+        return
+    conn.send(('ready', None, len(store)))
+
+    lemmas = None
+    lemmas_tried = dict_dir is None
+    stop = _NewRequest(conn)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        query_id, text, limit = request
+        try:
+            query = Query(text)
+            if query.uses_lemmas and not lemmas_tried:
+                # Only a saved index: building one here would take as long as a full load.
+                lemmas_tried = True
+                lemmas = load_lemma_index(source_path, store, Tokenizer(dict_dir), dict_dir)
+            indices, count, rest = first_hits(query, store, engine, lemmas, limit, stop)
+            hits = hit_entries(query, store, engine, lemmas, indices, source_path)
+            conn.send(('result', query_id, {'count': count, 'hits': hits}))
+            if count is not None:
+                continue
+
+            # Count the rest after the hits went out, giving up as soon as
+            # a newer query is waiting.
+            count = len(indices) + sum(1 for _ in rest)
+            if not stop.is_set():
+                conn.send(('count', query_id, count))
+        except Exception as e:
+            conn.send(('error', query_id, str(e)))
+
+
+class FederatedSearcher:
+    """Searches several sources concurrently, one worker process per source."""
+
+    def __init__(
+        self,
+        source_paths: List[str],
+        engine_map: Optional[Dict[str, str]] = None,
+        default_engine: str = 'ngram',
+        use_cache: bool = True,
+        dict_dir: Optional[str] = None,
+    ):
+        self.source_paths = list(source_paths)
+        self._engine_map = engine_map
+        self._default_engine = default_engine
+        self._use_cache = use_cache
+        self._dict_dir = dict_dir  # Kuromoji dictionary of the saved lemma indexes, if any
+        self._workers = {}   # source name -> (process, connection)
+        self._status = {}    # source name -> 'loading' | 'ready' | 'error'
+        self._query_id = 0
+        self._replies = {}   # source name -> reply for the latest query
+
+    def start(self) -> None:
+        ctx = process_context()
+        for path in self.source_paths:
+            name = os.path.basename(path)
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_source_worker,
+                args=(child_conn, path, self._engine_map,
+                      self._default_engine, self._use_cache, self._dict_dir),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            self._workers[name] = (proc, parent_conn)
+            self._status[name] = 'loading'
+
+    def close(self) -> None:
+        for proc, conn in self._workers.values():
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+            proc.join(timeout=1)
+            if proc.is_alive():
+                proc.terminate()
+        self._workers = {}
+
+    def _answered(self, name: str) -> bool:
+        """True once the latest query's hits and final count are in."""
+        reply = self._replies.get(name)
+        return reply is not None and (reply[0] == 'error' or reply[1]['count'] is not None)
+
+    def _drain(self, timeout: float) -> None:
+        """Read the replies that have arrived, waiting up to `timeout` seconds for more."""
+        deadline = time.monotonic() + timeout
+        conn_names = {conn: name for name, (_, conn) in self._workers.items()}
+        while True:
+            waiting = [
+                conn for conn, name in conn_names.items()
+                if self._status[name] != 'error' and not self._answered(name)
+            ]
+            remaining = max(0.0, deadline - time.monotonic())
+            ready = wait(waiting, remaining) if waiting else []
+            if not ready:
+                return
+            for conn in ready:
+                name = conn_names[conn]
+                try:
+                    kind, query_id, payload = conn.recv()
+                except EOFError:
+                    self._status[name] = 'error'
+                    continue
+                if kind == 'ready':
+                    self._status[name] = 'ready'
+                elif query_id is None:
+                    self._status[name] = 'error'
+                    print(f"Federated worker for {name} failed: {payload}")
+                elif query_id != self._query_id:
+                    continue  # Replies to superseded queries are dropped.
+                elif kind == 'count':
+                    self._replies[name][1]['count'] = payload
+                else:
+                    self._replies[name] = (kind, payload)
+
+    def search(self, query: str, limit: int = 5, timeout: float = 0.0) -> Dict:
+        """
+        Send `query` to every source and return the replies already in (or
+        arriving within `timeout` seconds); poll `collect` for the rest.
+        Raises QueryError for a query that cannot be parsed.
+        """
+        Query(query)  # Refuse bad syntax here rather than once per source
+        if not self._workers:
+            self.start()
+        self._query_id += 1
+        self._replies = {}
+        for name, (_, conn) in self._workers.items():
+            if self._status[name] != 'error':
+                conn.send((self._query_id, query, limit))
+        return self.collect(timeout)
+
+    def collect(self, timeout: float = 0.0) -> Dict:
+        """Gather replies for the latest query (see merged_reply)."""
+        self._drain(timeout)
+        unanswered = {name: status for name, status in self._status.items() if status != 'ready'}
+        return merged_reply(self._query_id, list(self._workers), self._replies, unanswered)
+
+
+class ResidentFederatedSearch:
+    """
+    Federated search over corpora already loaded in this process, one per
+    client. `search` returns at once; a background thread per source finds
+    its first hits, then counts its remaining matches, so a slow source
+    never holds back the replies of the others, and `collect` reports what
+    they have so far. A new search or close() stops the previous one's
+    threads, in the middle of evaluating a query too.
+    """
+
+    def __init__(self, corpora: Dict):
+        self.corpora = corpora  # name -> LoadedCorpus
+        self._query_id = 0
+        self._replies = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def search(self, query: str, limit: int = 5) -> Dict:
+        """Start searching every source for `query`. Raises QueryError if it cannot be parsed."""
+        parsed = Query(query)
+        with self._lock:
+            self._stop.set()
+            self._stop = stop = threading.Event()
+            self._query_id += 1
+            self._replies = replies = {}
+        for name, corpus in self.corpora.items():
+            threading.Thread(
+                target=self._run, args=(name, corpus, parsed, limit, replies, stop), daemon=True
+            ).start()
+        return self.collect()
+
+    def collect(self) -> Dict:
+        """What the latest search has found so far (see merged_reply)."""
+        with self._lock:
+            return merged_reply(self._query_id, list(self.corpora), self._replies)
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def _run(self, name: str, corpus, query: Query, limit: int, replies: Dict, stop: threading.Event) -> None:
+        store, engine, lemmas = corpus.store, corpus.engine, corpus.lemmas
+        try:
+            indices, count, rest = first_hits(query, store, engine, lemmas, limit, stop)
+            hits = hit_entries(query, store, engine, lemmas, indices, corpus.source_path)
+            reply = ('result', {'count': count, 'hits': hits})
+        except Exception as e:
+            reply = ('error', str(e))
+        if stop.is_set():
+            return
+        with self._lock:
+            replies[name] = reply
+        if reply[0] != 'result' or count is not None:
+            return
+
+        # The hits are out; now count the rest.
+        count = len(indices) + sum(1 for _ in rest)
+        if stop.is_set():
+            return
+        with self._lock:
+            replies[name][1]['count'] = count
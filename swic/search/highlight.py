@@ -0,0 +1,68 @@
+"""
+Highlighting from match offsets.
+
+Queries report what they matched as `MatchSpan`s (sentence index, start,
+end; character offsets into that sentence), so the text is not searched
+again for display. `highlight` writes one sentence in a single pass,
+HTML-escaping the corpus text and wrapping each merged span in <strong>.
+"""
+
+from html import escape
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+Span = Tuple[int, int]
+
+
+class MatchSpan(NamedTuple):
+    sentence: int
+    start: int
+    end: int
+
+
+def find_spans(text: str, term: str) -> List[Span]:
+    """Every occurrence of `term` in `text`, overlapping ones included."""
+    spans = []
+    if not term:
+        return spans
+    pos = text.find(term)
+    while pos >= 0:
+        spans.append((pos, pos + len(term)))
+        pos = text.find(term, pos + 1)
+    return spans
+
+
+def merge_spans(spans: Iterable[Span]) -> List[Span]:
+    """Sort spans and join overlapping or touching ones; empty spans are dropped."""
+    merged: List[List[int]] = []
+    for start, end in sorted(spans):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def spans_by_sentence(spans: Iterable[MatchSpan], start: int, end: int) -> List[List[Span]]:
+    """Merged (start, end) spans for each sentence in [start, end)."""
+    grouped: Dict[int, List[Span]] = {}
+    for span in spans:
+        if start <= span.sentence < end:
+            grouped.setdefault(span.sentence, []).append((span.start, span.end))
+    return [merge_spans(grouped.get(i, ())) for i in range(start, end)]
+
+
+def highlight(text: str, spans: Iterable[Span], tag: str = 'strong') -> str:
+    """HTML for `text` with each span wrapped in <tag>; `spans` need not be merged."""
+    parts = []
+    pos = 0
+    for start, end in merge_spans(spans):
+        start, end = max(start, pos), min(end, len(text))
+        if start >= end:
+            continue
+        parts.append(escape(text[pos:start], quote=False))
+        parts.append(f'<{tag}>{escape(text[start:end], quote=False)}</{tag}>')
+        pos = end
+    parts.append(escape(text[pos:], quote=False))
+    return ''.join(parts)
@@ -0,0 +1,228 @@
+"""
+Lemma (dictionary form) index for inflection-insensitive search.
+
+Every sentence is tokenized once when the index is built; each token's
+dictionary form gets the sentence appended to its posting list, so 食べる
+finds 食べた, 食べない and 食べます with a single lookup. Built indexes are saved
+next to the source (<source>.swlemma) and reused while the source, the
+sentence count and the dictionary are unchanged.
+
+The tokenization pass itself is public: analyze_sentences yields each
+sentence's Analysis, which is given to LemmaIndex.add and, in the same
+pass, to the word statistics (search.stats), so a corpus is tokenized
+once for both.
+"""
+
+import os
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from corpus import load_sidecar, save_sidecar
+from corpus.parallel import batched, ordered_pool_map
+from morph import Tokenizer
+
+LEMMA_SUFFIX = '.swlemma'
+LEMMA_INDEX_VERSION = 2
+LEMMATIZE_BATCH_SENTENCES = 2000
+
+# Tokenizers by dictionary directory, so worker processes load the
+# dictionary once (forked workers inherit the parent's).
+_tokenizers: Dict[str, Tokenizer] = {}
+
+# A sentence as analyzed once for every table built from it: the
+# (dictionary form, part of speech) of each token, in order; the part of
+# speech is '' for whitespace.
+Analysis = List[Tuple[str, str]]
+
+
+def tokenizer_for(dict_dir: str) -> Tokenizer:
+    """The tokenizer of this process for `dict_dir`, loading the dictionary on first use."""
+    tokenizer = _tokenizers.get(dict_dir)
+    if tokenizer is None:
+        tokenizer = _tokenizers[dict_dir] = Tokenizer(dict_dir)
+    return tokenizer
+
+
+def _analyze_batch(task: Tuple[str, List[str]]) -> List[Analysis]:
+    dict_dir, sentences = task
+    tokenizer = tokenizer_for(dict_dir)
+    return [
+        [(t.basic_form, t.pos if t.surface.strip() else '') for t in tokenizer.tokenize(s)]
+        for s in sentences
+    ]
+
+
+def analyze_sentences(
+    sentences: Sequence[str], tokenizer: Tokenizer, dict_dir: str, workers: int = 1
+) -> Iterator[List[Analysis]]:
+    """
+    Tokenize every sentence once, in a process pool when `workers` > 1,
+    yielding the Analysis of each sentence in batches of
+    LEMMATIZE_BATCH_SENTENCES, in order. `dict_dir` lets worker processes
+    load the same dictionary as `tokenizer`.
+    """
+    _tokenizers.setdefault(dict_dir, tokenizer)
+    tasks = ((dict_dir, batch) for batch in batched(sentences, LEMMATIZE_BATCH_SENTENCES))
+    if len(sentences) <= LEMMATIZE_BATCH_SENTENCES:
+        workers = 1  # Not worth starting a pool
+    return ordered_pool_map(_analyze_batch, tasks, workers)
+
+
+def _contains_run(lemmas: Sequence[str], run: Sequence[str]) -> bool:
+    n = len(run)
+    return any(list(lemmas[i:i + n]) == list(run) for i in range(len(lemmas) - n + 1))
+
+
+def dictionary_stamp(dict_dir: str) -> List:
+    """Identifies the dictionary files an index was built with."""
+    stamp = []
+    for name in ('tid.dat.gz', 'tid_pos.dat.gz', 'tid_map.dat.gz'):
+        st = os.stat(os.path.join(dict_dir, name))
+        stamp.append([name, st.st_size, st.st_mtime_ns])
+    return stamp
+
+
+class LemmaIndex:
+    """
+    lemma -> sorted sentence indices (`array('I')`). Queries are tokenized
+    too, so a query is matched by its own dictionary forms: a one-token
+    query is a posting list lookup, a longer one intersects the posting
+    lists and confirms the lemma sequence in the surviving sentences.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, sentences: Sequence[str] = ()):
+        self.tokenizer = tokenizer
+        self._sentences: Sequence[str] = sentences
+        self._postings: Dict[str, array] = {}
+        self._added = 0
+
+    def add(self, analysis: Analysis) -> None:
+        """Post the next of the index's sentences under the distinct dictionary forms in its `analysis`."""
+        postings = self._postings
+        for lemma in dict.fromkeys(form for form, _ in analysis):
+            plist = postings.get(lemma)
+            if plist is None:
+                plist = postings[lemma] = array('I')
+            plist.append(self._added)
+        self._added += 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            sys.getsizeof(lemma) + p.itemsize * len(p) for lemma, p in self._postings.items()
+        )
+
+    def query_lemmas(self, query: str) -> List[str]:
+        return [t.basic_form for t in self.tokenizer.tokenize(query) if t.surface.strip()]
+
+    def iter_matches(self, query: str) -> Iterator[int]:
+        lemmas = self.query_lemmas(query)
+        if not lemmas:
+            return iter(())
+        lists = []
+        for lemma in dict.fromkeys(lemmas):
+            plist = self._postings.get(lemma)
+            if plist is None:
+                return iter(())
+            lists.append(plist)
+        if len(lemmas) == 1:
+            return iter(lists[0])
+
+        lists.sort(key=len)
+        others = [set(p) for p in lists[1:]]
+        candidates = (i for i in lists[0] if all(i in p for p in others))
+        tokenize = self.tokenizer.tokenize
+        return (
+            i for i in candidates
+            if _contains_run([t.basic_form for t in tokenize(self._sentences[i])], lemmas)
+        )
+
+    def contains(self, index: int, query: str) -> bool:
+        """Whether sentence `index` contains the query's lemma sequence."""
+        lemmas = self.query_lemmas(query)
+        tokens = self.tokenizer.tokenize(self._sentences[index])
+        return bool(lemmas) and _contains_run([t.basic_form for t in tokens], lemmas)
+
+    def spans(self, index: int, query: str) -> List[Tuple[int, int]]:
+        """Character (start, end) of each run of the query's lemmas in sentence `index`."""
+        lemmas = self.query_lemmas(query)
+        n = len(lemmas)
+        if not n:
+            return []
+        tokens = self.tokenizer.tokenize(self._sentences[index])
+        forms = [t.basic_form for t in tokens]
+        return [
+            (tokens[i].start, tokens[i + n - 1].start + len(tokens[i + n - 1].surface))
+            for i in range(len(tokens) - n + 1)
+            if forms[i:i + n] == lemmas
+        ]
+
+    def find(self, query: str) -> List[int]:
+        return list(self.iter_matches(query))
+
+    def match_count(self, query: str) -> Optional[int]:
+        lemmas = self.query_lemmas(query)
+        if len(lemmas) == 1:
+            return len(self._postings.get(lemmas[0], ()))
+        return None
+
+    # --- Persistence ---
+
+    def save(self, source_path: str, dict_dir: str) -> None:
+        lemmas = list(self._postings)
+        counts = array('I', (len(self._postings[lemma]) for lemma in lemmas))
+        postings = array('I')
+        for lemma in lemmas:
+            postings.extend(self._postings[lemma])
+        save_sidecar(
+            source_path, LEMMA_SUFFIX,
+            {
+                'version': LEMMA_INDEX_VERSION,
+                'dictionary': dictionary_stamp(dict_dir),
+                'sentences': len(self._sentences),
+                'lemmas': lemmas,
+            },
+            {'counts': counts.tobytes(), 'postings': postings.tobytes()},
+        )
+
+    def load(self, source_path: str, sentences: Sequence[str], dict_dir: str) -> bool:
+        """Load a saved index for these sentences; False if none is usable."""
+        saved = load_sidecar(source_path, LEMMA_SUFFIX)
+        if saved is None:
+            return False
+        header, sections = saved
+        if (
+            header.get('version') != LEMMA_INDEX_VERSION
+            or header.get('sentences') != len(sentences)
+            or header.get('dictionary') != dictionary_stamp(dict_dir)
+        ):
+            return False
+
+        counts, flat = array('I'), array('I')
+        counts.frombytes(sections['counts'])
+        flat.frombytes(sections['postings'])
+        postings = {}
+        pos = 0
+        for lemma, count in zip(header['lemmas'], counts):
+            postings[lemma] = flat[pos:pos + count]
+            pos += count
+
+        self._sentences = sentences
+        self._postings = postings
+        self._added = len(sentences)
+        return True
+
+
+def load_lemma_index(
+    source_path: str, sentences: Sequence[str], tokenizer: Tokenizer, dict_dir: str
+) -> Optional[LemmaIndex]:
+    """The saved lemma index of a loaded source if its sidecar file is current, else None."""
+    index = LemmaIndex(tokenizer)
+    try:
+        if index.load(source_path, sentences, dict_dir):
+            print(f"Loaded lemma index for {os.path.basename(source_path)}.")
+            return index
+    except Exception as e:
+        print(f"Ignoring unreadable lemma index: {e}")
+    return None
@@ -0,0 +1,20 @@
+import threading
+from typing import Iterator, Optional, Sequence
+
+from .base import BaseSearchEngine, iter_scan_sentences
+
+
+class LinearScanEngine(BaseSearchEngine):
+    """
+    No index at all: every query scans every sentence. Costs nothing to
+    build, which makes it the right choice for small sources.
+    """
+
+    def __init__(self):
+        self._sentences: Sequence[str] = []
+
+    def build(self, sentences: Sequence[str]) -> None:
+        self._sentences = sentences
+
+    def iter_matches(self, word: str, stop: Optional[threading.Event] = None) -> Iterator[int]:
+        return iter_scan_sentences(self._sentences, word, stop)
@@ -0,0 +1,104 @@
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .base import BaseSearchEngine, iter_scan_sentences, stoppable
+
+
+def _contains_sorted(postings: array, value: int) -> bool:
+    pos = bisect_left(postings, value)
+    return pos < len(postings) and postings[pos] == value
+
+
+class NgramIndex(BaseSearchEngine):
+    """
+    Character n-gram inverted index over the loaded sentences.
+
+    Every distinct bigram and trigram of a sentence gets that sentence's index
+    appended to its posting list (an `array('I')`, sorted by construction).
+    A query looks up the posting lists of its own n-grams, walks the shortest
+    one and keeps only indices present in all the others, then confirms the
+    survivors with a plain substring check. Queries shorter than the smallest
+    gram size cannot use the index and fall back to a linear scan.
+    """
+
+    def __init__(self, gram_sizes: Tuple[int, ...] = (2, 3)):
+        self.gram_sizes = tuple(sorted(gram_sizes))
+        self._sentences: Sequence[str] = []
+        self._postings: Dict[str, array] = {}
+
+    def build(self, sentences: Sequence[str]) -> None:
+        postings: Dict[str, array] = {}
+        for i, s in enumerate(sentences):
+            grams = set()
+            for n in self.gram_sizes:
+                grams.update(s[j:j + n] for j in range(len(s) - n + 1))
+            for g in grams:
+                plist = postings.get(g)
+                if plist is None:
+                    plist = postings[g] = array('I')
+                plist.append(i)
+        self._sentences = sentences
+        self._postings = postings
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            sys.getsizeof(g) + p.itemsize * len(p) for g, p in self._postings.items()
+        )
+
+    def _query_grams(self, word: str) -> List[str]:
+        """Return the distinct n-grams of `word` at the largest usable size."""
+        usable = [n for n in self.gram_sizes if n <= len(word)]
+        if not usable:
+            return []
+        n = usable[-1]
+        return list({word[j:j + n] for j in range(len(word) - n + 1)})
+
+    def iter_candidates(self, word: str, stop: Optional[threading.Event] = None) -> Iterator[int]:
+        """
+        Yield sentence indices whose n-grams cover `word`. The result is a
+        superset of the true matches (n-grams may occur in any order). Ends
+        early once `stop` is set.
+        """
+        grams = self._query_grams(word)
+        if not grams:
+            everything = range(len(self._sentences))
+            yield from stoppable(everything, stop) if stop is not None else everything
+            return
+
+        lists = []
+        for g in grams:
+            plist = self._postings.get(g)
+            if plist is None:
+                return
+            lists.append(plist)
+        lists.sort(key=len)
+
+        shortest, others = lists[0], lists[1:]
+        if stop is not None:
+            shortest = stoppable(shortest, stop)
+        for i in shortest:
+            if all(_contains_sorted(p, i) for p in others):
+                yield i
+
+    def candidates(self, word: str) -> List[int]:
+        return list(self.iter_candidates(word))
+
+    def iter_matches(self, word: str, stop: Optional[threading.Event] = None) -> Iterator[int]:
+        sentences = self._sentences
+        if not word:
+            return iter(())
+        if len(word) in self.gram_sizes:
+            # A single gram of exactly the query length is an exact answer.
+            return iter(self._postings.get(word, ()))
+        if len(word) < self.gram_sizes[0]:
+            return iter_scan_sentences(sentences, word, stop)
+        return (i for i in self.iter_candidates(word, stop) if word in sentences[i])
+
+    def match_count(self, word: str) -> Optional[int]:
+        if word and len(word) in self.gram_sizes:
+            return len(self._postings.get(word, ()))
+        return None
@@ -0,0 +1,469 @@
+"""
+Boolean, regex and proximity queries over a loaded corpus.
+
+Syntax (operators are upper-case keywords separated by whitespace):
+
+    先生 怒              both terms (AND is implied between terms)
+    から NOT ので        から without ので
+    先生 OR 教師         either term
+    "山 の 上"           phrase: matched literally, spaces and keywords included
+    /走(る|った)/        regular expression, checked per sentence
+    ~食べる              any inflection of 食べる (needs the lemma index)
+    先生 NEAR/2 怒       先生 with 怒 at most 2 sentences away, same document
+    (先生 OR 教師) 怒    parentheses group
+
+Precedence, tightest first: NOT, NEAR/N, AND, OR. A query that is a single
+term or phrase is a plain literal search and stays on the engine's fast
+path (see `Query.literal`).
+
+Evaluation is planned rather than run node by node: literal terms are
+answered by the search engine, intersected smallest-first, and only the
+surviving candidates are checked against regexes and excluded terms, so a
+regex next to any literal never scans the whole corpus.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Optional, Pattern, Sequence
+
+from .base import BaseSearchEngine, stoppable
+from .highlight import MatchSpan, Span, find_spans
+
+
+class QueryError(ValueError):
+    """Raised for a query that cannot be parsed."""
+
+
+class QueryContext:
+    """
+    What nodes evaluate against: the sentences, a built engine and the
+    lemma index. Once the optional `stop` event is set, evaluation ends
+    early with incomplete matches.
+    """
+
+    def __init__(self, store, engine: BaseSearchEngine, lemmas=None, stop=None):
+        self.store = store
+        self.engine = engine
+        self.lemmas = lemmas  # LemmaIndex or None
+        self.stop = stop
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def scan(self, items: Iterable):
+        """`items`, cut short once the stop event is set; loops over sentences go through here."""
+        return items if self.stop is None else stoppable(items, self.stop)
+
+    def sentence(self, index: int) -> str:
+        return self.store[index]
+
+    def doc_range(self, index: int):
+        """[start, end) sentence range of the document containing `index`."""
+        doc_index = getattr(self.store, 'doc_index', None)
+        if doc_index is None:
+            return 0, len(self.store)
+        d = doc_index(index)
+        starts = self.store.doc_starts
+        end = starts[d + 1] if d + 1 < len(starts) else len(self.store)
+        return starts[d], end
+
+
+class Node:
+    """
+    Query tree node. `evaluate` returns the exact sorted sentence indices
+    that match; `test` checks a single sentence. `expensive` nodes cannot
+    use the index, so the planner prefers to `test` them on candidates.
+    """
+
+    expensive = False
+
+    def evaluate(self, ctx: QueryContext) -> List[int]:
+        return [i for i in ctx.scan(range(len(ctx))) if self.test(ctx, i)]
+
+    def test(self, ctx: QueryContext, index: int) -> bool:
+        raise NotImplementedError
+
+    def filter(self, ctx: QueryContext, candidates: Sequence[int]) -> List[int]:
+        return [i for i in ctx.scan(candidates) if self.test(ctx, i)]
+
+    def spans(self, ctx: QueryContext, index: int) -> List[Span]:
+        """(start, end) offsets of the text this node matches in sentence `index` (negations excluded)."""
+        return []
+
+
+class Term(Node):
+    """Literal substring; a quoted phrase is a term that may contain spaces."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def evaluate(self, ctx):
+        return list(ctx.engine.iter_matches(self.text, ctx.stop))
+
+    def test(self, ctx, index):
+        return self.text in ctx.sentence(index)
+
+    def spans(self, ctx, index):
+        return find_spans(ctx.sentence(index), self.text)
+
+    def __repr__(self):
+        return f"Term({self.text!r})"
+
+
+class Lemma(Node):
+    """Sentences containing the query's dictionary forms, in any inflection."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    @staticmethod
+    def _index(ctx):
+        if ctx.lemmas is None:
+            raise QueryError("inflection search (~word) is not available for this source")
+        return ctx.lemmas
+
+    def evaluate(self, ctx):
+        return list(ctx.scan(self._index(ctx).iter_matches(self.text)))
+
+    def test(self, ctx, index):
+        return self._index(ctx).contains(index, self.text)
+
+    def spans(self, ctx, index):
+        if ctx.lemmas is None:
+            return []
+        return ctx.lemmas.spans(index, self.text)
+
+    def __repr__(self):
+        return f"Lemma({self.text!r})"
+
+
+class Regex(Node):
+    expensive = True
+
+    def __init__(self, pattern: str):
+        try:
+            self.regex: Pattern = re.compile(pattern)
+        except re.error as e:
+            raise QueryError(f"bad regex /{pattern}/: {e}") from None
+
+    def evaluate(self, ctx):
+        search = self.regex.search
+        return [i for i, s in ctx.scan(enumerate(ctx.store)) if search(s)]
+
+    def test(self, ctx, index):
+        return self.regex.search(ctx.sentence(index)) is not None
+
+    def spans(self, ctx, index):
+        return [m.span() for m in self.regex.finditer(ctx.sentence(index)) if m.end() > m.start()]
+
+    def __repr__(self):
+        return f"Regex({self.regex.pattern!r})"
+
+
+class Not(Node):
+    def __init__(self, child: Node):
+        self.child = child
+        self.expensive = child.expensive
+
+    def evaluate(self, ctx):
+        excluded = set(self.child.evaluate(ctx))
+        return [i for i in ctx.scan(range(len(ctx))) if i not in excluded]
+
+    def test(self, ctx, index):
+        return not self.child.test(ctx, index)
+
+    def __repr__(self):
+        return f"Not({self.child!r})"
+
+
+class And(Node):
+    def __init__(self, children: List[Node]):
+        self.children = children
+        self.expensive = all(c.expensive for c in children)
+
+    def evaluate(self, ctx):
+        included = [c for c in self.children if not isinstance(c, Not)]
+        excluded = [c.child for c in self.children if isinstance(c, Not)]
+        cheap = [c for c in included if not c.expensive]
+        costly = [c for c in included if c.expensive]
+
+        # 1) Index-backed sets, intersected smallest first.
+        candidates: Optional[List[int]] = None
+        for matches in sorted((c.evaluate(ctx) for c in cheap), key=len):
+            if candidates is None:
+                candidates = matches
+            else:
+                keep = set(matches)
+                candidates = [i for i in candidates if i in keep]
+            if not candidates:
+                return []
+
+        # 2) Exclusions the index can answer are set differences.
+        for c in excluded:
+            if not c.expensive:
+                if candidates is None:
+                    candidates = Not(c).evaluate(ctx)
+                else:
+                    drop = set(c.evaluate(ctx))
+                    candidates = [i for i in candidates if i not in drop]
+
+        # 3) Regexes (and anything containing one) only see survivors.
+        for c in costly:
+            candidates = c.evaluate(ctx) if candidates is None else c.filter(ctx, candidates)
+        for c in excluded:
+            if c.expensive:
+                if candidates is None:
+                    candidates = range(len(ctx))
+                candidates = [i for i in ctx.scan(candidates) if not c.test(ctx, i)]
+        return list(candidates or ())
+
+    def test(self, ctx, index):
+        return all(c.test(ctx, index) for c in self.children)
+
+    def spans(self, ctx, index):
+        return [span for c in self.children for span in c.spans(ctx, index)]
+
+    def __repr__(self):
+        return f"And({self.children!r})"
+
+
+class Or(Node):
+    def __init__(self, children: List[Node]):
+        self.children = children
+        self.expensive = any(c.expensive for c in children)
+
+    def evaluate(self, ctx):
+        hits = set()
+        for c in self.children:
+            hits.update(c.evaluate(ctx))
+        return sorted(hits)
+
+    def test(self, ctx, index):
+        return any(c.test(ctx, index) for c in self.children)
+
+    def spans(self, ctx, index):
+        return [span for c in self.children for span in c.spans(ctx, index)]
+
+    def __repr__(self):
+        return f"Or({self.children!r})"
+
+
+class Near(Node):
+    """
+    Sentences matching `left` that have a sentence matching `right` at most
+    `distance` sentences away in the same document (0 = same sentence).
+    """
+
+    def __init__(self, left: Node, right: Node, distance: int):
+        self.left = left
+        self.right = right
+        self.distance = distance
+        self.expensive = left.expensive
+
+    def _window(self, ctx, index):
+        start, end = ctx.doc_range(index)
+        return max(start, index - self.distance), min(end, index + self.distance + 1)
+
+    def evaluate(self, ctx):
+        left = self.left.evaluate(ctx)
+        if not left:
+            return []
+        if self.right.expensive:
+            # Check only the windows around left hits instead of a full scan.
+            return [
+                i for i in ctx.scan(left)
+                if any(self.right.test(ctx, j) for j in range(*self._window(ctx, i)))
+            ]
+        right = self.right.evaluate(ctx)
+        hits = []
+        for i in left:
+            lo, hi = self._window(ctx, i)
+            pos = bisect_left(right, lo)
+            if pos < len(right) and right[pos] < hi:
+                hits.append(i)
+        return hits
+
+    def test(self, ctx, index):
+        if not self.left.test(ctx, index):
+            return False
+        lo, hi = self._window(ctx, index)
+        return any(self.right.test(ctx, j) for j in range(lo, hi))
+
+    def spans(self, ctx, index):
+        # Either operand, so the neighbour that satisfied NEAR shows up in the context too.
+        return self.left.spans(ctx, index) + self.right.spans(ctx, index)
+
+    def __repr__(self):
+        return f"Near({self.left!r}, {self.right!r}, {self.distance})"
+
+
+# --- Parsing ---
+
+_NEAR = re.compile(r'NEAR/(\d+)$')
+_KEYWORDS = ('AND', 'OR', 'NOT')
+
+
+def tokenize(text: str) -> Iterator[tuple]:
+    """Yield (kind, value) tokens: 'term', 'phrase', 'regex', 'lemma', 'op', '(' and ')'."""
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif c in '()':
+            yield c, c
+            i += 1
+        elif c in '"/':
+            # Quoted phrase or /regex/; a backslash escapes the delimiter.
+            j = i + 1
+            chars = []
+            while j < n and text[j] != c:
+                if text[j] == '\\' and j + 1 < n and text[j + 1] == c:
+                    j += 1
+                    chars.append(c)
+                else:
+                    chars.append(text[j])
+                j += 1
+            kind = 'phrase' if c == '"' else 'regex'
+            if j >= n:
+                raise QueryError(f"unterminated {kind}")
+            value = ''.join(chars)
+            if not value:
+                raise QueryError(f"empty {kind}")
+            yield kind, value
+            i = j + 1
+        else:
+            j = i
+            while j < n and not text[j].isspace() and text[j] not in '()"':
+                j += 1
+            word = text[i:j]
+            if word in _KEYWORDS or _NEAR.match(word):
+                yield 'op', word
+            elif word.startswith('~') and len(word) > 1:
+                yield 'lemma', word[1:]
+            else:
+                yield 'term', word
+            i = j
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = list(tokenize(text))
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise QueryError("empty query")
+        node = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise QueryError(f"unexpected {self.peek()[1]!r}")
+        return node
+
+    def parse_or(self) -> Node:
+        children = [self.parse_and()]
+        while self.peek() == ('op', 'OR'):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self) -> Node:
+        children = [self.parse_near()]
+        while True:
+            kind, value = self.peek()
+            if (kind, value) == ('op', 'AND'):
+                self.take()
+            elif kind is None or kind == ')' or (kind, value) == ('op', 'OR'):
+                break
+            children.append(self.parse_near())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_near(self) -> Node:
+        node = self.parse_unary()
+        while True:
+            kind, value = self.peek()
+            m = _NEAR.match(value) if kind == 'op' else None
+            if not m:
+                return node
+            self.take()
+            node = Near(node, self.parse_unary(), int(m.group(1)))
+
+    def parse_unary(self) -> Node:
+        kind, value = self.take()
+        if (kind, value) == ('op', 'NOT'):
+            return Not(self.parse_unary())
+        if kind == '(':
+            node = self.parse_or()
+            if self.take()[0] != ')':
+                raise QueryError("missing ')'")
+            return node
+        if kind in ('term', 'phrase'):
+            return Term(value)
+        if kind == 'regex':
+            return Regex(value)
+        if kind == 'lemma':
+            return Lemma(value)
+        if kind is None:
+            raise QueryError("query ends after an operator")
+        raise QueryError(f"unexpected {value!r}")
+
+
+def parse_query(text: str) -> Node:
+    return _Parser(text).parse()
+
+
+class Query:
+    """
+    A parsed query. `literal` is the search string when the query is a
+    single term or phrase (no operators), so callers can keep using the
+    engine and result cache directly; otherwise it is None.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.root = parse_query(text)
+        self.literal = self.root.text if isinstance(self.root, Term) else None
+
+    @property
+    def uses_lemmas(self) -> bool:
+        """Whether the query has ~lemma terms, which need a lemma index."""
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Lemma):
+                return True
+            stack.extend(getattr(node, 'children', ()))
+            stack.extend(
+                child for child in (getattr(node, name, None) for name in ('child', 'left', 'right'))
+                if child is not None
+            )
+        return False
+
+    def evaluate(self, store, engine: BaseSearchEngine, lemmas=None, stop=None) -> List[int]:
+        """
+        Sorted indices of matching sentences, incomplete if the optional
+        `stop` event is set meanwhile. Raises QueryError for ~lemma terms
+        without `lemmas`.
+        """
+        return self.root.evaluate(QueryContext(store, engine, lemmas, stop))
+
+    def spans(
+        self, store, engine: BaseSearchEngine, indices: Iterable[int], lemmas=None
+    ) -> List[MatchSpan]:
+        """
+        Where the query's terms occur in each of the given sentences, for
+        highlighting; sentences need not be hits (e.g. the surrounding context).
+        """
+        ctx = QueryContext(store, engine, lemmas)
+        return [
+            MatchSpan(i, start, end)
+            for i in indices
+            for start, end in self.root.spans(ctx, i)
+        ]
@@ -0,0 +1,153 @@
+"""
+LRU cache of query results, stored compressed.
+
+Match sets are sorted sentence indices, so they compress well either as
+varint-encoded gaps (sparse sets) or as a bitmap over the covered range
+(dense sets); `encode_matches` picks whichever is smaller. Entries are
+keyed by (source key, normalised query) and evicted least-recently-used
+first once their total size exceeds the byte budget.
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Hashable, Iterator, Optional, Sequence, Tuple
+
+_DELTA = 0
+_BITMAP = 1
+
+
+def normalize_query(word: str) -> str:
+    """
+    Cache key form of a query. Only changes that cannot alter the result
+    are applied: the engines match literally, so case or width folding
+    would conflate queries with different hits.
+    """
+    return word.strip()
+
+
+def _encode_varint_gaps(matches: Sequence[int]) -> bytearray:
+    out = bytearray([_DELTA])
+    prev = -1
+    for i in matches:
+        gap = i - prev - 1  # Sorted and distinct, so gaps are >= 0
+        prev = i
+        while gap >= 0x80:
+            out.append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        out.append(gap)
+    return out
+
+
+def _encode_bitmap(matches: Sequence[int]) -> bytearray:
+    first = matches[0]
+    bits = bytearray((matches[-1] - first) // 8 + 1)
+    for i in matches:
+        offset = i - first
+        bits[offset >> 3] |= 1 << (offset & 7)
+    return bytearray([_BITMAP]) + first.to_bytes(8, 'little') + bits
+
+
+def encode_matches(matches: Sequence[int]) -> bytes:
+    """Compress sorted, distinct sentence indices."""
+    if not matches:
+        return bytes([_DELTA])
+    span = matches[-1] - matches[0] + 1
+    # A gap below 128 costs one varint byte; the bitmap costs span/8 bytes.
+    if span // 8 + 9 < len(matches):
+        return bytes(_encode_bitmap(matches))
+    return bytes(_encode_varint_gaps(matches))
+
+
+def decode_matches(data: bytes) -> Iterator[int]:
+    """Lazily yield the sentence indices stored by `encode_matches`."""
+    if data[0] == _BITMAP:
+        first = int.from_bytes(data[1:9], 'little')
+        for byte_index in range(9, len(data)):
+            byte = data[byte_index]
+            base = first + (byte_index - 9) * 8
+            while byte:
+                low = byte & -byte
+                yield base + low.bit_length() - 1
+                byte ^= low
+        return
+
+    prev = -1
+    gap = 0
+    shift = 0
+    for byte in memoryview(data)[1:]:
+        gap |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        prev += gap + 1
+        yield prev
+        gap = 0
+        shift = 0
+
+
+class ResultCache:
+    """Memory-bounded LRU of compressed match sets with per-source invalidation."""
+
+    # Rough per-entry bookkeeping cost on top of the encoded bytes.
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # (source, query) -> (count, encoded)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cost(self, query: str, encoded: bytes) -> int:
+        return len(encoded) + len(query) + self.ENTRY_OVERHEAD
+
+    def get(self, source: Hashable, query: str) -> Optional[Tuple[Iterator[int], int]]:
+        """Return (lazy match iterator, count) for a cached query, else None."""
+        key = (source, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        count, encoded = entry
+        return decode_matches(encoded), count
+
+    def put(self, source: Hashable, query: str, matches: Sequence[int]) -> None:
+        query = normalize_query(query)
+        encoded = encode_matches(matches)
+        cost = self._cost(query, encoded)
+        if cost > self.max_bytes:
+            return
+        key = (source, query)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= self._cost(query, old[1])
+            self._entries[key] = (len(matches), encoded)
+            self.nbytes += cost
+            while self.nbytes > self.max_bytes:
+                (_, old_query), (_, old_encoded) = self._entries.popitem(last=False)
+                self.nbytes -= self._cost(old_query, old_encoded)
+
+    def invalidate(self, source_path: str) -> None:
+        """
+        Drop every entry whose source key is `source_path` or a tuple
+        starting with it (e.g. (path, load_id)).
+        """
+        def matches(source):
+            if isinstance(source, tuple):
+                return bool(source) and source[0] == source_path
+            return source == source_path
+
+        with self._lock:
+            for key in [k for k in self._entries if matches(k[0])]:
+                _, encoded = self._entries.pop(key)
+                self.nbytes -= self._cost(key[1], encoded)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
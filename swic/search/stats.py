@@ -0,0 +1,364 @@
+"""
+Word frequency and collocation tables, precomputed per source.
+
+The tables are filled from the lemma index's tokenization pass
+(search.lemma_index.analyze_sentences), one sentence at a time through
+CorpusStats.add, so a corpus is tokenized once for both. Each word is
+counted by its dictionary form, so 食べた and 食べない count towards 食べる.
+Besides the source total, words are counted per metadata group: per
+author and per title in Aozora sources, per series in Buncha Anime
+sources (the label before " - "). The words directly before and after
+each occurrence are counted as its left and right collocates;
+punctuation and symbols are not counted and break adjacency.
+
+Counts are kept in CSR form (per-word offsets into flat `array('I')`
+columns), collocates pre-sorted by count, so a lookup only slices arrays.
+Built tables are saved next to the source (<source>.swstats) and reused
+while the source, the sentence count and the dictionary are unchanged.
+"""
+
+import os
+import sys
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from corpus import load_sidecar, save_sidecar
+from morph import Tokenizer
+
+from .lemma_index import Analysis, dictionary_stamp
+
+STATS_SUFFIX = '.swstats'
+STATS_VERSION = 1
+
+# IPADIC part of speech of punctuation and symbols.
+_SYMBOL_POS = '記号'
+# Parts of speech that may follow a word in a lookup: auxiliaries, particles.
+_ENDING_POS = ('助動詞', '助詞')
+
+Groups = Tuple[List[str], array]  # Group labels, and each sentence's index into them
+
+
+# --- Metadata groups ---
+
+def _document_groups(store, field: int) -> Groups:
+    labels: List[str] = []
+    ids: Dict[str, int] = {}
+    doc_groups = []
+    for meta in store.doc_meta:
+        label = meta[field] if len(meta) > field else ''
+        if label not in ids:
+            ids[label] = len(labels)
+            labels.append(label)
+        doc_groups.append(ids[label])
+    groups = array('I', bytes(4 * len(store)))
+    starts = list(store.doc_starts) + [len(store)]
+    for doc, group in enumerate(doc_groups):
+        for i in range(starts[doc], starts[doc + 1]):
+            groups[i] = group
+    return labels, groups
+
+
+def _sentence_groups(store, label_of: Callable[[Sequence[str]], str]) -> Groups:
+    labels: List[str] = []
+    ids: Dict[str, int] = {}
+    by_meta_id = []
+    for meta in store.meta_table:
+        label = label_of(meta)
+        if label not in ids:
+            ids[label] = len(labels)
+            labels.append(label)
+        by_meta_id.append(ids[label])
+    return labels, array('I', (by_meta_id[m] for m in store.meta_ids))
+
+
+def series_label(meta: Sequence[str]) -> str:
+    """Buncha series of a sentence label, e.g. "Bleach - 215_1_dialogue" -> "Bleach"."""
+    return meta[0].split(' - ', 1)[0].strip() if meta else ''
+
+
+# parser name -> dimension -> builder of that dimension's groups. Aozora
+# document metadata is [URL, author, title].
+GROUPINGS: Dict[str, Dict[str, Callable]] = {
+    'AozoraCorpusParser': {
+        'author': lambda store: _document_groups(store, 1),
+        'title': lambda store: _document_groups(store, 2),
+    },
+    'BunchaAnimeParser': {
+        'series': lambda store: _sentence_groups(store, series_label),
+    },
+}
+
+
+def metadata_groups(store, parser_name: str) -> Dict[str, Groups]:
+    """The grouping dimensions of a store loaded by `parser_name` (none for other parsers)."""
+    return {dimension: build(store) for dimension, build in GROUPINGS.get(parser_name, {}).items()}
+
+
+# --- Tables ---
+
+def _csr(counts: Dict[int, int], rows: int, by_count: bool) -> Tuple[array, array, array]:
+    """
+    Pack {row << 32 | column: count} into (offsets, columns, counts) with
+    each row's entries by column, or by count descending when `by_count`.
+    """
+    ordered = sorted(counts.items())
+    if by_count:
+        ordered.sort(key=lambda kv: (kv[0] >> 32, -kv[1]))
+    offsets, columns, values = array('I', [0]), array('I'), array('I')
+    row = 0
+    for key, count in ordered:
+        while row < key >> 32:
+            offsets.append(len(columns))
+            row += 1
+        columns.append(key & 0xFFFFFFFF)
+        values.append(count)
+    while row < rows:
+        offsets.append(len(columns))
+        row += 1
+    return offsets, columns, values
+
+
+class _Table:
+    """One CSR table: row (word id) -> parallel slices of columns and counts."""
+
+    __slots__ = ('offsets', 'columns', 'counts')
+
+    def __init__(self, offsets: array, columns: array, counts: array):
+        self.offsets = offsets
+        self.columns = columns
+        self.counts = counts
+
+    def row(self, word_id: int) -> Tuple[array, array]:
+        start, end = self.offsets[word_id], self.offsets[word_id + 1]
+        return self.columns[start:end], self.counts[start:end]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.columns, self.counts))
+
+
+class _Counts:
+    """The tables of a CorpusStats while sentences are being added, as dicts."""
+
+    def __init__(self, groups: Dict[str, Groups]):
+        self.dimensions = list(groups)
+        self.labels = {d: groups[d][0] for d in self.dimensions}
+        self.sentence_groups = [groups[d][1] for d in self.dimensions]
+        self.ids: Dict[str, int] = {}
+        self.totals: List[int] = []
+        self.group_counts: List[Dict[int, int]] = [{} for _ in self.dimensions]
+        self.group_tokens = [[0] * len(groups[d][0]) for d in self.dimensions]
+        self.left: Dict[int, int] = {}
+        self.right: Dict[int, int] = {}
+        self.sentences = 0
+        self.tokens = 0
+
+    def add(self, analysis: Analysis) -> None:
+        ids, totals, left, right = self.ids, self.totals, self.left, self.right
+        sentence_group = [g[self.sentences] for g in self.sentence_groups]
+        previous = None
+        for word, pos in analysis:
+            if not pos or pos == _SYMBOL_POS:
+                previous = None  # Whitespace and punctuation break adjacency
+                continue
+            word_id = ids.get(word)
+            if word_id is None:
+                word_id = ids[word] = len(totals)
+                totals.append(0)
+            totals[word_id] += 1
+            self.tokens += 1
+            for counts, sizes, group in zip(self.group_counts, self.group_tokens, sentence_group):
+                key = word_id << 32 | group
+                counts[key] = counts.get(key, 0) + 1
+                sizes[group] += 1
+            if previous is not None:
+                key = word_id << 32 | previous
+                left[key] = left.get(key, 0) + 1
+                key = previous << 32 | word_id
+                right[key] = right.get(key, 0) + 1
+            previous = word_id
+        self.sentences += 1
+
+
+class CorpusStats:
+    """
+    Word counts of one source: totals, per metadata group and per
+    left/right neighbour. Words are looked up by dictionary form; a query
+    in another form (食べた) is tokenized to find it.
+    """
+
+    def __init__(self, tokenizer: Tokenizer):
+        self.tokenizer = tokenizer
+        self.sentences = 0
+        self.tokens = 0
+        self.words: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.totals = array('I')
+        self.dimensions: Dict[str, List[str]] = {}  # dimension -> group labels
+        self.group_tokens: Dict[str, array] = {}  # dimension -> words counted per group
+        self._groups: Dict[str, _Table] = {}
+        self._left: Optional[_Table] = None
+        self._right: Optional[_Table] = None
+        self._counting: Optional[_Counts] = None  # Between begin() and finish()
+
+    def begin(self, groups: Dict[str, Groups]) -> None:
+        """
+        Start counting from empty tables. Words are counted overall, per
+        group of each of `groups` (see metadata_groups) and per neighbour.
+        """
+        self._counting = _Counts(groups)
+
+    def add(self, analysis: Analysis) -> None:
+        """Count the next sentence, from its lemma_index Analysis."""
+        self._counting.add(analysis)
+
+    def finish(self) -> None:
+        """Pack the counts of the sentences added since begin() into the lookup tables."""
+        counts, self._counting = self._counting, None
+        rows = len(counts.totals)
+        dimensions = counts.dimensions
+        self.sentences = counts.sentences
+        self.tokens = counts.tokens
+        self.words = list(counts.ids)
+        self._ids = counts.ids
+        self.totals = array('I', counts.totals)
+        self.dimensions = {d: counts.labels[d] for d in dimensions}
+        self.group_tokens = {d: array('I', sizes) for d, sizes in zip(dimensions, counts.group_tokens)}
+        self._groups = {
+            d: _Table(*_csr(c, rows, by_count=False)) for d, c in zip(dimensions, counts.group_counts)
+        }
+        self._left = _Table(*_csr(counts.left, rows, by_count=True))
+        self._right = _Table(*_csr(counts.right, rows, by_count=True))
+
+    @property
+    def nbytes(self) -> int:
+        tables = list(self._groups.values()) + [t for t in (self._left, self._right) if t is not None]
+        return (
+            sum(sys.getsizeof(w) for w in self.words)
+            + self.totals.itemsize * len(self.totals)
+            + sum(t.nbytes for t in tables)
+        )
+
+    def word_id(self, word: str) -> Optional[int]:
+        """
+        Id of `word`, or of its dictionary form when it is one inflected
+        word: 食べた (食べ + auxiliary た) finds 食べる.
+        """
+        word = word.strip()
+        word_id = self._ids.get(word)
+        if word_id is None and word:
+            tokens = [t for t in self.tokenizer.tokenize(word) if t.surface.strip()]
+            if tokens and all(t.pos in _ENDING_POS for t in tokens[1:]):
+                word_id = self._ids.get(tokens[0].basic_form)
+        return word_id
+
+    def frequency(self, word: str) -> int:
+        word_id = self.word_id(word)
+        return self.totals[word_id] if word_id is not None else 0
+
+    def group_frequencies(self, word: str, dimension: str) -> List[Tuple[str, int, int]]:
+        """(group, count, words in group) for each group of `dimension` using `word`, most frequent first."""
+        labels = self.dimensions.get(dimension)
+        if labels is None:
+            raise ValueError(f"Unknown grouping for this source: {dimension!r}")
+        word_id = self.word_id(word)
+        if word_id is None:
+            return []
+        groups, counts = self._groups[dimension].row(word_id)
+        sizes = self.group_tokens[dimension]
+        rows = [(labels[g], c, sizes[g]) for g, c in zip(groups, counts)]
+        rows.sort(key=lambda r: -r[1])
+        return rows
+
+    def collocates(self, word: str, side: str = 'right', limit: int = 20) -> List[Tuple[str, int]]:
+        """The words seen most often directly before (`side='left'`) or after `word`, with counts."""
+        if side not in ('left', 'right'):
+            raise ValueError(f"side must be 'left' or 'right', not {side!r}")
+        word_id = self.word_id(word)
+        if word_id is None:
+            return []
+        table = self._left if side == 'left' else self._right
+        neighbours, counts = table.row(word_id)
+        return [(self.words[n], c) for n, c in zip(neighbours[:limit], counts[:limit])]
+
+    def top_words(self, limit: int = 50) -> List[Tuple[str, int]]:
+        order = sorted(range(len(self.totals)), key=self.totals.__getitem__, reverse=True)
+        return [(self.words[i], self.totals[i]) for i in order[:limit]]
+
+    # --- Persistence ---
+
+    def _sections(self):
+        tables = [('group.' + d, t) for d, t in self._groups.items()]
+        tables += [('left', self._left), ('right', self._right)]
+        sections = {'totals': self.totals.tobytes()}
+        for name, table in tables:
+            for part in _Table.__slots__:
+                sections[f'{name}.{part}'] = getattr(table, part).tobytes()
+        for d, sizes in self.group_tokens.items():
+            sections[f'sizes.{d}'] = sizes.tobytes()
+        return sections
+
+    def save(self, source_path: str, dict_dir: str) -> None:
+        save_sidecar(
+            source_path, STATS_SUFFIX,
+            {
+                'version': STATS_VERSION,
+                'dictionary': dictionary_stamp(dict_dir),
+                'sentences': self.sentences,
+                'tokens': self.tokens,
+                'words': self.words,
+                'dimensions': self.dimensions,
+            },
+            self._sections(),
+        )
+
+    def load(self, source_path: str, sentences: Sequence[str], dict_dir: str, dimensions: List[str]) -> bool:
+        """Load saved tables for these sentences and grouping dimensions; False if none are usable."""
+        saved = load_sidecar(source_path, STATS_SUFFIX)
+        if saved is None:
+            return False
+        header, sections = saved
+        if (
+            header.get('version') != STATS_VERSION
+            or header.get('sentences') != len(sentences)
+            or header.get('dictionary') != dictionary_stamp(dict_dir)
+            or sorted(header.get('dimensions', {})) != sorted(dimensions)
+        ):
+            return False
+
+        def column(name):
+            a = array('I')
+            a.frombytes(sections[name])
+            return a
+
+        def table(name):
+            return _Table(*(column(f'{name}.{part}') for part in _Table.__slots__))
+
+        self.sentences = header['sentences']
+        self.tokens = header['tokens']
+        self.words = header['words']
+        self._ids = {w: i for i, w in enumerate(self.words)}
+        self.totals = column('totals')
+        self.dimensions = header['dimensions']
+        self.group_tokens = {d: column(f'sizes.{d}') for d in self.dimensions}
+        self._groups = {d: table('group.' + d) for d in self.dimensions}
+        self._left = table('left')
+        self._right = table('right')
+        return True
+
+
+def load_stats(
+    source_path: str, store, groups: Dict[str, Groups], tokenizer: Tokenizer, dict_dir: str
+) -> Optional[CorpusStats]:
+    """
+    The saved frequency tables of a loaded source if its sidecar file is
+    current, else None. `groups` are its metadata groups (see metadata_groups).
+    """
+    stats = CorpusStats(tokenizer)
+    try:
+        if stats.load(source_path, store, dict_dir, list(groups)):
+            print(f"Loaded word statistics for {os.path.basename(source_path)}.")
+            return stats
+    except Exception as e:
+        print(f"Ignoring unreadable word statistics: {e}")
+    return None
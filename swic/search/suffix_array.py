@@ -0,0 +1,239 @@
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .base import BaseSearchEngine
+from .concordance import SORT_KEY_CHARS
+
+# Joins sentences in the indexed text. Queries never contain it, so no
+# match can span two sentences.
+SEPARATOR = '\x00'
+
+
+def build_suffix_array(text: str) -> array:
+    """
+    Return the suffix array of `text` as an `array('I')`, built in linear
+    time by induced sorting (SA-IS) over the text's character ranks.
+    """
+    alphabet = {c: r for r, c in enumerate(sorted(set(text)))}
+    codes = array('i', [alphabet[c] for c in text])
+    return array('I', _sa_is(codes, len(alphabet) - 1))
+
+
+def _sa_is(s: array, upper: int) -> array:
+    """
+    Suffix array of `s`, integer codes in [0, `upper`] (Nong, Zhang and
+    Chan's SA-IS). Suffixes are typed S (smaller than the next suffix) or
+    L; the leftmost S suffixes of each run (LMS) are sorted first, by
+    recursing on the names of the substrings between them, and induce the
+    order of all the others in two scans over the character buckets.
+    Everything is kept in flat arrays, a few bytes per character.
+    """
+    n = len(s)
+    if n < 2:
+        return array('i', range(n))
+    if n == 2:
+        return array('i', [0, 1] if s[0] < s[1] else [1, 0])
+
+    ls = bytearray(n)  # 1 for S-type suffixes
+    for i in range(n - 2, -1, -1):
+        ls[i] = ls[i + 1] if s[i] == s[i + 1] else s[i] < s[i + 1]
+    # Bucket starts per character: L-type suffixes fill a bucket from
+    # sum_l[c], S-type ones from sum_s[c] up to sum_l[c + 1].
+    sum_l = [0] * (upper + 2)
+    sum_s = [0] * (upper + 2)
+    for i in range(n):
+        if ls[i]:
+            sum_l[s[i] + 1] += 1
+        else:
+            sum_s[s[i]] += 1
+    for c in range(upper + 1):
+        sum_s[c] += sum_l[c]
+        sum_l[c + 1] += sum_s[c]
+
+    lms = array('i', [i for i in range(1, n) if ls[i] and not ls[i - 1]])
+    sa = array('i', [-1]) * n
+
+    def induce(sorted_lms: array) -> None:
+        for i in range(n):
+            sa[i] = -1
+        buf = sum_s[:]
+        for d in sorted_lms:
+            c = s[d]
+            sa[buf[c]] = d
+            buf[c] += 1
+        buf = sum_l[:]
+        c = s[n - 1]
+        sa[buf[c]] = n - 1
+        buf[c] += 1
+        for i in range(n):
+            v = sa[i] - 1
+            if v >= 0 and not ls[v]:
+                c = s[v]
+                sa[buf[c]] = v
+                buf[c] += 1
+        buf = sum_l[:]
+        for i in range(n - 1, -1, -1):
+            v = sa[i] - 1
+            if v >= 0 and ls[v]:
+                c = s[v] + 1
+                buf[c] -= 1
+                sa[buf[c]] = v
+
+    induce(lms)
+    m = len(lms)
+    if m:
+        # Name the LMS substrings in their induced order, equal ones alike,
+        # and sort the LMS suffixes by the suffix array of their names.
+        lms_order = array('i', [-1]) * n
+        for k, i in enumerate(lms):
+            lms_order[i] = k
+        sorted_lms = array('i', [v for v in sa if lms_order[v] >= 0])
+        names = array('i', bytes(4 * m))
+        name = 0
+        for k in range(1, m):
+            left, right = sorted_lms[k - 1], sorted_lms[k]
+            kl, kr = lms_order[left], lms_order[right]
+            end_l = lms[kl + 1] if kl + 1 < m else n
+            end_r = lms[kr + 1] if kr + 1 < m else n
+            same = end_l - left == end_r - right
+            if same:
+                while left < end_l and s[left] == s[right]:
+                    left += 1
+                    right += 1
+                same = left == end_l and left < n and s[left] == s[right]
+            if not same:
+                name += 1
+            names[kr] = name
+        induce(array('i', [lms[k] for k in _sa_is(names, name)]))
+    return sa
+
+
+class SuffixArrayIndex(BaseSearchEngine):
+    """
+    Suffix array over all sentences joined by SEPARATOR.
+
+    Any substring query is answered by two binary searches over the sorted
+    suffixes, O(|pattern| log n), independent of how common the pattern is.
+    Text positions map back to sentence indices by bisecting the sentence
+    start offsets. The build is linear (SA-IS) but in pure Python, about a
+    second per 200k characters, so select it only for sources where query
+    speed matters more than load time.
+
+    The suffixes matching a query are already sorted by the text after the
+    match start, which gives concordances sorted by right context for free.
+    Sorting by left context sorts the matches on the SORT_KEY_CHARS
+    characters before them, like concordances of the other engines.
+    """
+
+    def __init__(self):
+        self._text = ''
+        self._sa = array('I')
+        self._starts = array('Q')  # Offset of each sentence in self._text
+
+    def build(self, sentences: Sequence[str]) -> None:
+        starts = array('Q')
+        offset = 0
+        for s in sentences:
+            starts.append(offset)
+            offset += len(s) + len(SEPARATOR)
+        self._text = SEPARATOR.join(sentences)
+        self._starts = starts
+        self._sa = build_suffix_array(self._text)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            sys.getsizeof(self._text)
+            + self._sa.itemsize * len(self._sa)
+            + self._starts.itemsize * len(self._starts)
+        )
+
+    def _bounds(self, pattern: str) -> Tuple[int, int]:
+        """Return the [lo, hi) range of suffixes that start with `pattern`."""
+        text, sa, m = self._text, self._sa, len(pattern)
+
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] < pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        first = lo
+
+        hi = len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] <= pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        return first, lo
+
+    def match_count(self, word: str) -> Optional[int]:
+        # The matches are one interval of the suffix array: only their
+        # sentences need counting, without sorting or yielding them.
+        if not word or SEPARATOR in word:
+            return 0
+        lo, hi = self._bounds(word)
+        if hi - lo < 2:
+            return hi - lo
+        starts = self._starts
+        return len({bisect_right(starts, p) for p in self._sa[lo:hi]})
+
+    def count(self, word: str) -> int:
+        """Number of occurrences of `word` in the corpus (not sentences)."""
+        if not word or SEPARATOR in word:
+            return 0
+        lo, hi = self._bounds(word)
+        return hi - lo
+
+    def iter_locate(self, word: str) -> Iterator[Tuple[int, int]]:
+        """Yield (sentence_index, char_offset) of every occurrence in corpus order."""
+        if not word or SEPARATOR in word:
+            return iter(())
+        lo, hi = self._bounds(word)
+        return self._occurrences(sorted(self._sa[lo:hi]))
+
+    def _occurrences(self, positions: Iterable[int]) -> Iterator[Tuple[int, int]]:
+        starts = self._starts
+        for pos in positions:
+            sentence_index = bisect_right(starts, pos) - 1
+            yield sentence_index, pos - starts[sentence_index]
+
+    def concordance(self, word: str, order: str = 'right') -> List[Tuple[int, int]]:
+        """
+        (sentence_index, char_offset) of every occurrence of `word`, sorted
+        by the text after it ('right'), before it ('left', nearest
+        character first) or in corpus order ('corpus').
+        """
+        if not word or SEPARATOR in word:
+            return []
+        lo, hi = self._bounds(word)
+        positions = self._sa[lo:hi]
+        if order == 'left':
+            text = self._text
+            positions = sorted(positions)  # Ties keep corpus order
+            keys = [
+                text[max(0, p - SORT_KEY_CHARS):p][::-1].split(SEPARATOR, 1)[0] for p in positions
+            ]
+            positions = [positions[k] for k in sorted(range(len(keys)), key=keys.__getitem__)]
+        elif order == 'corpus':
+            positions = sorted(positions)
+        elif order != 'right':
+            raise ValueError(f"Unknown concordance order: {order!r}")
+        return list(self._occurrences(positions))
+
+    def locate(self, word: str) -> List[Tuple[int, int]]:
+        return list(self.iter_locate(word))
+
+    def iter_matches(self, word: str, stop: Optional[threading.Event] = None) -> Iterator[int]:
+        # Occurrences come from the index, not a scan: nothing long to stop.
+        last = -1
+        for sentence_index, _ in self.iter_locate(word):
+            if sentence_index != last:
+                yield sentence_index
+                last = sentence_index
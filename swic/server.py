@@ -0,0 +1,276 @@
+# server.py - Serve the web UI to many clients at once (no Eel, no audio)
+#
+#   python server.py [--host HOST] [--port PORT] [--source FILE ...] [--all-sources]
+#
+# The sources are loaded and indexed once at startup and then only read.
+# Every client gets its own SearchSession (query, cursor, display
+# settings), found through a session cookie, so browser tabs and students
+# sharing one instance no longer move each other's results. Requests are
+# handled on a thread per connection; per-session locks keep one
+# client's overlapping calls in order while different clients search
+# concurrently.
+
+import argparse
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from config import (
+    DEFAULT_SOURCE_FILE, FEDERATED_RESULTS_PER_SOURCE,
+    SERVER_HOST, SERVER_PORT, SERVER_SESSION_IDLE_SECONDS, SERVER_MAX_SESSIONS,
+)
+from corpus.parallel import avoid_fork
+from library import CorpusLibrary
+from search.federated import ResidentFederatedSearch
+from search.query import QueryError
+
+WEB_DIR = os.path.join(os.path.dirname(__file__), 'web')
+SESSION_COOKIE = 'swic_session'
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class SessionRegistry:
+    """
+    token -> SearchSession. Sessions idle for longer than `idle_seconds`
+    are dropped, and beyond `max_sessions` the least recently used one.
+    """
+
+    def __init__(self, idle_seconds: float, max_sessions: int):
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, token):
+        with self._lock:
+            session = self._sessions.get(token) if token else None
+            if session is not None:
+                self._sessions.move_to_end(token)
+                session.touch()
+            return session
+
+    def add(self, session) -> str:
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self._expire()
+            self._sessions[token] = session
+            while len(self._sessions) > self.max_sessions:
+                _, dropped = self._sessions.popitem(last=False)
+                dropped.close()
+        return token
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - self.idle_seconds
+        # Least recently used first, so stop at the first live session.
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if session.last_used >= deadline:
+                break
+            del self._sessions[token]
+            session.close()
+
+
+class ContextServer:
+    """
+    The shared state behind the HTTP server: a CorpusLibrary with the
+    served corpora loaded, and the session registry. `call` runs one API
+    function (the same names the Eel app exposes) for a session.
+    """
+
+    def __init__(self, source_files=None, idle_seconds=SERVER_SESSION_IDLE_SECONDS, max_sessions=SERVER_MAX_SESSIONS):
+        self.library = CorpusLibrary()
+        if source_files is None:
+            source_files = self.library.detect_sources()
+        self.corpora = OrderedDict()  # filename -> LoadedCorpus, never modified
+        for filename in source_files:
+            path = self.library.resolve_source_path(filename)
+            corpus = self.library.load_corpus(path) if path else None
+            if corpus is None or not len(corpus.store):
+                print(f"Skipping source {filename}: could not be loaded.")
+                continue
+            self.corpora[os.path.basename(path)] = corpus
+        if not self.corpora:
+            raise SystemExit("No sources could be loaded.")
+        self.sessions = SessionRegistry(idle_seconds, max_sessions)
+
+        self.functions = {
+            'search_word': lambda s, word: s.search(word),
+            'set_context_size': lambda s, size: s.set_context_size(size),
+            'next_result': lambda s: s.next_result(),
+            'prev_result': lambda s: s.prev_result(),
+            'get_results_page': lambda s, offset, limit: s.get_results_page(offset, limit),
+            'count_results': lambda s: s.count_results(),
+            'get_current_state': lambda s: s.state(),
+            'set_readings_enabled': lambda s, enabled: s.set_readings_enabled(enabled),
+            'read_context': lambda s, position=None: "Reading aloud is not available in server mode.",
+            'stop_reading': lambda s: None,
+            'get_tts_status': lambda s: {"state": "idle", "text": "", "pending": False, "error": ""},
+            'get_sources': lambda s: list(self.corpora),
+            'set_source': self.set_source,
+            'get_load_status': lambda s: {"stage": "done", "source": s.corpus.name},
+            'get_morph_status': lambda s: self.library.morph_status(),
+            'set_facet_filter': lambda s, dimension, value=None: s.set_facet_filter(dimension, value),
+            'get_facets': lambda s: s.facets(),
+            'concordance': lambda s, word, order='right', offset=0, limit=100: s.concordance(word, order, offset, limit),
+            'word_stats': lambda s, word: s.word_stats(word),
+            'source_frequencies': lambda s, word: self.library.source_frequencies(word, self.corpora.values()),
+            'federated_search': self.federated_search,
+            'federated_results': self.federated_results,
+        }
+
+    def new_session(self):
+        corpus = next(iter(self.corpora.values()))
+        session = self.library.new_session(corpus)
+        return self.sessions.add(session), session
+
+    def call(self, session, name, args):
+        function = self.functions.get(name)
+        if function is None:
+            raise KeyError(name)
+        return function(session, *args)
+
+    def set_source(self, session, filename):
+        corpus = self.corpora.get(filename)
+        if corpus is None:
+            return f"Source not served: {filename}"
+        session.set_corpus(corpus)
+        return f"Source switched to {filename} ({len(corpus.store)} sentences)"
+
+    def federated_search(self, session, word):
+        """
+        All-sources search over the served corpora, in the reply format of
+        search.federated. Returns at once; the session's search carries on
+        in the background and federated_results reports its progress.
+        """
+        word = word.strip()
+        if not word:
+            return {"sources": [], "results": [], "complete": True}
+        if session.federated is None:
+            session.federated = ResidentFederatedSearch(self.corpora)
+        try:
+            return session.federated.search(word, FEDERATED_RESULTS_PER_SOURCE)
+        except QueryError as e:
+            return {"sources": [], "results": [], "complete": True, "error": f"Invalid query: {e}"}
+
+    def federated_results(self, session):
+        if session.federated is None:
+            return {"sources": [], "results": [], "complete": True}
+        return session.federated.collect()
+
+
+class _RequestHandler(SimpleHTTPRequestHandler):
+    """Static files from web/ (with /eel.js mapped to the HTTP client shim) and POST /api/<function>."""
+
+    server_version = 'SWIC'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=WEB_DIR, **kwargs)
+
+    def translate_path(self, path):
+        if urlsplit(path).path == '/eel.js':
+            return os.path.join(WEB_DIR, 'eel_http.js')
+        return super().translate_path(path)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if not path.startswith('/api/'):
+            self._reply(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+        name = path[len('/api/'):]
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_REQUEST_BYTES:
+                raise ValueError("request too large")
+            body = json.loads(self.rfile.read(length) or b'{}')
+            args = body.get('args', [])
+            if not isinstance(args, list):
+                raise ValueError("args must be a list")
+        except ValueError as e:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        app = self.server.app
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        token = cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+        session = app.sessions.get(token)
+        new_token = None
+        if session is None:
+            new_token, session = app.new_session()
+
+        try:
+            result = app.call(session, name, args)
+        except KeyError:
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"unknown function {name}"}, new_token)
+            return
+        except (TypeError, ValueError) as e:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": str(e)}, new_token)
+            return
+        except Exception as e:
+            print(f"Error in {name}: {e}")
+            self._reply(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"}, new_token)
+            return
+        self._reply(HTTPStatus.OK, {"result": result}, new_token)
+
+    def _reply(self, status, payload, new_token=None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        if new_token is not None:
+            self.send_header(
+                'Set-Cookie', f"{SESSION_COOKIE}={new_token}; Path=/; HttpOnly; SameSite=Strict"
+            )
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class ContextHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, app):
+        super().__init__(address, _RequestHandler)
+        self.app = app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the context finder to multiple clients.")
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument(
+        '--source', action='append', dest='sources', metavar='FILE',
+        help=f"source file to serve (repeatable; default: {os.path.basename(DEFAULT_SOURCE_FILE)})",
+    )
+    parser.add_argument('--all-sources', action='store_true', help="serve every detected source")
+    args = parser.parse_args(argv)
+
+    if args.all_sources:
+        sources = None
+    else:
+        sources = args.sources or [os.path.basename(DEFAULT_SOURCE_FILE)]
+
+    avoid_fork()  # Request threads run alongside any worker pool
+    app = ContextServer(sources)
+    httpd = ContextHTTPServer((args.host, args.port), app)
+    print(f"Serving {', '.join(app.corpora)} on http://{args.host}:{args.port}/index.html")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,476 @@
+# session.py - Per-client search state over a shared corpus
+
+import threading
+import time
+
+from array import array
+
+from config import (
+    DEFAULT_CONTEXT_SENTENCES, FACET_VALUES_MAX, KWIC_CONTEXT_CHARS, KWIC_PAGE_MAX,
+    RESULTS_PAGE_MAX, STATS_COLLOCATES,
+)
+from corpus import sentence_metadata
+from search import MatchCursor
+from search.concordance import concordance, kwic_line
+from search.facets import bitmap_indices, bitmap_of
+from search.highlight import highlight, spans_by_sentence
+from search.query import Query, QueryError
+
+
+class SearchSession:
+    """
+    One client's search: the current query, its MatchCursor and display
+    settings, over a LoadedCorpus that is only ever read. The corpus, the
+    result cache and the reading cache can therefore be shared by any
+    number of sessions (browser tabs, or clients of the server in
+    server.py); each session costs little more than its cursor's hit array.
+
+    Calls on one session are serialised by its lock, so overlapping
+    requests from the same client (e.g. a page prefetch during `next`)
+    cannot interleave cursor moves.
+    """
+
+    def __init__(self, corpus, result_cache, get_readings=None, context_size=DEFAULT_CONTEXT_SENTENCES):
+        self.corpus = corpus
+        self.result_cache = result_cache
+        self._get_readings = get_readings  # Callable returning a ReadingCache, or None
+        self.context_size = context_size
+        self.readings_enabled = False  # Include furigana data with results
+        self.cursor = MatchCursor.empty()  # Lazy walk over the current query's matches
+        self.current_word = ''
+        self.query = None  # Parsed current query, used to highlight its matches
+        self._concordance = None  # ((corpus key, word, order, filter), occurrences) of the last concordance
+        self.facet_filter = {}  # dimension -> value searches are restricted to
+        self._facet_mask = None  # Bitmap of the sentences passing facet_filter
+        self._hit_bitmap = None  # ((corpus key, query text), its hits, their bitmap)
+        self.federated = None  # All-sources search of this client (server mode), stopped on close
+        self.last_used = time.monotonic()
+        self.lock = threading.RLock()
+
+    @property
+    def store(self):
+        return self.corpus.store
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def set_corpus(self, corpus):
+        """Search `corpus` from now on; the current search is dropped."""
+        with self.lock:
+            self.cursor.close()
+            self.cursor = MatchCursor.empty()
+            self.current_word = ''
+            self.query = None
+            self._concordance = None
+            self.facet_filter = {}
+            self._facet_mask = None
+            self._hit_bitmap = None
+            self.corpus = corpus
+
+    def set_context_size(self, size):
+        try:
+            self.context_size = int(size)
+        except ValueError:
+            self.context_size = 1
+
+    def close(self):
+        """Stop background work; call when the session is dropped."""
+        self.cursor.close()
+        if self.federated is not None:
+            self.federated.close()
+
+    # --- Searching ---
+
+    def search(self, word):
+        """
+        Start a search and render its first hit. Returns a dictionary with
+        'text', 'count' and 'metadata' (plus 'final', 'readings' and
+        'spans' when there are hits). `word` may be a plain word or a query
+        (see search.query): terms with AND/OR/NOT, "phrases", /regex/,
+        ~lemma and NEAR/N proximity.
+        """
+        word = word.strip()
+        if not word:
+            return {"text": "Please enter a word.", "count": 0, "metadata": []}
+
+        if not len(self.store):
+            return {"text": f"Data not loaded from {self.corpus.name}.", "count": 0, "metadata": []}
+
+        try:
+            query = Query(word)
+        except QueryError as e:
+            return {"text": f"Invalid query: {e}", "count": 0, "metadata": []}
+        if query.uses_lemmas and self.corpus.lemmas is None:
+            return {"text": self._lemmas_unavailable(), "count": 0, "metadata": []}
+
+        with self.lock:
+            self.cursor.close()
+            try:
+                self.cursor = self._open_cursor(query)
+            except QueryError as e:
+                self.cursor = MatchCursor.empty()
+                return {"text": f"Invalid query: {e}", "count": 0, "metadata": []}
+            self.current_word = word
+            self.query = query
+
+            if self.cursor.first() is None:
+                # No results found, return the message and 0 count
+                return {"text": f"No results found for '{word}'.", "count": 0, "metadata": []}
+
+            # The total may still be unknown; state() reports it once final.
+            engine, literal = self.corpus.engine, query.literal
+            self.cursor.count_in_background(lambda stop: engine.iter_matches(literal, stop))
+
+            result = self._render_result(self.cursor.current)
+            result.update(count=self.cursor.count, final=self.cursor.final)
+            return result
+
+    def _lemmas_unavailable(self):
+        if not self.corpus.analyzed.is_set():
+            return f"Inflection search (~word) for {self.corpus.name} is still being prepared, please try again shortly."
+        reason = self.corpus.lemma_error or "it is turned off (LEMMA_INDEX_ENABLED)"
+        return f"Inflection search (~word) is unavailable for {self.corpus.name}: {reason}."
+
+    def _open_cursor(self, query):
+        """
+        Cursor over `query`'s matches, served from the result cache when
+        possible. With a facet filter the matches are collected in full and
+        intersected with the filter's bitmap.
+        """
+        if self._facet_mask is not None:
+            hits = bitmap_indices(self._query_hits(query)[1] & self._facet_mask)
+            return MatchCursor(iter(hits), len(hits))
+
+        source_key, key = self.corpus.key, query.text
+        cached = self.result_cache.get(source_key, key)
+        if cached is not None:
+            matches, count = cached
+            return MatchCursor(matches, count)
+
+        engine = self.corpus.engine
+        if query.literal is None:
+            # Structured queries are planned and evaluated in full up front.
+            hits = query.evaluate(self.store, engine, self.corpus.lemmas)
+            self.result_cache.put(source_key, key, hits)
+            return MatchCursor(iter(hits), len(hits))
+
+        word = query.literal
+        return MatchCursor(
+            engine.iter_matches(word),
+            engine.match_count(word),
+            on_complete=lambda hits: self.result_cache.put(source_key, key, hits),
+        )
+
+    def _all_hits(self, query):
+        """Every match of `query`, from the result cache when possible."""
+        source_key, key = self.corpus.key, query.text
+        cached = self.result_cache.get(source_key, key)
+        if cached is not None:
+            return cached[0]
+        if query.literal is None:
+            hits = query.evaluate(self.store, self.corpus.engine, self.corpus.lemmas)
+        else:
+            hits = array('I', self.corpus.engine.iter_matches(query.literal))
+        self.result_cache.put(source_key, key, hits)
+        return hits
+
+    def _query_hits(self, query):
+        """Every match of `query` and their bitmap, kept for the latest query."""
+        key = (self.corpus.key, query.text)
+        if self._hit_bitmap is None or self._hit_bitmap[0] != key:
+            hits = array('I', self._all_hits(query))
+            self._hit_bitmap = (key, hits, bitmap_of(hits, len(self.store)))
+        return self._hit_bitmap[1:]
+
+    # --- Facets ---
+
+    def set_facet_filter(self, dimension, value=None):
+        """
+        Restrict searches to sentences whose `dimension` (e.g. 'author')
+        is `value`; an empty value lifts that restriction. Applies from the
+        next search. Returns the filter, plus 'error' if it was refused.
+        """
+        with self.lock:
+            selection = dict(self.facet_filter)
+            if value:
+                selection[dimension] = value
+            else:
+                selection.pop(dimension, None)
+            facets = self.corpus.facets
+            try:
+                if selection and not facets:
+                    raise ValueError(f"{self.corpus.name} has no facets.")
+                mask = facets.mask(selection) if selection else None
+            except ValueError as e:
+                return {"filter": dict(self.facet_filter), "error": str(e)}
+            self.facet_filter = selection
+            self._facet_mask = mask
+            self._concordance = None
+            return {"filter": dict(selection)}
+
+    def facets(self, limit=FACET_VALUES_MAX):
+        """
+        Match counts of the current search per facet value, e.g. per author
+        and title: for each dimension its selected value, the `limit` values
+        with most matches, and how many values have matches. Each dimension
+        is counted under the filters on the others, so its alternatives
+        stay visible.
+        """
+        with self.lock:
+            facets = self.corpus.facets
+            if not facets:
+                return {"dimensions": {}}
+            hits, bits = self._query_hits(self.query) if self.query is not None else ((), 0)
+            dimensions = {}
+            for dimension in facets.dimensions:
+                others = {d: v for d, v in self.facet_filter.items() if d != dimension}
+                if others:
+                    counted = bitmap_indices(bits & facets.mask(others))
+                else:
+                    counted = hits
+                values, distinct = facets.counts(counted, dimension, limit)
+                dimensions[dimension] = {
+                    "selected": self.facet_filter.get(dimension),
+                    "values": [{"value": v, "count": n} for v, n in values],
+                    "distinct": distinct,
+                }
+            return {"dimensions": dimensions}
+
+    # --- Navigation ---
+
+    def next_result(self):
+        """Get the next matching result and its associated metadata."""
+        with self.lock:
+            return self._render_result(self.cursor.next())
+
+    def prev_result(self):
+        """Get the previous matching result and its associated metadata."""
+        with self.lock:
+            return self._render_result(self.cursor.prev())
+
+    def get_results_page(self, offset, limit):
+        """
+        Render hits [offset, offset + limit) of the current search in one
+        call, so the frontend can page through results locally. `total` and
+        `final` have the same meaning as in state().
+        """
+        offset = max(0, int(offset))
+        limit = max(0, min(int(limit), RESULTS_PAGE_MAX))
+        with self.lock:
+            results = [
+                dict(self._render_result(target_index), position=offset + i)
+                for i, target_index in enumerate(self.cursor.page(offset, limit))
+            ]
+            return {
+                "offset": offset,
+                "results": results,
+                "total": self.cursor.count,
+                "final": self.cursor.final,
+            }
+
+    def count_results(self):
+        """Finish counting the current search now; returns the exact total."""
+        with self.lock:
+            return self.cursor.drain()
+
+    def state(self):
+        """
+        The current match index and total count. While 'final' is False the
+        total is still being counted and only a lower bound.
+        """
+        cursor = self.cursor
+        return {
+            "current": cursor.position,
+            "total": cursor.count,
+            "final": cursor.final,
+        }
+
+    def set_readings_enabled(self, enabled):
+        """Turn furigana data on or off; returns the current context's readings."""
+        self.readings_enabled = bool(enabled)
+        with self.lock:
+            return self._readings_for(self.cursor.current)
+
+    def context_text(self, position=None):
+        """Plain text of the current context (hit `position` if given), e.g. for reading aloud."""
+        with self.lock:
+            if position is not None:
+                self.cursor.seek(int(position))
+            return self._plain_context(self.cursor.current)
+
+    def hit_context_text(self, position):
+        """Plain context text of hit `position` without moving the cursor; '' if there is none."""
+        with self.lock:
+            hits = self.cursor.page(position, 1) if position >= 0 else []
+            return self._plain_context(hits[0]) if hits else ""
+
+    def lookup(self, word, limit):
+        """
+        Count the matches of `word` (a plain word or query) and return them
+        with the plain-text context of the first `limit` hits, without
+        touching this session's cursor. Raises QueryError for a bad query.
+        """
+        cursor = self._open_cursor(Query(word.strip()))
+        hits = cursor.page(0, limit)
+        count = cursor.count if cursor.final else cursor.drain()
+        examples = []
+        for i in hits:
+            start, end = self._context_bounds(i)
+            examples.append({
+                "sentence": i,
+                "text": self.store[i],
+                "context": self.store[start:end],
+                "metadata": self._metadata_for(i),
+            })
+        return count, examples
+
+    def concordance(self, word, order='right', offset=0, limit=KWIC_PAGE_MAX):
+        """
+        Lines [offset, offset + limit) of the key-word-in-context listing of
+        `word` (a plain word), sorted by right or left context or in corpus
+        order. The sorted occurrences are kept, so paging does not sort
+        again. Returns 'total' and 'lines' of {sentence, offset, left,
+        match, right, metadata}, or 'error'.
+        """
+        word = word.strip()
+        if not word:
+            return {"error": "Please enter a word."}
+        try:
+            literal = Query(word).literal
+        except QueryError as e:
+            return {"error": f"Invalid query: {e}"}
+        if literal is None:
+            return {"error": "The concordance lists plain words, not queries."}
+        offset = max(0, int(offset))
+        limit = max(0, min(int(limit), KWIC_PAGE_MAX))
+
+        with self.lock:
+            selection = self.facet_filter
+            key = (self.corpus.key, literal, order, tuple(sorted(selection.items())))
+            if self._concordance is None or self._concordance[0] != key:
+                try:
+                    occurrences = concordance(self.corpus.engine, self.store, literal, order)
+                except ValueError as e:
+                    return {"error": str(e)}
+                if selection:
+                    contains = self.corpus.facets.contains
+                    occurrences = [o for o in occurrences if contains(selection, o[0])]
+                self._concordance = (key, occurrences)
+            occurrences = self._concordance[1]
+
+        lines = []
+        for sentence_index, start in occurrences[offset:offset + limit]:
+            left, match, right = kwic_line(self.store[sentence_index], start, len(literal), KWIC_CONTEXT_CHARS)
+            lines.append({
+                "sentence": sentence_index,
+                "offset": start,
+                "left": left,
+                "match": match,
+                "right": right,
+                "metadata": self._metadata_for(sentence_index),
+            })
+        return {"word": literal, "order": order, "total": len(occurrences), "offset": offset, "lines": lines}
+
+    def word_stats(self, word, limit=STATS_COLLOCATES):
+        """
+        Precomputed statistics for `word` in this session's source: its
+        count (by dictionary form), its count in each metadata group (e.g.
+        per author, or per series) and its most frequent left and right
+        neighbours. Counts come with a rate per million words.
+        """
+        stats = self.corpus.stats
+        word = word.strip()
+        if stats is None:
+            if not self.corpus.analyzed.is_set():
+                return {"word": word, "error": f"Word statistics for {self.corpus.name} are still being counted."}
+            return {"word": word, "error": f"Word statistics are not available for {self.corpus.name}."}
+        word_id = stats.word_id(word)
+        if word_id is None:
+            return {"word": word, "lemma": None, "count": 0, "groups": {}, "left": [], "right": []}
+
+        def per_million(count, size):
+            return round(count * 1e6 / size, 1) if size else 0.0
+
+        count = stats.totals[word_id]
+        return {
+            "word": word,
+            "lemma": stats.words[word_id],
+            "count": count,
+            "per_million": per_million(count, stats.tokens),
+            "groups": {
+                dimension: [
+                    {"group": group, "count": n, "per_million": per_million(n, size)}
+                    for group, n, size in stats.group_frequencies(word, dimension)
+                ]
+                for dimension in stats.dimensions
+            },
+            "left": [{"word": w, "count": n} for w, n in stats.collocates(word, 'left', limit)],
+            "right": [{"word": w, "count": n} for w, n in stats.collocates(word, 'right', limit)],
+        }
+
+    # --- Rendering ---
+
+    def _context_bounds(self, target_index):
+        """[start, end) sentence range displayed around `target_index`."""
+        # interpret context_size as total window size (1 = only target)
+        half_window = max(0, (self.context_size - 1) // 2)
+        start = max(0, target_index - half_window)
+        end = min(len(self.store), target_index + half_window + 1)
+        return start, end
+
+    def _plain_context(self, target_index):
+        if target_index is None:
+            return ""
+        start, end = self._context_bounds(target_index)
+        return "\n".join(self.store[start:end])
+
+    def _metadata_for(self, target_index):
+        if target_index is None:
+            return []
+        return sentence_metadata(self.store, target_index, self.corpus.source_path)
+
+    def _readings_for(self, target_index):
+        """
+        Furigana data for the context around `target_index`: one list of
+        [surface, reading] pairs per displayed sentence. None when readings
+        are off or the tokenizer is unavailable.
+        """
+        if not self.readings_enabled or target_index is None:
+            return None
+        readings = self._get_readings() if self._get_readings is not None else None
+        if readings is None:
+            return None
+        start, end = self._context_bounds(target_index)
+        key = self.corpus.key
+        return [readings.get(key, i, self.store[i]) for i in range(start, end)]
+
+    def _context_spans(self, start, end):
+        """Merged (start, end) match offsets for each sentence in [start, end)."""
+        if self.query is None:
+            return [[] for _ in range(start, end)]
+        spans = self.query.spans(self.store, self.corpus.engine, range(start, end), self.corpus.lemmas)
+        return spans_by_sentence(spans, start, end)
+
+    def _render_context(self, target_index, spans):
+        """Context HTML around sentence `target_index`, with the query's matches highlighted."""
+        start, end = self._context_bounds(target_index)
+        return self.corpus.joiner.join(
+            highlight(self.store[i], sentence_spans)
+            for i, sentence_spans in zip(range(start, end), spans)
+        )
+
+    def _render_result(self, target_index):
+        """
+        Everything the frontend shows for one hit. `spans` holds the match
+        offsets of each context sentence, so highlighting survives the ruby
+        rendering of `readings`.
+        """
+        if target_index is None:
+            return {"text": "", "metadata": [], "readings": None, "spans": []}
+        spans = self._context_spans(*self._context_bounds(target_index))
+        return {
+            "text": self._render_context(target_index, spans),
+            "metadata": self._metadata_for(target_index),
+            "readings": self._readings_for(target_index),
+            "spans": spans,
+        }
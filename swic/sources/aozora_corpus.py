@@ -1,7 +1,7 @@
-from typing import List, Dict
+from typing import Dict, Iterator, List, TextIO
 
 from .base import BaseSourceParser
-from .common import parse_aozora_content
+from .common import iter_aozora_documents, parse_aozora_content
 
 
 class AozoraCorpusParser(BaseSourceParser):
@@ -10,3 +10,5 @@ class AozoraCorpusParser(BaseSourceParser):
     def parse(self, content: str, current_source: str) -> List[Dict]:
         return parse_aozora_content(content or "")
 
+    def iter_parse(self, f: TextIO, current_source: str) -> Iterator[Dict]:
+        return iter_aozora_documents(f)
@@ -1,12 +1,20 @@
-from typing import List, Dict
+from typing import Dict, Iterator, List, TextIO
 
 
 class BaseSourceParser:
     """
     Interface for source-specific parsers. Implement `parse` to return a list
     of documents, each as { 'metadata': List[str], 'text': str }.
+    Parsers that can work incrementally also override `iter_parse`.
     """
 
     def parse(self, content: str, current_source: str) -> List[Dict]:
         raise NotImplementedError
 
+    def iter_parse(self, f: TextIO, current_source: str) -> Iterator[Dict]:
+        """
+        Yield documents from an open text file (opened with newline='').
+        The default reads the whole file and delegates to `parse`; streaming
+        parsers override this to keep peak memory bounded.
+        """
+        yield from self.parse(f.read().strip(), current_source)
@@ -1,33 +1,49 @@
+import csv
+import io
 import os
-import re
-from typing import List, Dict
+import sys
+from typing import Dict, Iterable, Iterator, List
 
 from .base import BaseSourceParser
 
+# Aozora text fields hold whole works, far beyond csv's default field limit.
+_FIELD_SIZE_LIMIT = min(sys.maxsize, 2 ** 31 - 1)
 
-def parse_aozora_content(content: str) -> List[Dict]:
+
+def iter_aozora_documents(lines: Iterable[str]) -> Iterator[Dict]:
     """
-    Parse content using strict Aozora format:
+    Stream documents from Aozora format rows:
     [ID, URL, AUTHOR, TITLE],"[TEXT_CONTENT]"
-    Returns list of documents with metadata list and text.
+    `lines` is any iterable of text lines (e.g. a file opened with
+    newline=''); the csv module reads one record at a time, so quoted
+    multi-line fields and doubled "" escapes are handled without holding
+    the whole file in memory. Rows that do not start with a numeric ID
+    are skipped.
     """
-    documents: List[Dict] = []
-
-    doc_pattern = re.compile(
-        r"\n?\s*\d+,([^,]+,[^,]+,[^,]+),\"([^\"]*)\"",
-        re.DOTALL,
-    )
-
-    matches = doc_pattern.findall(content)
-    for metadata_string, text_content in matches:
-        metadata_fields = [f.strip() for f in metadata_string.split(',')]
-        clean_text = text_content.strip()
+    # The limit is process-wide (csv readers have no limit of their own), so
+    # it is raised on first use rather than at import, and never lowered:
+    # another parse may be reading a long field meanwhile.
+    if csv.field_size_limit() < _FIELD_SIZE_LIMIT:
+        csv.field_size_limit(_FIELD_SIZE_LIMIT)
+    for row in csv.reader(lines):
+        if len(row) < 5 or not row[0].strip().lstrip('\ufeff').isdigit():
+            continue
+        metadata_fields = [f.strip() for f in row[1:4]]
+        clean_text = row[4].strip()
         if clean_text:
-            documents.append({
+            yield {
                 'metadata': metadata_fields,
                 'text': clean_text,
-            })
-    return documents
+            }
+
+
+def parse_aozora_content(content: str) -> List[Dict]:
+    """
+    Parse content using strict Aozora format:
+    [ID, URL, AUTHOR, TITLE],"[TEXT_CONTENT]"
+    Returns list of documents with metadata list and text.
+    """
+    return list(iter_aozora_documents(io.StringIO(content, newline='')))
 
 
 class SimpleTextParser(BaseSourceParser):
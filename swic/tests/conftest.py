@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports its modules flat from swic/ (`from config import ...`).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,75 @@
+import os
+
+from corpus import SentenceStoreBuilder, cache, load_cache, load_sidecar, save_cache, save_sidecar
+
+
+def make_store():
+    builder = SentenceStoreBuilder()
+    builder.add_document(['作者', '題名'], ['吾輩は猫である。', '名前はまだ無い。'])
+    builder.add_document(None, ['先生', ''], [['Show0'], None])
+    return builder.build()
+
+
+def write_source(tmp_path, text='吾輩は猫である。名前はまだ無い。'):
+    source = tmp_path / 'source.csv'
+    source.write_text(text, encoding='utf-8')
+    return str(source)
+
+
+def touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def count_hashes(monkeypatch):
+    calls = []
+    hash_file = cache.hash_file
+    monkeypatch.setattr(cache, 'hash_file', lambda path: calls.append(path) or hash_file(path))
+    return calls
+
+
+def test_round_trip(tmp_path):
+    source = write_source(tmp_path)
+    store = make_store()
+    save_cache(source, store, 'csv')
+
+    loaded = load_cache(source, 'csv')
+    assert list(loaded) == list(store) == ['吾輩は猫である。', '名前はまだ無い。', '先生', '']
+    assert [loaded.metadata(i) for i in range(4)] == [(), (), ('Show0',), ()]
+    assert [loaded.doc_index(i) for i in range(4)] == [0, 0, 1, 1]
+    assert loaded.doc_metadata(0) == ('作者', '題名')
+    assert loaded.scan('猫') == [0]
+
+
+def test_stale_or_foreign_cache_is_ignored(tmp_path):
+    source = write_source(tmp_path)
+    save_cache(source, make_store(), 'csv')
+    save_sidecar(source, '.side', {}, {'data': b'abc'})
+    assert load_cache(source, 'aozora') is None  # Made by another parser
+
+    write_source(tmp_path, '吾輩は犬である。名前はまだ無い。')  # Same size, new content
+    touch(source)
+    assert load_cache(source, 'csv') is None
+    assert load_sidecar(source, '.side') is None
+
+    with open(cache.cache_path_for(source), 'r+b') as f:
+        f.write(b'NOTCACHE')
+    assert load_cache(source, 'csv') is None
+
+
+def test_touched_source_is_hashed_once(tmp_path, monkeypatch):
+    source = write_source(tmp_path)
+    save_cache(source, make_store(), 'csv')
+    save_sidecar(source, '.side', {'kind': 'test'}, {'data': b'abc'})
+    touch(source)
+
+    hashes = count_hashes(monkeypatch)
+    assert list(load_cache(source, 'csv')) == list(make_store())
+    assert load_sidecar(source, '.side')[1] == {'data': b'abc'}
+    assert len(hashes) == 2
+
+    # The new mtime was written back: no more hashing, same data.
+    assert list(load_cache(source, 'csv')) == list(make_store())
+    header, sections = load_sidecar(source, '.side')
+    assert header['kind'] == 'test' and sections == {'data': b'abc'}
+    assert len(hashes) == 2
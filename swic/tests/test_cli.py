@@ -0,0 +1,14 @@
+import cli
+
+
+def test_worker_load_keeps_stdout_for_results(tmp_path, monkeypatch, capsys):
+    source = tmp_path / 'Buncha Anime.csv'
+    source.write_text('"Show0 - 0_1_dialogue"\n先生が来た\n猫が寝た\n', encoding='utf-8')
+    monkeypatch.setattr(cli, '_session', None)  # As in a spawned worker
+
+    results = cli._lookup_batch((str(source), 1, 1, ['先生', '犬']))
+
+    assert [(r['word'], r['count']) for r in results] == [('先生', 1), ('犬', 0)]
+    out, err = capsys.readouterr()
+    assert out == ''
+    assert 'Loading text database' in err
@@ -0,0 +1,83 @@
+import threading
+import time
+
+from corpus import LoadedCorpus, SentenceStoreBuilder
+from search.federated import ResidentFederatedSearch
+from search.linear_scan import LinearScanEngine
+from search.query import Query
+
+
+def loaded(name, sentences, engine=None):
+    builder = SentenceStoreBuilder()
+    builder.add_document(None, sentences)
+    store = builder.build()
+    engine = engine or LinearScanEngine()
+    engine.build(store)
+    return LoadedCorpus(name, store, engine, '')
+
+
+class BlockingEngine(LinearScanEngine):
+    """Scans only once `release` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def iter_matches(self, word, stop=None):
+        self.release.wait(5)
+        return super().iter_matches(word, stop)
+
+
+def wait_for(search, done, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        reply = search.collect()
+        if done(reply):
+            return reply
+        time.sleep(0.01)
+    raise AssertionError(f"no reply in time: {search.collect()}")
+
+
+def statuses(reply):
+    return {s['source']: (s['status'], s['count']) for s in reply['sources']}
+
+
+def test_sources_answer_independently():
+    blocking = BlockingEngine()
+    search = ResidentFederatedSearch({
+        'slow': loaded('slow', ['先生が来た'], blocking),
+        'fast': loaded('fast', ['先生が怒った', '猫', '先生'], None),
+    })
+    search.search('先生', limit=1)
+    reply = wait_for(search, lambda r: statuses(r)['fast'][0] == 'ok')
+    assert statuses(reply) == {'slow': ('pending', None), 'fast': ('ok', 2)}
+    assert [(hit['source'], hit['sentence']) for hit in reply['results']] == [('fast', 0)]
+
+    blocking.release.set()
+    reply = wait_for(search, lambda r: r['complete'])
+    assert statuses(reply) == {'slow': ('ok', 1), 'fast': ('ok', 2)}
+    search.close()
+
+
+def test_new_search_supersedes_the_previous_one():
+    blocking = BlockingEngine()
+    search = ResidentFederatedSearch({'slow': loaded('slow', ['先生', '猫'], blocking)})
+    first = search.search('先生')
+    second = search.search('猫')
+    assert second['query_id'] == first['query_id'] + 1
+    blocking.release.set()
+    reply = wait_for(search, lambda r: r['complete'])
+    assert [hit['sentence'] for hit in reply['results']] == [1]
+    search.close()
+
+
+def test_evaluation_ends_once_stopped():
+    sentences = ['先生が来た'] * 10000
+    engine = LinearScanEngine()
+    engine.build(sentences)
+    stop = threading.Event()
+    stop.set()
+    for text in ['/先生/', '先生 NOT 猫', '先生 NEAR/1 /来/']:
+        query = Query(text)
+        assert len(query.evaluate(sentences, engine, stop=stop)) < len(sentences)
+        assert len(query.evaluate(sentences, engine)) == len(sentences)
@@ -0,0 +1,60 @@
+import pytest
+
+from config import KUROMOJI_DICT_DIR
+from morph import DictionaryError
+from search.lemma_index import LemmaIndex, analyze_sentences, tokenizer_for
+from search.linear_scan import LinearScanEngine
+from search.query import Query
+
+
+SENTENCES = [
+    '昨日はりんごを食べた。',
+    '何も食べない。',
+    '明日は寿司を食べる予定だ。',
+    '本を読んだ。',
+]
+
+
+@pytest.fixture(scope='module')
+def tokenizer():
+    return tokenizer_for(KUROMOJI_DICT_DIR)
+
+
+@pytest.fixture(scope='module')
+def index(tokenizer):
+    index = LemmaIndex(tokenizer, SENTENCES)
+    for batch in analyze_sentences(SENTENCES, tokenizer, KUROMOJI_DICT_DIR):
+        for analysis in batch:
+            index.add(analysis)
+    return index
+
+
+def test_tokenizer_reads_shipped_dictionary(tokenizer):
+    tokens = tokenizer.tokenize('りんごを食べた')
+    assert [t.surface for t in tokens] == ['りんご', 'を', '食べ', 'た']
+    assert tokens[2].basic_form == '食べる'
+    assert tokens[2].pos == '動詞'
+    assert tokens[2].reading == 'タベ'
+
+
+def test_lemma_query_finds_inflections(index):
+    engine = LinearScanEngine()
+    engine.build(SENTENCES)
+    query = Query('~食べる')
+    assert query.uses_lemmas
+    hits = query.evaluate(SENTENCES, engine, index)
+    assert [SENTENCES[i] for i in hits] == SENTENCES[:3]
+    spans = query.spans(SENTENCES, engine, hits, index)
+    assert [SENTENCES[s.sentence][s.start:s.end] for s in spans] == ['食べ', '食べ', '食べる']
+
+
+def test_lemma_query_needs_index():
+    engine = LinearScanEngine()
+    engine.build(SENTENCES)
+    with pytest.raises(ValueError):
+        Query('~食べる').evaluate(SENTENCES, engine)
+
+
+def test_missing_dictionary_is_reported(tmp_path):
+    with pytest.raises(DictionaryError):
+        tokenizer_for(str(tmp_path))
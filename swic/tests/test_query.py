@@ -0,0 +1,73 @@
+import pytest
+
+from corpus import SentenceStoreBuilder
+from search.linear_scan import LinearScanEngine
+from search.ngram_index import NgramIndex
+from search.query import Query, QueryError, parse_query, tokenize
+
+
+def make_store():
+    builder = SentenceStoreBuilder()
+    builder.add_document(None, ['先生が怒った。', '猫が寝た。', '先生は猫が好きだ。'])
+    builder.add_document(None, ['教師が来た。', '山の上で走った。', 'から始まる'])
+    return builder.build()
+
+
+def test_tokenize():
+    assert list(tokenize('先生 AND "山 の 上" /走(る|った)/ ~食べる NEAR/2 (a OR b)')) == [
+        ('term', '先生'), ('op', 'AND'), ('phrase', '山 の 上'), ('regex', '走(る|った)'),
+        ('lemma', '食べる'), ('op', 'NEAR/2'), ('(', '('), ('term', 'a'), ('op', 'OR'),
+        ('term', 'b'), (')', ')'),
+    ]
+    assert list(tokenize(r'"say \"hi\""')) == [('phrase', 'say "hi"')]
+
+
+def test_precedence():
+    assert repr(parse_query('a b OR c')) == "Or([And([Term('a'), Term('b')]), Term('c')])"
+    assert repr(parse_query('NOT a NEAR/1 b')) == "Near(Not(Term('a')), Term('b'), 1)"
+    assert repr(parse_query('(a OR b) c')) == "And([Or([Term('a'), Term('b')]), Term('c')])"
+
+
+@pytest.mark.parametrize('text', ['', 'a OR', '(a', 'a )', '"open', '//', '/(/'])
+def test_bad_syntax(text):
+    with pytest.raises(QueryError):
+        Query(text)
+
+
+def test_literal_queries():
+    assert Query('先生').literal == '先生'
+    assert Query('"山 の 上"').literal == '山 の 上'
+    assert Query('先生 猫').literal is None
+    assert Query('~食べる').uses_lemmas and not Query('先生 /猫/').uses_lemmas
+
+
+@pytest.mark.parametrize('engine_class', [LinearScanEngine, NgramIndex])
+@pytest.mark.parametrize('text, hits', [
+    ('先生 猫', [2]),
+    ('先生 OR 教師', [0, 2, 3]),
+    ('猫 NOT 先生', [1]),
+    ('NOT が', [4, 5]),
+    ('/走(る|った)/', [4]),
+    ('/た。$/ NOT /^先生/', [1, 3, 4]),
+    ('"山の上"', [4]),
+    ('先生 NEAR/1 猫', [0, 2]),
+    ('先生 NEAR/0 猫', [2]),
+    ('教師 NEAR/1 猫', []),  # Different documents
+    ('/来/ NEAR/1 /走/', [3]),
+    ('(先生 OR 教師) NOT 猫', [0, 3]),
+])
+def test_evaluate(engine_class, text, hits):
+    store = make_store()
+    engine = engine_class()
+    engine.build(store)
+    assert Query(text).evaluate(store, engine) == hits
+
+
+def test_spans():
+    store = make_store()
+    engine = LinearScanEngine()
+    engine.build(store)
+    spans = Query('先生 /猫./').spans(store, engine, [0, 1, 2])
+    assert [(s.sentence, store[s.sentence][s.start:s.end]) for s in spans] == [
+        (0, '先生'), (1, '猫が'), (2, '先生'), (2, '猫が'),
+    ]
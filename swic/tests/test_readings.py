@@ -0,0 +1,22 @@
+from config import KUROMOJI_DICT_DIR
+from morph import ReadingCache, sentence_readings
+from search.lemma_index import tokenizer_for
+
+
+def test_readings_from_shipped_dictionary():
+    readings = sentence_readings(tokenizer_for(KUROMOJI_DICT_DIR), '東京で寿司を食べた。')
+    assert readings == [
+        ['東京', 'とうきょう'], ['で', ''], ['寿司', 'すし'], ['を', ''],
+        ['食べ', 'たべ'], ['た', ''], ['。', ''],
+    ]
+
+
+def test_reading_cache_evicts_least_recently_used():
+    cache = ReadingCache(tokenizer_for(KUROMOJI_DICT_DIR), max_sentences=2)
+    first = cache.get('corpus', 0, '日本')
+    second = cache.get('corpus', 1, '東京')
+    assert cache.get('corpus', 0, '日本') is first
+    cache.get('corpus', 2, '大阪')  # evicts sentence 1, used least recently
+    assert len(cache) == 2
+    assert cache.get('corpus', 0, '日本') is first
+    assert cache.get('corpus', 1, '東京') is not second
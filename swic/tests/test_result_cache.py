@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from search.result_cache import ResultCache, decode_matches, encode_matches
+
+
+@pytest.mark.parametrize('matches', [
+    [],
+    [0],
+    [5, 127, 128, 16384, 2 ** 40],  # Varint gaps of one to six bytes
+    list(range(1000, 3000)),  # Dense: stored as a bitmap
+    list(range(7, 100000, 3)),
+])
+def test_encode_decode(matches):
+    assert list(decode_matches(encode_matches(matches))) == matches
+
+
+def test_dense_sets_use_bitmaps():
+    dense = list(range(100, 1100))
+    sparse = list(range(0, 100000, 100))
+    assert encode_matches(dense)[0] == 1 and len(encode_matches(dense)) == 9 + 1000 // 8
+    assert encode_matches(sparse)[0] == 0
+
+
+def test_random_sets_round_trip():
+    rng = random.Random(0)
+    for _ in range(200):
+        size = rng.randint(1, 5000)
+        matches = sorted(rng.sample(range(size * rng.choice([1, 2, 50])), size))
+        assert list(decode_matches(encode_matches(matches))) == matches
+
+
+def test_cache_lru_and_invalidation():
+    cache = ResultCache(max_bytes=3 * (ResultCache.ENTRY_OVERHEAD + 10))
+    cache.put(('a.csv', 1), '先生', [1, 2, 3])
+    cache.put(('a.csv', 1), '猫 ', [4])
+    matches, count = cache.get(('a.csv', 1), ' 猫')  # Keys are normalised
+    assert (list(matches), count) == ([4], 1)
+
+    cache.put(('b.csv', 1), '先生', [9])
+    cache.put(('b.csv', 1), '犬', [])  # Over budget: evicts 先生 of a.csv
+    assert cache.get(('a.csv', 1), '先生') is None
+    assert len(cache) == 3
+
+    cache.invalidate('a.csv')
+    assert cache.get(('a.csv', 1), '猫') is None
+    assert list(cache.get(('b.csv', 1), '先生')[0]) == [9]
+    assert cache.nbytes == sum(
+        len(encode_matches(m)) + len(q) + ResultCache.ENTRY_OVERHEAD for q, m in (('先生', [9]), ('犬', []))
+    )
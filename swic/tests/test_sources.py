@@ -0,0 +1,27 @@
+import csv
+import os
+import subprocess
+import sys
+
+from sources.common import parse_aozora_content
+
+SWIC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_leaves_csv_field_limit_alone():
+    code = (
+        'import csv; limit = csv.field_size_limit(); import sources; '
+        'assert csv.field_size_limit() == limit, csv.field_size_limit()'
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=SWIC_DIR, check=True)
+
+
+def test_parses_fields_beyond_default_limit():
+    limit = csv.field_size_limit(128 * 1024)  # The csv module's default
+    text = '猫' * (128 * 1024 + 1)
+    content = f'1,https://example.com,作者,題名,"{text}"\nid,url,author,title,text\n'
+    try:
+        documents = parse_aozora_content(content)
+    finally:
+        csv.field_size_limit(limit)
+    assert documents == [{'metadata': ['https://example.com', '作者', '題名'], 'text': text}]
@@ -0,0 +1,49 @@
+from array import array
+
+from config import KUROMOJI_DICT_DIR
+from search.lemma_index import analyze_sentences, tokenizer_for
+from search.stats import CorpusStats
+
+
+SENTENCES = ['私は寿司を食べた。', '彼は何も食べない。', '猫が寿司を食べる。']
+GROUPS = {'author': (['A', 'B'], array('I', [0, 0, 1]))}
+
+
+def build_stats():
+    tokenizer = tokenizer_for(KUROMOJI_DICT_DIR)
+    stats = CorpusStats(tokenizer)
+    stats.begin(GROUPS)
+    for batch in analyze_sentences(SENTENCES, tokenizer, KUROMOJI_DICT_DIR):
+        for analysis in batch:
+            stats.add(analysis)
+    stats.finish()
+    return stats
+
+
+def test_counts_by_dictionary_form():
+    stats = build_stats()
+    assert stats.sentences == 3
+    assert stats.frequency('食べる') == 3
+    assert stats.frequency('食べた') == 3
+    assert stats.frequency('寿司') == 2
+    assert stats.frequency('犬') == 0
+    sizes = stats.group_tokens['author']
+    assert stats.group_frequencies('食べる', 'author') == [('A', 2, sizes[0]), ('B', 1, sizes[1])]
+    assert stats.collocates('寿司', 'right') == [('を', 2)]
+    assert stats.collocates('食べる', 'left') == [('を', 2), ('も', 1)]
+    # Punctuation breaks adjacency.
+    assert stats.collocates('た', 'right') == []
+
+
+def test_save_and_load(tmp_path):
+    source = str(tmp_path / 'source.csv')
+    (tmp_path / 'source.csv').write_text('text\n', encoding='utf-8')
+    stats = build_stats()
+    stats.save(source, KUROMOJI_DICT_DIR)
+
+    loaded = CorpusStats(stats.tokenizer)
+    assert loaded.load(source, SENTENCES, KUROMOJI_DICT_DIR, ['author'])
+    assert loaded.top_words(5) == stats.top_words(5)
+    assert loaded.collocates('食べる', 'left') == stats.collocates('食べる', 'left')
+    assert loaded.group_frequencies('寿司', 'author') == stats.group_frequencies('寿司', 'author')
+    assert not CorpusStats(stats.tokenizer).load(source, SENTENCES[:2], KUROMOJI_DICT_DIR, ['author'])
@@ -0,0 +1,39 @@
+import random
+
+from search.concordance import concordance
+from search.linear_scan import LinearScanEngine
+from search.suffix_array import SuffixArrayIndex, build_suffix_array
+
+
+SENTENCES = ['食べてしまう', '読んでしまった', '私は食べた', '', 'しまう', '猫が食べてしまう']
+
+
+def build(engine_class, sentences=SENTENCES):
+    engine = engine_class()
+    engine.build(sentences)
+    return engine
+
+
+def test_build_matches_sorted_suffixes():
+    rng = random.Random(0)
+    for _ in range(500):
+        text = ''.join(rng.choice('ab\x00c') for _ in range(rng.randint(0, 40)))
+        assert list(build_suffix_array(text)) == sorted(range(len(text)), key=lambda i: text[i:])
+
+
+def test_matches_agree_with_scan():
+    index, scan = build(SuffixArrayIndex), build(LinearScanEngine)
+    for word in ['しまう', 'しま', '食べ', 'て', '猫', '犬', 'うし', '']:
+        hits = index.find(word)
+        assert hits == scan.find(word)
+        assert index.match_count(word) == len(hits)
+    assert index.count('しま') == 4
+    assert index.locate('食べ') == [(0, 0), (2, 2), (5, 2)]
+
+
+def test_concordance_orders_agree_with_fallback():
+    index, scan = build(SuffixArrayIndex), build(LinearScanEngine)
+    for word in ['しま', '食べ', 'て']:
+        for order in ('left', 'corpus'):
+            assert concordance(index, SENTENCES, word, order) == concordance(scan, SENTENCES, word, order)
+    assert concordance(index, SENTENCES, 'しま', 'right') == [(5, 5), (4, 0), (0, 3), (1, 3)]
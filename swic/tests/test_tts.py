@@ -0,0 +1,72 @@
+import io
+import os
+import threading
+import wave
+
+import pytest
+
+from tts import AudioCache, StubSynthesizer
+
+
+def wav_seconds(path):
+    with wave.open(path, 'rb') as f:
+        return f.getnframes() / f.getframerate()
+
+
+def test_stub_synthesizer_makes_wav_by_text_length():
+    stub = StubSynthesizer()
+    short, long = stub.synthesize('猫', 'ja'), stub.synthesize('吾輩は猫である', 'ja')
+    assert stub.calls == 2
+    with wave.open(io.BytesIO(long), 'rb') as f:
+        assert f.getnframes() == int(7 * stub.sample_rate * stub.seconds_per_char)
+    assert len(short) < len(long)
+
+
+def test_hits_skip_synthesis(tmp_path):
+    stub = StubSynthesizer()
+    cache = AudioCache(str(tmp_path), stub, max_bytes=1 << 20)
+    path = cache.get('吾輩は猫である', 'ja')
+    assert wav_seconds(path) == pytest.approx(7 * stub.seconds_per_char)
+    assert cache.get('吾輩は猫である', 'ja') == path
+    assert stub.calls == 1
+    assert cache.contains('吾輩は猫である', 'ja') and not cache.contains('吾輩は猫である', 'en')
+
+
+def test_eviction_keeps_the_recently_used(tmp_path):
+    stub = StubSynthesizer()
+    size = len(stub.synthesize('あいう', 'ja'))
+    cache = AudioCache(str(tmp_path), stub, max_bytes=2 * size)
+    first = cache.get('あいう', 'ja')
+    second = cache.get('かきく', 'ja')
+    cache.get('あいう', 'ja')  # Now more recent than かきく
+    third = cache.get('さしす', 'ja')
+
+    assert len(cache) == 2 and cache.nbytes == 2 * size
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert not cache.contains('かきく', 'ja')
+
+
+def test_use_order_survives_restart(tmp_path):
+    stub = StubSynthesizer()
+    cache = AudioCache(str(tmp_path), stub, max_bytes=1 << 20)
+    paths = [cache.get(text, 'ja') for text in ('あいう', 'かきく')]
+    os.utime(paths[1], (1, 1))  # かきく, though made last, was used long ago
+
+    size = len(stub.synthesize('あいう', 'ja'))
+    reopened = AudioCache(str(tmp_path), stub, max_bytes=2 * size)
+    assert len(reopened) == 2
+    reopened.get('さしす', 'ja')
+    assert os.path.exists(paths[0]) and not os.path.exists(paths[1])
+    assert len(reopened) == 2
+
+
+def test_concurrent_requests_synthesize_once(tmp_path):
+    stub = StubSynthesizer()
+    cache = AudioCache(str(tmp_path), stub, max_bytes=1 << 20)
+    threads = [threading.Thread(target=cache.get, args=('吾輩は猫である', 'ja')) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stub.calls == 1
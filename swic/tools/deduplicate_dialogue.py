@@ -1,67 +1,269 @@
+import argparse
+import hashlib
+import multiprocessing
 import os
+import re
+import unicodedata
+from array import array
+from collections import deque
 
-INPUT_FILE = "all_dialogues_merged.csv"
-OUTPUT_FILE = "all_dialogues_unique.csv"
+# --- Configuration ---
+# Merged dialogue file written by srt_cleaned_joiner_to_csv.py
+INPUT_FILE = "all_dialogues_merged.txt"
 
-def remove_duplicate_sentences():
+# Deduplicated output
+OUTPUT_FILE = "all_dialogues_unique.txt"
+
+# Lines are hashed in chunks of about this many bytes, one chunk per task.
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Near-duplicate mode (--near): MinHash over character shingles, split into
+# LSH bands. Two lines collide in a band when all of its rows agree; with
+# 8 bands of 8 rows, lines whose shingle sets have a Jaccard similarity
+# around 0.77 collide half of the time, and 0.9 almost always. More bands
+# (of fewer rows) also catch looser variants.
+SHINGLE_CHARS = 3
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 8
+# ---------------------
+
+_MERSENNE_61 = (1 << 61) - 1
+_PASS_THROUGH = 0  # Key of blank lines and "filename" markers
+
+
+def is_marker_line(stripped_line):
+    """Blank lines and quoted filename lines ("file.txt") are kept as they are."""
+    return not stripped_line or (stripped_line.startswith('"') and stripped_line.endswith('"'))
+
+
+def fingerprint(text, size):
+    """`size`-byte blake2b digest of `text` as an int; never 0, which marks pass-through lines."""
+    value = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=size).digest(), 'little')
+    return value or 1
+
+
+_IGNORED = re.compile(r'[\s　]+')
+
+
+def normalize(text):
+    """
+    Key for near-duplicate matching: NFKC (full-width letters and digits
+    become half-width), lower case, without spaces, punctuation or symbols.
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    return ''.join(
+        ch for ch in _IGNORED.sub('', text) if unicodedata.category(ch)[0] not in 'PSZ'
+    )
+
+
+def _permutations(count):
+    """(a, b) of the hash functions (a * x + b) mod 2^61 - 1, fixed so shards agree."""
+    params = []
+    for i in range(count):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'little') % (_MERSENNE_61 - 1) + 1
+        b = int.from_bytes(digest[8:], 'little') % _MERSENNE_61
+        params.append((a, b))
+    return params
+
+
+def band_keys(text, permutations, bands):
+    """
+    LSH band keys of `text`'s MinHash signature, or [] when it is shorter
+    than a shingle (such lines are only matched exactly).
+    """
+    if len(text) < SHINGLE_CHARS:
+        return []
+    shingles = {
+        int.from_bytes(hashlib.blake2b(text[i:i + SHINGLE_CHARS].encode('utf-8'), digest_size=8).digest(), 'little')
+        for i in range(len(text) - SHINGLE_CHARS + 1)
+    }
+    signature = [min((a * x + b) % _MERSENNE_61 for x in shingles) for a, b in permutations]
+    rows = len(signature) // bands
+    return [
+        # The band number is part of the key, so equal rows in different bands differ.
+        fingerprint(f"{band}:" + ','.join(map(str, signature[band * rows:(band + 1) * rows])), 8)
+        for band in range(bands)
+    ]
+
+
+def chunk_ranges(path, chunk_bytes):
+    """[start, end) byte ranges of `path` of about `chunk_bytes`, each ending after a newline."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()  # Finish the line the cut falls in
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def _read_lines(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
+
+
+def hash_chunk(task):
     """
-    Reads the merged dialogue file and filters out duplicate lines,
-    preserving the order of the *first* occurrence of each unique line.
+    Keys of every line in one byte range, in order: the line's exact
+    fingerprint (or its normalized one in near mode), 0 for pass-through
+    lines, packed as `fp_bytes`-byte integers; in near mode also the band
+    keys of each line (`bands` per line, all 0 for short lines).
     """
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: Input file '{INPUT_FILE}' not found. Please run the merge script first.")
+    path, start, end, fp_bytes, near, num_perm, bands = task
+    permutations = _permutations(num_perm) if near else None
+    keys = bytearray()
+    band_table = array('Q')
+    for raw in _read_lines(path, start, end):
+        stripped_line = raw.decode('utf-8', errors='replace').strip()
+        if is_marker_line(stripped_line):
+            keys += _PASS_THROUGH.to_bytes(fp_bytes, 'little')
+            if near:
+                band_table.extend([0] * bands)
+            continue
+        text = normalize(stripped_line) if near else stripped_line
+        keys += fingerprint(text or stripped_line, fp_bytes).to_bytes(fp_bytes, 'little')
+        if near:
+            line_bands = band_keys(text, permutations, bands)
+            band_table.extend(line_bands or [0] * bands)
+    return bytes(keys), band_table
+
+
+def _hashed_chunks(tasks, workers):
+    """hash_chunk over `tasks` in order, on `workers` processes with a bounded number in flight."""
+    if workers <= 1:
+        for task in tasks:
+            yield hash_chunk(task)
         return
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with context.Pool(workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(hash_chunk, (task,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
 
-    # Use an OrderedDict (or list + set combination) to preserve original order
-    # while ensuring uniqueness. We'll use a set for simplicity and speed.
-    unique_lines = set()
-    output_lines = []
-    
-    line_count = 0
-    unique_count = 0
 
-    print(f"Starting deduplication of '{INPUT_FILE}'...")
-    
-    try:
-        # Read the file
-        with open(INPUT_FILE, 'r', encoding='utf-8') as infile:
-            for line in infile:
-                line_count += 1
-                
-                # Strip whitespace, including the newline character
-                stripped_line = line.strip()
-                
-                # We want to skip empty lines, lines only containing filenames, 
-                # and lines that are already in our unique set.
-
-                # Check if the line is just the quoted filename (e.g., "file.txt")
-                # and is not dialogue we want to deduplicate.
-                is_filename_line = stripped_line.startswith('"') and stripped_line.endswith('"')
-
-                if is_filename_line or not stripped_line:
-                    # Keep the filename markers and blank lines in the output, but don't count them
-                    # for dialogue deduplication.
-                    output_lines.append(line)
-                    continue
-
-                # Deduplication check:
-                if stripped_line not in unique_lines:
-                    unique_lines.add(stripped_line)
-                    output_lines.append(line) # Keep the original line (with its newline char)
-                    unique_count += 1
-                    
-        # Write the unique lines to the new output file
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as outfile:
-            outfile.writelines(output_lines)
-            
-        print(f"\n--- Operation Complete ---")
-        print(f"Total lines read: {line_count}")
-        print(f"Unique dialogue lines found: {unique_count}")
-        print(f"Duplicates removed: {line_count - unique_count}")
-        print(f"Output saved to: {OUTPUT_FILE}")
+def remove_duplicate_sentences(
+    input_file=INPUT_FILE,
+    output_file=OUTPUT_FILE,
+    near=False,
+    fingerprint_bits=64,
+    workers=1,
+    num_perm=MINHASH_PERMUTATIONS,
+    bands=LSH_BANDS,
+    chunk_bytes=CHUNK_BYTES,
+):
+    """
+    Copies the merged dialogue file, dropping every dialogue line seen
+    before and keeping the first occurrence in place; filename markers and
+    blank lines are kept. Only fingerprints of the lines seen are held in
+    memory, and output is written while reading.
+
+    Lines are hashed in byte-range chunks, on `workers` processes when
+    more than one, then deduplicated in order in this process, which
+    re-reads each chunk to copy the lines it keeps. With `near`, lines
+    equal after normalize() are duplicates too, and so are lines whose
+    MinHash signatures share an LSH band with an earlier kept line.
+    """
+    if not os.path.exists(input_file):
+        print(f"Error: Input file '{input_file}' not found. Please run the merge script first.")
+        return
+    if fingerprint_bits not in (64, 128):
+        raise ValueError("fingerprint_bits must be 64 or 128")
+    if num_perm % bands:
+        raise ValueError("the number of permutations must be a multiple of the number of bands")
+    fp_bytes = fingerprint_bits // 8
 
+    seen = set()
+    seen_bands = [set() for _ in range(bands)] if near else []
+    line_count = dialogue_count = exact_duplicates = near_duplicates = 0
+
+    mode = f"near-duplicate (MinHash {num_perm}x{bands} bands)" if near else "exact"
+    print(f"Starting {mode} deduplication of '{input_file}' with {workers} worker(s)...")
+
+    tasks = (
+        (input_file, start, end, fp_bytes, near, num_perm, bands)
+        for start, end in chunk_ranges(input_file, chunk_bytes)
+    )
+    tmp_file = output_file + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as outfile:
+            for (start, end), (keys, band_table) in zip(
+                chunk_ranges(input_file, chunk_bytes), _hashed_chunks(tasks, workers)
+            ):
+                for i, raw in enumerate(_read_lines(input_file, start, end)):
+                    line_count += 1
+                    key = int.from_bytes(keys[i * fp_bytes:(i + 1) * fp_bytes], 'little')
+                    if key == _PASS_THROUGH:
+                        outfile.write(raw)
+                        continue
+                    dialogue_count += 1
+                    if key in seen:
+                        exact_duplicates += 1
+                        continue
+                    seen.add(key)
+                    if near:
+                        line_bands = band_table[i * bands:(i + 1) * bands]
+                        if line_bands[0] and any(k in s for k, s in zip(line_bands, seen_bands)):
+                            near_duplicates += 1
+                            continue
+                        if line_bands[0]:
+                            for k, s in zip(line_bands, seen_bands):
+                                s.add(k)
+                    outfile.write(raw)
+                print(f"  -> {line_count} lines read, {dialogue_count - exact_duplicates - near_duplicates} unique so far")
+        os.replace(tmp_file, output_file)
     except Exception as e:
         print(f"An error occurred during processing: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return
+
+    unique_count = dialogue_count - exact_duplicates - near_duplicates
+    print(f"\n--- Operation Complete ---")
+    print(f"Total lines read: {line_count}")
+    print(f"Dialogue lines: {dialogue_count}")
+    print(f"Unique dialogue lines found: {unique_count}")
+    print(f"Duplicates removed: {exact_duplicates}")
+    if near:
+        print(f"Near-duplicates removed: {near_duplicates}")
+    print(f"Output saved to: {output_file}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove repeated dialogue lines from a merged dialogue file.")
+    parser.add_argument('input', nargs='?', default=INPUT_FILE, help="merged dialogue file (default: %(default)s)")
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE, help="output file (default: %(default)s)")
+    parser.add_argument(
+        '--near', action='store_true',
+        help="also drop near-duplicates: lines differing only in punctuation, spacing or width, "
+             "and lines with similar MinHash signatures",
+    )
+    parser.add_argument('--bits', type=int, choices=(64, 128), default=64, help="fingerprint size (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="hashing processes (default: %(default)s)")
+    parser.add_argument('--num-perm', type=int, default=MINHASH_PERMUTATIONS, help="MinHash permutations (default: %(default)s)")
+    parser.add_argument('--bands', type=int, default=LSH_BANDS, help="LSH bands; more bands match looser variants (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        remove_duplicate_sentences(
+            args.input, args.output, near=args.near, fingerprint_bits=args.bits,
+            workers=args.workers, num_perm=args.num_perm, bands=args.bands,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
 
 if __name__ == "__main__":
-    remove_duplicate_sentences()
+    main()
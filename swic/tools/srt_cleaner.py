@@ -1,5 +1,11 @@
+import argparse
+import codecs
+import hashlib
+import json
+import multiprocessing
 import os
 import re
+import time
 
 # --- Configuration ---
 # Directory where your .srt files are located (from the previous download script)
@@ -7,44 +13,75 @@ SRT_DIRECTORY = "japanese_subtitles"
 
 # Directory where the cleaned .txt files will be saved
 OUTPUT_DIRECTORY = "cleaned_dialogues"
+
+# Record of the sources already cleaned (size, mtime and hash of each), kept
+# in the output directory so that re-runs only clean new or changed files.
+MANIFEST_FILE = ".srt_manifest.json"
+
+# Bump when the cleaning rules change, so that every file is cleaned again.
+CLEANER_VERSION = 1
+
+# The manifest is saved after this many processed files, so an interrupted
+# run keeps most of its progress.
+MANIFEST_SAVE_EVERY = 100
 # ---------------------
 
-def read_srt_file_with_fallback(filepath):
+# Byte order marks, longest first (the UTF-32 LE mark starts with UTF-16 LE's).
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Tried in order when there is no BOM. UTF-8 comes first: Shift JIS text is
+# almost never valid UTF-8, while UTF-8 Japanese sometimes decodes as
+# (garbled) Shift JIS. cp932 adds the Windows extensions (①, ㈱, ...).
+FALLBACK_ENCODINGS = ['utf-8', 'shift_jis', 'cp932']
+
+
+def _guess_utf16_without_bom(data):
+    """'utf-16-le' or 'utf-16-be' when every other byte is mostly NUL, as in ASCII-heavy UTF-16."""
+    sample = data[:4096]
+    if len(sample) < 4:
+        return None
+    even_nuls = sample[0::2].count(0)
+    odd_nuls = sample[1::2].count(0)
+    half = len(sample) // 2
+    if odd_nuls > half * 0.3 and even_nuls < half * 0.05:
+        return 'utf-16-le'
+    if even_nuls > half * 0.3 and odd_nuls < half * 0.05:
+        return 'utf-16-be'
+    return None
+
+
+def decode_srt_bytes(data):
     """
-    Reads a file attempting Shift JIS first, then UTF-8, to handle common 
-    Japanese subtitle encodings and prevent UnicodeDecodeError.
+    Decodes the raw bytes of a subtitle file in memory: by its BOM if it
+    has one, as BOM-less UTF-16 if it looks like it, else with the first
+    of FALLBACK_ENCODINGS that fits. Returns (text, encoding), or
+    (None, None) if nothing fits. Line endings are normalized to '\\n'.
     """
-    encodings = ['shift_jis', 'utf-8']
-    content = None
-    
-    for encoding in encodings:
+    candidates = [encoding for bom, encoding in BOMS if data.startswith(bom)][:1]
+    if not candidates:
+        utf16 = _guess_utf16_without_bom(data)
+        candidates = ([utf16] if utf16 else []) + FALLBACK_ENCODINGS
+
+    for encoding in candidates:
         try:
-            with open(filepath, 'r', encoding=encoding) as f:
-                content = f.read()
-            print(f"  -> Successfully decoded with {encoding}")
-            return content
+            text = data.decode(encoding)
         except UnicodeDecodeError:
             continue  # Try the next encoding
-        except Exception as e:
-            print(f"  -> ERROR reading file {os.path.basename(filepath)}: {e}")
-            return None
-
-    # If all primary encodings fail, issue a warning and skip
-    print(f"  -> WARNING: Failed to decode {os.path.basename(filepath)} with common Japanese encodings. Skipping.")
-    return None
+        return text.replace('\r\n', '\n').replace('\r', '\n'), encoding
+    return None, None
 
 
-def clean_srt_file(srt_filepath):
+def clean_srt_text(content):
     """
-    Reads an SRT file, strips timecodes and sequence numbers, and returns
-    only the clean dialogue lines.
+    Strips timecodes and sequence numbers from the text of an SRT file and
+    returns only the clean dialogue lines.
     """
-    print(f"  -> Processing: {os.path.basename(srt_filepath)}")
-    
-    content = read_srt_file_with_fallback(srt_filepath)
-    if content is None:
-        return "" # Return empty string if reading failed
-
     # 1. Remove sequence numbers (e.g., '1', '2', '3')
     # This pattern matches one or more digits at the start of a line.
     content = re.sub(r'^\d+\n', '', content, flags=re.MULTILINE)
@@ -52,70 +89,215 @@ def clean_srt_file(srt_filepath):
     # 2. Remove timecode lines (e.g., '00:00:00,000 --> 00:00:02,500')
     # This pattern is robust for standard SRT time formats.
     content = re.sub(r'\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}\n', '', content)
-    
+
     # --- Post-Processing ---
-    
-    # Split into lines
-    lines = content.split('\n')
-    
-    cleaned_lines = []
-    for line in lines:
-        # Strip whitespace from each line
-        stripped_line = line.strip()
-        
-        # Only keep lines that are not empty
-        if stripped_line:
-            cleaned_lines.append(stripped_line)
-
-    # Join the final list of clean lines with a single newline
+
+    # Keep the non-empty lines, stripped, joined with a single newline
+    cleaned_lines = [line.strip() for line in content.split('\n') if line.strip()]
     return '\n'.join(cleaned_lines)
 
-def main():
-    """Main function to iterate over all SRT files and clean them."""
-    
+
+def output_filename_for(srt_filename):
+    """Cleaned dialogue file name for an .srt file name (changing .srt to _dialogue.txt)."""
+    return f"{os.path.splitext(srt_filename)[0]}_dialogue.txt"
+
+
+def load_manifest(path):
+    """The manifest's entries by source file name; empty if missing, unreadable or from another cleaner version."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != CLEANER_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def save_manifest(path, files):
+    """Writes the manifest atomically."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CLEANER_VERSION, 'files': files}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _remove_stale_output(output_filepath):
+    """Deletes the dialogue cleaned from an earlier version of a source that no longer yields any."""
+    if os.path.exists(output_filepath):
+        os.remove(output_filepath)
+
+
+def process_srt_file(task):
+    """
+    Pool task: cleans one .srt file and writes its dialogue. The file is
+    read once; if its hash matches `known_hash` and the output exists it
+    is left alone. If it fails to decode or has no dialogue, the output
+    of an earlier version is removed so it is not merged again. Returns a result dict for the manifest and the
+    throughput report ('status' is saved, unchanged, empty or failed).
+    """
+    srt_filename, srt_directory, output_directory, known_hash = task
+    started = time.perf_counter()
+    srt_filepath = os.path.join(srt_directory, srt_filename)
+    output_filename = output_filename_for(srt_filename)
+    result = {
+        'source': srt_filename,
+        'output': output_filename,
+        'worker': os.getpid(),
+        'bytes': 0,
+        'encoding': None,
+        'error': '',
+    }
+    try:
+        stat = os.stat(srt_filepath)
+        with open(srt_filepath, 'rb') as f:
+            data = f.read()
+        result.update(
+            bytes=len(data),
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=hashlib.sha256(data).hexdigest(),
+        )
+        output_filepath = os.path.join(output_directory, output_filename)
+        if result['sha256'] == known_hash and os.path.exists(output_filepath):
+            result['status'] = 'unchanged'  # Only touched
+            return result
+
+        content, result['encoding'] = decode_srt_bytes(data)
+        if content is None:
+            result['status'] = 'failed'
+            result['error'] = "could not decode with common Japanese encodings"
+            _remove_stale_output(output_filepath)
+            return result
+
+        dialogue = clean_srt_text(content)
+        if not dialogue:
+            result['status'] = 'empty'
+            _remove_stale_output(output_filepath)
+            return result
+
+        # Use UTF-8 for the output file to ensure it's easily readable everywhere
+        with open(output_filepath, 'w', encoding='utf-8') as outfile:
+            outfile.write(dialogue)
+        result['status'] = 'saved'
+    except OSError as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+    finally:
+        result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def _is_up_to_date(entry, srt_filepath, output_directory):
+    """Whether the manifest `entry` still describes the source file, so it needs no cleaning."""
+    if not entry or entry.get('status') not in ('saved', 'unchanged', 'empty', 'failed'):
+        return False
+    try:
+        stat = os.stat(srt_filepath)
+    except OSError:
+        return False
+    if (entry.get('size'), entry.get('mtime_ns')) != (stat.st_size, stat.st_mtime_ns):
+        return False
+    if entry['status'] in ('saved', 'unchanged'):
+        return os.path.exists(os.path.join(output_directory, entry['output']))
+    return True  # Empty or undecodable before, and not changed since
+
+
+def print_worker_report(results, wall_seconds):
+    """Files, megabytes, busy time and throughput per worker process, and overall."""
+    per_worker = {}
+    for result in results:
+        stats = per_worker.setdefault(result['worker'], [0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += result['bytes']
+        stats[2] += result['seconds']
+    print("\n--- Throughput per worker ---")
+    for worker, (files, size, seconds) in sorted(per_worker.items()):
+        rate = size / 1e6 / seconds if seconds else 0.0
+        print(f"  Worker {worker}: {files} files, {size / 1e6:.1f} MB in {seconds:.1f} s busy ({rate:.1f} MB/s)")
+    total = sum(result['bytes'] for result in results)
+    if wall_seconds:
+        print(f"  Overall: {len(results)} files, {total / 1e6:.1f} MB in {wall_seconds:.1f} s ({total / 1e6 / wall_seconds:.1f} MB/s)")
+
+
+def main(argv=None):
+    """Main function to clean the new or changed SRT files across a process pool."""
+    parser = argparse.ArgumentParser(description="Strip timecodes and sequence numbers from .srt files.")
+    parser.add_argument('--source', default=SRT_DIRECTORY, help="directory of .srt files (default: %(default)s)")
+    parser.add_argument('--output', default=OUTPUT_DIRECTORY, help="directory for the cleaned files (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="cleaning processes (default: %(default)s)")
+    parser.add_argument('--force', action='store_true', help="clean every file, ignoring the manifest")
+    args = parser.parse_args(argv)
+
     # Create the output directory
-    os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
-    print(f"Output directory created: '{OUTPUT_DIRECTORY}'")
+    os.makedirs(args.output, exist_ok=True)
+    print(f"Output directory created: '{args.output}'")
 
-    if not os.path.exists(SRT_DIRECTORY):
-        print(f"\nError: Source directory '{SRT_DIRECTORY}' not found.")
+    if not os.path.exists(args.source):
+        print(f"\nError: Source directory '{args.source}' not found.")
         print("Please ensure your downloaded .srt files are in this directory, or update the SRT_DIRECTORY variable.")
         return
 
-    # List all files in the source directory
-    all_files = os.listdir(SRT_DIRECTORY)
-    
-    srt_files = [f for f in all_files if f.lower().endswith('.srt')]
-    
+    srt_files = sorted(f for f in os.listdir(args.source) if f.lower().endswith('.srt'))
     if not srt_files:
-        print(f"\nNo .srt files found in '{SRT_DIRECTORY}'.")
+        print(f"\nNo .srt files found in '{args.source}'.")
         return
 
-    print(f"\nFound {len(srt_files)} .srt files to process.")
-
-    for srt_filename in srt_files:
-        srt_filepath = os.path.join(SRT_DIRECTORY, srt_filename)
-        
-        # Get the clean dialogue
-        dialogue = clean_srt_file(srt_filepath)
-        
-        # Only write the file if we successfully read and cleaned the content
-        if dialogue:
-            # Define the output file name and path (changing .srt to .txt)
-            base_name = os.path.splitext(srt_filename)[0]
-            output_filename = f"{base_name}_dialogue.txt"
-            output_filepath = os.path.join(OUTPUT_DIRECTORY, output_filename)
-            
-            # Write the clean dialogue to the new text file
-            try:
-                # Use UTF-8 for the output file to ensure it's easily readable everywhere
-                with open(output_filepath, 'w', encoding='utf-8') as outfile:
-                    outfile.write(dialogue)
-                print(f"  -> Saved to: {output_filename}")
-            except IOError as e:
-                print(f"  -> ERROR writing file {output_filename}: {e}")
+    manifest_path = os.path.join(args.output, MANIFEST_FILE)
+    manifest = {} if args.force else load_manifest(manifest_path)
+    # Forget sources that are gone (their cleaned files are kept)
+    manifest = {name: entry for name, entry in manifest.items() if name in srt_files}
+
+    tasks = [
+        (name, args.source, args.output, manifest.get(name, {}).get('sha256'))
+        for name in srt_files
+        if not _is_up_to_date(manifest.get(name), os.path.join(args.source, name), args.output)
+    ]
+    print(f"\nFound {len(srt_files)} .srt files, {len(srt_files) - len(tasks)} already cleaned.")
+    if not tasks:
+        save_manifest(manifest_path, manifest)
+        print("\nProcessing complete.")
+        return
 
+    workers = max(1, min(args.workers, len(tasks)))
+    print(f"Cleaning {len(tasks)} files with {workers} worker(s)...")
+    results = []
+    started = time.perf_counter()
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    try:
+        with context.Pool(workers) as pool:
+            # Small files: hand them out a few at a time
+            chunksize = max(1, min(16, len(tasks) // (workers * 4)))
+            for result in pool.imap_unordered(process_srt_file, tasks, chunksize):
+                results.append(result)
+                name = result['source']
+                if result['status'] == 'saved':
+                    print(f"  -> {name}: decoded with {result['encoding']}, saved to {result['output']}")
+                elif result['status'] == 'failed':
+                    print(f"  -> ERROR processing {name}: {result['error']}. Skipping.")
+                elif result['status'] == 'empty':
+                    print(f"  -> WARNING: {name} has no dialogue. Skipping.")
+                if 'sha256' in result:
+                    if result['status'] == 'unchanged':
+                        result['encoding'] = manifest[name].get('encoding')
+                    manifest[name] = {
+                        key: result.get(key)
+                        for key in ('size', 'mtime_ns', 'sha256', 'output', 'encoding', 'status')
+                    }
+                if len(results) % MANIFEST_SAVE_EVERY == 0:
+                    save_manifest(manifest_path, manifest)
+    finally:
+        save_manifest(manifest_path, manifest)
+
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print(f"\nCleaned: {counts.get('saved', 0)}, unchanged: {counts.get('unchanged', 0)}, "
+          f"empty: {counts.get('empty', 0)}, failed: {counts.get('failed', 0)}")
+    print_worker_report(results, time.perf_counter() - started)
     print("\nProcessing complete.")
 
+
 if __name__ == "__main__":
     main()
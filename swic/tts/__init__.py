@@ -0,0 +1,30 @@
+"""
+Text-to-speech for reading contexts aloud.
+
+Synthesizers share the `Synthesizer` interface (text and language in,
+audio bytes out); `get_synthesizer` picks one by name (see `TTS_ENGINE`
+in config.py). `AudioCache` keeps synthesized audio on disk, addressed
+by (text, lang, engine), within a byte budget, so replaying an example
+is instant; its `prefetch` synthesizes likely next requests in the
+background. `PlaybackWorker` plays requests one at a time on a single
+thread, the latest superseding the rest.
+"""
+
+from .base import SynthesisError, Synthesizer
+from .cache import AudioCache
+from .gtts_engine import GTTSSynthesizer
+from .player import PlaybackWorker
+from .stub import StubSynthesizer
+
+
+SYNTHESIZERS = {
+    'gtts': GTTSSynthesizer,
+    'stub': StubSynthesizer,
+}
+
+
+def get_synthesizer(name: str) -> Synthesizer:
+    try:
+        return SYNTHESIZERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown TTS engine: {name!r}") from None
@@ -0,0 +1,16 @@
+class SynthesisError(Exception):
+    """Raised when a synthesizer cannot produce audio (e.g. no network for gTTS)."""
+
+
+class Synthesizer:
+    """
+    Interface for speech synthesizers. `name` identifies the engine in
+    audio cache keys, so two engines never share cached audio; `extension`
+    is the format of the bytes `synthesize` returns.
+    """
+
+    name = ''
+    extension = 'mp3'
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        raise NotImplementedError
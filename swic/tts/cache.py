@@ -0,0 +1,154 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, Optional
+
+from .base import Synthesizer
+
+
+class AudioCache:
+    """
+    Synthesized audio on disk, one file per (engine, lang, text), named by
+    a hash of the three (<directory>/<2 hex>/<hash>.<ext>). Files are
+    evicted least-recently-used first once they exceed `max_bytes`; use
+    order survives restarts through the files' modification times.
+
+    Concurrent requests for the same audio wait for one synthesis.
+    `prefetch` queues texts for a single background thread, replacing
+    whatever it had not started yet, so only the latest guesses are made.
+    """
+
+    def __init__(self, directory: str, synthesizer: Synthesizer, max_bytes: int):
+        self.directory = directory
+        self.synthesizer = synthesizer
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()  # key -> size, oldest first
+        self._total = 0
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._pending = deque()  # (text, lang) waiting to be prefetched
+        self._wake = threading.Condition(self._lock)
+        self._prefetcher: Optional[threading.Thread] = None
+        self._scan()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._total
+
+    def key(self, text: str, lang: str) -> str:
+        data = '\0'.join((self.synthesizer.name, lang, text)).encode('utf-8')
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{self.synthesizer.extension}")
+
+    def _scan(self) -> None:
+        """Index the files already on disk, oldest first, and drop unfinished writes."""
+        suffix = '.' + self.synthesizer.extension
+        found = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        if name.endswith('.tmp'):
+                            os.remove(path)
+                        elif name.endswith(suffix):
+                            st = os.stat(path)
+                            found.append((st.st_mtime, name[:-len(suffix)], st.st_size))
+                    except OSError:
+                        pass
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    def contains(self, text: str, lang: str) -> bool:
+        with self._lock:
+            return self.key(text, lang) in self._entries
+
+    def get(self, text: str, lang: str) -> str:
+        """Path of the audio for `text`, synthesizing it on a miss. Raises SynthesisError."""
+        key = self.key(text, lang)
+        path = self._path(key)
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    if os.path.exists(path):
+                        self._entries.move_to_end(key)
+                        try:
+                            os.utime(path)
+                        except OSError:
+                            pass
+                        return path
+                    self._total -= self._entries.pop(key)  # Deleted behind our back
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    break
+            event.wait()  # Someone else is synthesizing it; then look again
+
+        try:
+            audio = self.synthesizer.synthesize(text, lang)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp, path)
+            with self._lock:
+                self._entries[key] = len(audio)
+                self._total += len(audio)
+                self._evict()
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+        return path
+
+    def _evict(self) -> None:
+        """Drop the oldest files beyond the budget, keeping the newest one. Holds the lock."""
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in self._entries:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total = 0
+
+    # --- Prefetching ---
+
+    def prefetch(self, texts: Iterable[str], lang: str) -> None:
+        """Synthesize `texts` in the background unless cached; replaces the previous prefetch."""
+        with self._lock:
+            self._pending.clear()
+            self._pending.extend((t, lang) for t in texts if t and self.key(t, lang) not in self._entries)
+            if not self._pending:
+                return
+            if self._prefetcher is None:
+                self._prefetcher = threading.Thread(target=self._prefetch_loop, daemon=True)
+                self._prefetcher.start()
+            self._wake.notify()
+
+    def _prefetch_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wake.wait()
+                text, lang = self._pending.popleft()
+            try:
+                self.get(text, lang)
+            except Exception as e:
+                print(f"TTS prefetch failed: {e}")
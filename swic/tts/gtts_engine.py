@@ -0,0 +1,20 @@
+import io
+
+from .base import SynthesisError, Synthesizer
+
+
+class GTTSSynthesizer(Synthesizer):
+    """Google Translate's TTS through gTTS (needs network). gTTS is imported on first use."""
+
+    name = 'gtts'
+    extension = 'mp3'
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        try:
+            gTTS(text=text, lang=lang).write_to_fp(buffer)
+        except Exception as e:
+            raise SynthesisError(f"gTTS failed: {e}") from e
+        return buffer.getvalue()
@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from .cache import AudioCache
+
+# A sound that reports its end (Kivy's on_stop) wakes the worker when it
+# finishes; otherwise the worker sleeps until the end of its `length` plus
+# this margin. Only sounds of unknown length are checked periodically, every
+# FINISH_CHECK_SECONDS. A new request or stop() wakes the worker at once.
+END_MARGIN_SECONDS = 0.1
+FINISH_CHECK_SECONDS = 0.25
+
+
+class PlaybackWorker:
+    """
+    Plays read-aloud requests on one thread, latest request first. A new
+    request supersedes the one in progress: playback stops at once, and
+    audio still being synthesized is cached but not played. Asking again
+    for the text already being synthesized or played is a no-op, so
+    repeated clicks neither queue up nor restart it.
+
+    `load_sound(path)` returns an object with play(), stop(), unload(), a
+    `state` ('play' while playing), and optionally a `length` in seconds
+    and an `on_stop` event to bind() to, as Kivy's SoundLoader does.
+    """
+
+    def __init__(self, audio_cache: AudioCache, lang: str, load_sound: Callable):
+        self.audio_cache = audio_cache
+        self.lang = lang
+        self.load_sound = load_sound
+        self._wanted: Optional[str] = None  # Latest request not yet started
+        self._generation = 0  # Bumped by every request and stop()
+        self._state = 'idle'  # idle, synthesizing, playing or error
+        self._text = ''  # Text being synthesized or played
+        self._error = ''
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+
+    def request(self, text: str) -> dict:
+        """Read `text` aloud, superseding anything in progress; returns the status."""
+        with self._lock:
+            busy = self._state in ('synthesizing', 'playing')
+            if not (busy and text == self._text and self._wanted is None) and text != self._wanted:
+                self._wanted = text
+                self._generation += 1
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+                self._wake.notify()
+            return self._status()
+
+    def stop(self) -> None:
+        """Stop playback and drop any request not started yet."""
+        with self._lock:
+            self._wanted = None
+            self._generation += 1
+            self._wake.notify()
+
+    def status(self) -> dict:
+        with self._lock:
+            return self._status()
+
+    def _status(self) -> dict:
+        return {
+            'state': self._state,
+            'text': self._text,
+            'pending': self._wanted is not None,
+            'error': self._error,
+        }
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while self._wanted is None:
+                    self._wake.wait()
+                text, self._wanted = self._wanted, None
+                generation = self._generation
+                self._state, self._text, self._error = 'synthesizing', text, ''
+            error = ''
+            try:
+                path = self.audio_cache.get(text, self.lang)
+                if not self._superseded(generation):  # Else the audio stays cached for later
+                    self._play(path, generation)
+            except Exception as e:
+                print(f"TTS error: {e}")
+                error = str(e)
+            with self._lock:
+                if self._wanted is None:
+                    if error and self._generation == generation:
+                        self._state, self._error = 'error', error
+                    else:
+                        self._state, self._text = 'idle', ''
+
+    def _superseded(self, generation: int) -> bool:
+        with self._lock:
+            return self._generation != generation
+
+    def _play(self, path: str, generation: int) -> None:
+        sound = self.load_sound(path)
+        if not sound:
+            raise RuntimeError(f"cannot play {path}")
+        finished = []
+
+        def on_stop(*_):
+            with self._lock:
+                finished.append(True)
+                self._wake.notify()
+
+        bind = getattr(sound, 'bind', None)
+        if bind is not None:
+            bind(on_stop=on_stop)
+        with self._lock:
+            self._state = 'playing'
+        sound.play()
+        try:
+            length = getattr(sound, 'length', 0) or 0
+            deadline = time.monotonic() + length + END_MARGIN_SECONDS if length > 0 else None
+            with self._lock:
+                while self._generation == generation and not finished and sound.state == 'play':
+                    if deadline is None:
+                        timeout = FINISH_CHECK_SECONDS
+                    else:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            break  # Over; some backends only update `state` from their event loop
+                    self._wake.wait(timeout)
+            if sound.state == 'play':
+                sound.stop()
+        finally:
+            if bind is not None:
+                sound.unbind(on_stop=on_stop)
+            sound.unload()
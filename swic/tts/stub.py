@@ -0,0 +1,31 @@
+import io
+import wave
+
+from .base import Synthesizer
+
+
+class StubSynthesizer(Synthesizer):
+    """
+    Offline stand-in: a silent WAV whose length grows with the text, made
+    without any TTS dependency. Counts its calls, so tests can tell cache
+    hits from syntheses.
+    """
+
+    name = 'stub'
+    extension = 'wav'
+    sample_rate = 8000
+    seconds_per_char = 0.05
+
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        self.calls += 1
+        frames = int(self.sample_rate * self.seconds_per_char * max(1, len(text)))
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(1)
+            f.setframerate(self.sample_rate)
+            f.writeframes(b'\x80' * frames)
+        return buffer.getvalue()
@@ -0,0 +1,29 @@
+// Stand-in for Eel's eel.js when the UI is served by server.py. Every
+// `eel.name(...args)()` call becomes POST /api/name and resolves to the
+// function's result, so main.js runs unchanged. Python-to-JS pushes
+// (eel.expose) need Eel's websocket and are ignored; the server answers
+// requests only.
+window.eel = new Proxy(
+  { expose() {} },
+  {
+    get(target, name) {
+      if (name in target) return target[name];
+      return (...args) =>
+        (callback) => {
+          const reply = fetch(`/api/${name}`, {
+            method: "POST",
+            credentials: "same-origin",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ args }),
+          })
+            .then((response) => response.json())
+            .then((data) => {
+              if (data.error) throw new Error(data.error);
+              return data.result;
+            });
+          if (callback) reply.then(callback);
+          return reply;
+        };
+    },
+  }
+);
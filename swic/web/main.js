@@ -1,11 +1,11 @@
-// Clean frontend script with kuromoji-based readings and existing features
+// Clean frontend script with server-side readings and existing features
 
 let currentWord = "";
 let readingsEnabled = false;
-let kuromojiTokenizer = null;
-let kuromojiReady = false;
 let lastBaseHtml = ""; // highlighted HTML without ruby (source of truth)
-let lastBlockText = ""; // raw block text from backend (with <br>), before highlight
+let lastBlockText = ""; // context HTML from the backend (with <br>), matches highlighted
+let lastReadings = null; // per-sentence [surface, reading] tokens from the backend
+let lastSpans = null; // per-sentence [start, end] match offsets from the backend
 
 // Helper: display metadata list below the context
 function displayMetadata(metadata) {
@@ -134,43 +134,6 @@ function katakanaToHiragana(text) {
   );
 }
 
-function initKuromoji() {
-  try {
-    if (!window.kuromoji) return;
-    window.kuromoji
-      .builder({ dicPath: "kuromoji/dict" })
-      .build((err, tokenizer) => {
-        if (err) {
-          console.error("kuromoji build error:", err);
-          return;
-        }
-        kuromojiTokenizer = tokenizer;
-        kuromojiReady = true;
-        console.log("kuromoji ready");
-      });
-  } catch (e) {
-    console.warn("kuromoji init failed:", e);
-  }
-}
-
-function annotateWithRuby(text) {
-  if (!text) return text;
-  if (!kuromojiReady || !kuromojiTokenizer) return text; // do not fake readings
-  const tokens = kuromojiTokenizer.tokenize(text);
-  let out = "";
-  for (const t of tokens) {
-    const surface = t.surface_form || "";
-    const reading = katakanaToHiragana(t.reading || "");
-    if (!surface) continue;
-    if (!reading || !CJK_RE.test(surface)) {
-      out += surface;
-      continue;
-    }
-    out += annotateKanjiOnly(surface, reading);
-  }
-  return out;
-}
-
 function isKanaChar(ch) {
   return /[\u3041-\u3096\u30A1-\u30FA\u30FC]/.test(ch);
 }
@@ -289,46 +252,443 @@ function annotateKanjiOnly(surface, readingHira) {
   return out || surface;
 }
 
-function applyRubyToNode(node) {
-  if (!node) return;
-  if (node.nodeType === Node.ELEMENT_NODE) {
-    const tag = node.tagName && node.tagName.toLowerCase();
-    if (tag === "ruby" || tag === "rt" || tag === "script" || tag === "style")
-      return;
-  }
-  if (node.nodeType === Node.TEXT_NODE) {
-    const parent = node.parentNode;
-    const html = annotateWithRuby(node.nodeValue);
-    if (html !== node.nodeValue) {
-      const span = document.createElement("span");
-      span.innerHTML = html;
-      parent.replaceChild(span, node);
-      return;
-    }
-  }
-  const children = Array.from(node.childNodes);
-  for (const child of children) applyRubyToNode(child);
+function escapeHtml(text) {
+  return text
+    .replace(/&/g, "&amp;")
+    .replace(/</g, "&lt;")
+    .replace(/>/g, "&gt;");
+}
+
+function escapeAttr(text) {
+  return escapeHtml(text).replace(/"/g, "&quot;");
 }
 
-function annotateBlockHtml(blockHtml) {
-  const withNewlines = (blockHtml || "").replace(/<br\s*\/?>/gi, "\n");
-  const plain = withNewlines.replace(/<[^>]+>/g, "");
-  const annotated = annotateWithRuby(plain);
-  return annotated.replace(/\n/g, "<br>");
+// Build ruby HTML from the backend's readings: one token list per context
+// sentence, joined like the plain text (one line per sentence when the
+// source uses <br>). Tokens overlapping a match span are wrapped in
+// <strong>, since ruby cannot be split inside a token.
+function renderReadings(readings, blockText, spans) {
+  const joiner = /<br\s*\/?>/i.test(blockText) ? "<br>" : "";
+  return readings
+    .map((tokens, sentence) => {
+      const matches = (spans && spans[sentence]) || [];
+      let offset = 0;
+      return tokens
+        .map(([surface, reading]) => {
+          const start = offset;
+          offset += surface.length;
+          const html = reading
+            ? annotateKanjiOnly(escapeHtml(surface), reading)
+            : escapeHtml(surface);
+          const hit = matches.some(([s, e]) => s < offset && e > start);
+          return hit ? `<strong>${html}</strong>` : html;
+        })
+        .join("");
+    })
+    .join(joiner);
 }
 
-function renderContext(text) {
+// `text` arrives as HTML with the matches already highlighted.
+function renderContext(text, readings, spans) {
   const contextArea = document.getElementById("contextArea");
   lastBlockText = text || "";
-  lastBaseHtml = highlight(lastBlockText, currentWord);
-  if (readingsEnabled && kuromojiReady) {
-    const annotatedBlock = annotateBlockHtml(lastBlockText);
-    contextArea.innerHTML = highlight(annotatedBlock, currentWord);
+  lastReadings = readings || null;
+  lastSpans = spans || null;
+  lastBaseHtml = lastBlockText;
+  if (readingsEnabled && lastReadings) {
+    contextArea.innerHTML = renderReadings(
+      lastReadings,
+      lastBlockText,
+      lastSpans
+    );
   } else {
     contextArea.innerHTML = lastBaseHtml;
   }
 }
 
+// Status line: "Results for 'word': i/total". While the backend is still
+// counting (state.final === false) the total is a lower bound, shown with
+// a "+", and we poll until it is final.
+let statusPollTimer = null;
+
+function formatStatus(word, state) {
+  const total = state.final === false ? `${state.total}+` : `${state.total}`;
+  return `Results for '${word}': ${state.current + 1}/${total}`;
+}
+
+async function refreshStatus(word, fallbackText) {
+  clearTimeout(statusPollTimer);
+  const status = document.getElementById("status");
+  const state = await eel.get_current_state()();
+  if (
+    state &&
+    typeof state.current === "number" &&
+    typeof state.total === "number" &&
+    state.total > 0
+  ) {
+    // Navigation is local, so the backend cursor may lag behind; only the
+    // count comes from the backend.
+    if (resultPos >= 0) state.current = resultPos;
+    resultTotal = state.total;
+    resultFinal = state.final !== false;
+    status.innerText = formatStatus(word, state);
+    if (state.final === false) {
+      statusPollTimer = setTimeout(() => refreshStatus(word), 300);
+    }
+  } else if (fallbackText !== undefined) {
+    status.innerText = fallbackText;
+  }
+}
+
+// ---- Result pages ----
+// Rendered results are fetched a page at a time (get_results_page) and
+// kept here, so prev/next normally render without a round trip. The page
+// after the current one is prefetched once we are halfway through it.
+const RESULTS_PAGE_SIZE = 20;
+let resultPages = new Map(); // page offset -> Promise of the page reply
+let resultPos = -1; // position of the displayed hit, -1 when none
+let resultTotal = 0;
+let resultFinal = true;
+let resultGeneration = 0; // bumped per search so stale replies are ignored
+
+function resetResults() {
+  resultGeneration++;
+  resultPages = new Map();
+  resultPos = -1;
+  resultTotal = 0;
+  resultFinal = true;
+}
+
+function fetchResultsPage(offset) {
+  if (!resultPages.has(offset)) {
+    const generation = resultGeneration;
+    const page = eel
+      .get_results_page(offset, RESULTS_PAGE_SIZE)()
+      .then((reply) => {
+        // Ignore an older, smaller count that arrives after a newer one.
+        if (
+          reply &&
+          generation === resultGeneration &&
+          (reply.final || reply.total >= resultTotal)
+        ) {
+          resultTotal = reply.total;
+          resultFinal = reply.final;
+        }
+        return reply;
+      });
+    resultPages.set(offset, page);
+  }
+  return resultPages.get(offset);
+}
+
+async function resultAt(pos) {
+  const offset = pos - (pos % RESULTS_PAGE_SIZE);
+  const page = await fetchResultsPage(offset);
+  if (!page || !page.results) return null;
+  if (pos - offset >= RESULTS_PAGE_SIZE / 2) {
+    if (page.results.length === RESULTS_PAGE_SIZE) {
+      fetchResultsPage(offset + RESULTS_PAGE_SIZE);
+    }
+  } else if (offset > 0) {
+    fetchResultsPage(offset - RESULTS_PAGE_SIZE);
+  }
+  return page.results[pos - offset] || null;
+}
+
+// Display hit `pos`; false if there is no such hit.
+async function showResult(pos) {
+  const generation = resultGeneration;
+  const result = await resultAt(pos);
+  if (generation !== resultGeneration) return true; // A newer search took over
+  if (!result) return false;
+  resultPos = pos;
+  renderContext(result.text, result.readings, result.spans);
+  displayMetadata(result.metadata);
+  clearTimeout(statusPollTimer);
+  document.getElementById("status").innerText = formatStatus(currentWord, {
+    current: resultPos,
+    total: resultTotal,
+    final: resultFinal,
+  });
+  if (!resultFinal) {
+    statusPollTimer = setTimeout(() => refreshStatus(currentWord), 300);
+  }
+  return true;
+}
+
+// ---- Federated ("All sources") search ----
+let federatedQueryId = null;
+let federatedPollTimer = null;
+
+function formatFederatedStatus(word, reply) {
+  const parts = reply.sources.map((s) => {
+    const name = s.source.replace(".csv", "");
+    if (s.status === "ok") return `${name}: ${s.count}`;
+    if (s.status === "counting") return `${name}: counting…`;
+    if (s.status === "loading") return `${name}: loading…`;
+    if (s.status === "pending") return `${name}: searching…`;
+    return `${name}: error`;
+  });
+  return `Results for '${word}' — ${parts.join(" · ")}`;
+}
+
+function renderFederated(word, reply) {
+  const contextArea = document.getElementById("contextArea");
+  lastBlockText = ""; // Federated hits are not a context block
+  lastReadings = null;
+  lastSpans = null;
+  contextArea.innerHTML = reply.results
+    .map(
+      (hit) =>
+        `<div class="federated-hit"><span class="federated-source">${hit.source.replace(
+          ".csv",
+          ""
+        )}</span>${hit.text}</div>`
+    )
+    .join("");
+  document.getElementById("status").innerText = formatFederatedStatus(
+    word,
+    reply
+  );
+}
+
+async function pollFederated(word) {
+  const reply = await eel.federated_results()();
+  if (!reply || reply.query_id !== federatedQueryId) return;
+  renderFederated(word, reply);
+  if (!reply.complete) {
+    federatedPollTimer = setTimeout(() => pollFederated(word), 500);
+  }
+}
+
+async function federatedSearch(word) {
+  clearTimeout(federatedPollTimer);
+  document.getElementById("status").innerText = "Searching all sources...";
+  document.getElementById("metadataArea").classList.add("hidden");
+  const reply = await eel.federated_search(word)();
+  if (!reply || !reply.sources) {
+    document.getElementById("status").innerText =
+      "An unknown search error occurred.";
+    return;
+  }
+  if (reply.error) {
+    document.getElementById("contextArea").innerHTML = "";
+    document.getElementById("status").innerText = reply.error;
+    return;
+  }
+  federatedQueryId = reply.query_id;
+  renderFederated(word, reply);
+  if (!reply.complete) {
+    federatedPollTimer = setTimeout(() => pollFederated(word), 500);
+  }
+}
+
+// ---- Facets (author / title / series filters) ----
+// After each search the backend counts its matches per facet value; picking
+// a value restricts the following searches to it and searches again.
+const FACET_LABELS = { author: "Author", title: "Title", series: "Series" };
+
+function facetSelect(dimension, facet) {
+  const options = facet.values.map(
+    (v) =>
+      `<option value="${escapeAttr(v.value)}"${v.value === facet.selected ? " selected" : ""}>${escapeHtml(
+        v.value || "(none)"
+      )} (${v.count})</option>`
+  );
+  if (facet.selected && !facet.values.some((v) => v.value === facet.selected)) {
+    options.unshift(
+      `<option value="${escapeAttr(facet.selected)}" selected>${escapeHtml(facet.selected)} (0)</option>`
+    );
+  }
+  if (facet.distinct > facet.values.length) {
+    options.push(`<option disabled>… ${facet.distinct - facet.values.length} more</option>`);
+  }
+  return (
+    `<label>${FACET_LABELS[dimension] || dimension} ` +
+    `<select data-dimension="${escapeAttr(dimension)}"><option value="">All</option>${options.join("")}</select></label>`
+  );
+}
+
+async function refreshFacets() {
+  const area = document.getElementById("facetArea");
+  const reply = await eel.get_facets()();
+  const dimensions = reply && reply.dimensions ? Object.entries(reply.dimensions) : [];
+  if (!dimensions.length) {
+    area.innerHTML = "";
+    area.classList.add("hidden");
+    return;
+  }
+  area.innerHTML = dimensions.map(([dimension, facet]) => facetSelect(dimension, facet)).join("");
+  area.classList.remove("hidden");
+  area.querySelectorAll("select").forEach((select) =>
+    select.addEventListener("change", async () => {
+      const reply = await eel.set_facet_filter(select.dataset.dimension, select.value)();
+      if (reply.error) {
+        document.getElementById("status").innerText = reply.error;
+        return;
+      }
+      if (currentWord) search();
+    })
+  );
+}
+
+// ---- Concordance (KWIC) view ----
+// One line per hit with the word centred, sorted by the backend by the
+// text after or before it; ⮜ and ⮞ page through the listing.
+const KWIC_PAGE_SIZE = 100;
+const KWIC_ORDER_LABELS = {
+  right: "sorted by right context",
+  left: "sorted by left context",
+  corpus: "in corpus order",
+};
+let kwicWord = null; // Word of the listing shown, null in the context view
+let kwicOrder = "right";
+let kwicOffset = 0;
+let kwicTotal = 0;
+
+function concordanceOrder() {
+  const view = document.getElementById("viewSelect");
+  return view && view.value !== "context" ? view.value : null;
+}
+
+function renderConcordance(lines) {
+  const rows = lines.map(
+    (line) =>
+      `<tr title="${escapeAttr(line.metadata.join(" · "))}">` +
+      `<td class="kwic-left">${escapeHtml(line.left)}</td>` +
+      `<td class="kwic-match"><strong>${escapeHtml(line.match)}</strong></td>` +
+      `<td class="kwic-right">${escapeHtml(line.right)}</td></tr>`
+  );
+  document.getElementById("contextArea").innerHTML = `<table class="kwic">${rows.join("")}</table>`;
+}
+
+async function showConcordance(word, order, offset) {
+  const status = document.getElementById("status");
+  const reply = await eel.concordance(word, order, offset, KWIC_PAGE_SIZE)();
+  lastBlockText = ""; // Concordance lines are not a context block
+  lastReadings = null;
+  lastSpans = null;
+  if (!reply || reply.error) {
+    kwicWord = null;
+    document.getElementById("contextArea").innerHTML = "";
+    status.innerText = reply ? reply.error : "An unknown search error occurred.";
+    return;
+  }
+  kwicWord = word;
+  kwicOrder = order;
+  kwicOffset = reply.offset;
+  kwicTotal = reply.total;
+  renderConcordance(reply.lines);
+  status.innerText = reply.total
+    ? `Concordance for '${word}', ${KWIC_ORDER_LABELS[order]}: ${reply.offset + 1}–${
+        reply.offset + reply.lines.length
+      }/${reply.total}`
+    : `No results found for '${word}'.`;
+}
+
+async function pageConcordance(step) {
+  if (!kwicTotal) return;
+  let offset = kwicOffset + step * KWIC_PAGE_SIZE;
+  if (offset >= kwicTotal) offset = 0; // Loop back to start
+  if (offset < 0) offset = Math.floor((kwicTotal - 1) / KWIC_PAGE_SIZE) * KWIC_PAGE_SIZE;
+  await showConcordance(kwicWord, kwicOrder, offset);
+}
+
+// ---- Source loading progress (pushed by the backend) ----
+function formatBytes(n) {
+  if (n >= 1024 * 1024) return `${(n / (1024 * 1024)).toFixed(1)} MB`;
+  if (n >= 1024) return `${(n / 1024).toFixed(0)} KB`;
+  return `${n} B`;
+}
+
+function sourceLoadProgress(event) {
+  if (!event || !event.stage) return;
+  const status = document.getElementById("status");
+  const name = (event.source || "").replace(".csv", "");
+  switch (event.stage) {
+    case "reading": {
+      const pct = event.total_bytes
+        ? Math.floor((event.bytes_read / event.total_bytes) * 100)
+        : 0;
+      status.innerText = `Loading ${name}: read ${formatBytes(
+        event.bytes_read
+      )} (${pct}%)`;
+      break;
+    }
+    case "parsed":
+      status.innerText = `Loading ${name}: parsed ${event.documents} documents`;
+      break;
+    case "splitting":
+      status.innerText = event.total_documents
+        ? `Loading ${name}: split ${event.documents}/${event.total_documents} documents (${event.sentences} sentences)`
+        : `Loading ${name}: split ${event.documents} documents (${event.sentences} sentences)`;
+      break;
+    case "indexing":
+      status.innerText = `Loading ${name}: building search index (${event.sentences} sentences)`;
+      break;
+    case "loading":
+      status.innerText = event.message || `Loading ${name}...`;
+      break;
+    // The source is searchable by now; its inflection index and word
+    // statistics are built in the background. Their progress goes to the
+    // Inflections tooltip while results are shown.
+    case "lemmatizing":
+    case "counting":
+    case "analyzed": {
+      const message =
+        event.stage === "analyzed"
+          ? event.message
+          : `Preparing inflection search for ${name}: ${event.sentences}/${event.total_sentences} sentences`;
+      const inflections = document.getElementById("inflectionToggle");
+      if (inflections && !inflections.disabled) {
+        inflections.parentElement.title =
+          event.stage === "analyzed" ? INFLECTION_TITLE : message;
+      }
+      if (!currentWord && message) status.innerText = message;
+      break;
+    }
+    case "done":
+    case "error":
+      status.innerText = event.message || "";
+      break;
+  }
+}
+eel.expose(sourceLoadProgress, "source_load_progress");
+
+const INFLECTION_TITLE = "Also match other inflections (食べる finds 食べた, 食べない)";
+
+// Inflection search and readings need the complete kuromoji dictionary;
+// without it the backend says why and both toggles are disabled.
+let morphStatus = { available: true, error: "" };
+
+function applyMorphStatus(status) {
+  if (!status) return;
+  morphStatus = status;
+  const inflections = document.getElementById("inflectionToggle");
+  if (inflections && !status.available) {
+    inflections.checked = false;
+    inflections.disabled = true;
+    inflections.parentElement.title = `Inflection search unavailable: ${status.error}`;
+  }
+  const readingToggle = document.getElementById("readingToggle");
+  if (readingToggle && !status.available) {
+    readingsEnabled = false;
+    readingToggle.checked = false;
+    readingToggle.disabled = true;
+    readingToggle.parentElement.title = `Readings unavailable: ${status.error}`;
+  }
+}
+
+// With "Inflections" checked a plain word becomes a lemma query (~word);
+// anything already using the query syntax is sent as typed.
+function searchQuery(word) {
+  const inflections = document.getElementById("inflectionToggle");
+  if (inflections && inflections.checked && !/[\s"\/~()]/.test(word)) {
+    return `~${word}`;
+  }
+  return word;
+}
+
 async function search() {
   const word = document.getElementById("wordInput").value.trim();
   const size = document.getElementById("contextSelect").value;
@@ -343,12 +703,28 @@ async function search() {
   }
 
   currentWord = word;
+  resetResults();
+  kwicWord = null;
+  clearTimeout(federatedPollTimer);
+  const allSources = document.getElementById("allSourcesToggle");
+  if (allSources && allSources.checked) {
+    await federatedSearch(word);
+    return;
+  }
+  const order = concordanceOrder();
+  if (order) {
+    metadataArea.classList.add("hidden");
+    status.innerText = "Building concordance...";
+    await showConcordance(word, order, 0);
+    refreshFacets();
+    return;
+  }
   status.innerText = "Searching...";
   contextArea.innerHTML = "";
   metadataArea.classList.add("hidden");
 
   await eel.set_context_size(size)();
-  const result = await eel.search_word(word)();
+  const result = await eel.search_word(searchQuery(word))();
 
   if (
     typeof result === "object" &&
@@ -357,21 +733,14 @@ async function search() {
     "count" in result &&
     "metadata" in result
   ) {
-    renderContext(result.text);
+    renderContext(result.text, result.readings, result.spans);
     displayMetadata(result.metadata);
-    const state = await eel.get_current_state()();
-    if (
-      state &&
-      typeof state.current === "number" &&
-      typeof state.total === "number" &&
-      state.total > 0
-    ) {
-      status.innerText = `Results for '${word}': ${state.current + 1}/${
-        state.total
-      }`;
-    } else {
-      status.innerText = result.text;
+    if (result.count > 0) {
+      resultPos = 0;
+      fetchResultsPage(0);
     }
+    refreshFacets();
+    await refreshStatus(word, result.text);
   } else {
     contextArea.innerHTML = "";
     status.innerText = "An unknown search error occurred.";
@@ -380,80 +749,82 @@ async function search() {
 }
 
 async function prev() {
-  const result = await eel.prev_result()();
-  if (
-    typeof result === "object" &&
-    result !== null &&
-    "text" in result &&
-    "metadata" in result
-  ) {
-    renderContext(result.text);
-    displayMetadata(result.metadata);
-    const statePrev = await eel.get_current_state()();
-    if (
-      statePrev &&
-      typeof statePrev.current === "number" &&
-      typeof statePrev.total === "number" &&
-      statePrev.total > 0
-    ) {
-      const status = document.getElementById("status");
-      status.innerText = `Results for '${currentWord}': ${
-        statePrev.current + 1
-      }/${statePrev.total}`;
+  if (kwicWord !== null) return pageConcordance(-1);
+  if (resultPos < 0) return;
+  let pos = resultPos - 1;
+  if (pos < 0) {
+    if (!resultFinal) {
+      // Wrapping to the last hit needs the exact count.
+      resultTotal = await eel.count_results()();
+      resultFinal = true;
     }
+    pos = resultTotal - 1;
   }
+  await showResult(pos);
 }
 
 async function next() {
-  const result = await eel.next_result()();
-  if (
-    typeof result === "object" &&
-    result !== null &&
-    "text" in result &&
-    "metadata" in result
-  ) {
-    renderContext(result.text);
-    displayMetadata(result.metadata);
-    const stateNext = await eel.get_current_state()();
-    if (
-      stateNext &&
-      typeof stateNext.current === "number" &&
-      typeof stateNext.total === "number" &&
-      stateNext.total > 0
-    ) {
-      const status = document.getElementById("status");
-      status.innerText = `Results for '${currentWord}': ${
-        stateNext.current + 1
-      }/${stateNext.total}`;
-    }
-  }
+  if (kwicWord !== null) return pageConcordance(1);
+  if (resultPos < 0) return;
+  let pos = resultPos + 1;
+  if (resultFinal && pos >= resultTotal) pos = 0; // Loop back to start
+  if (!(await showResult(pos))) await showResult(0);
 }
 
-function readAloud() {
-  eel.read_context()();
+// Read aloud: the backend plays one text at a time, a new request replacing
+// the current one. While it is busy the button shows its state; clicking
+// it again for the text being read stops reading.
+let ttsPollTimer = null;
+let ttsBusy = false;
+let readingKey = null; // Search generation and position of the result being read
+
+const TTS_TITLES = {
+  idle: "Read aloud",
+  synthesizing: "Preparing audio…",
+  playing: "Reading aloud (click to stop)",
+};
+
+async function refreshTtsStatus() {
+  clearTimeout(ttsPollTimer);
+  const status = await eel.get_tts_status()();
+  const button = document.getElementById("readAloudButton");
+  ttsBusy = status.state === "synthesizing" || status.state === "playing";
+  if (button) {
+    button.classList.toggle("busy", ttsBusy);
+    button.title =
+      status.state === "error" ? `Read aloud failed: ${status.error}` : TTS_TITLES[status.state];
+  }
+  if (ttsBusy || status.pending) {
+    ttsPollTimer = setTimeout(refreshTtsStatus, 400);
+  }
 }
 
-function highlight(text, word) {
-  if (!word || !text) return text || "";
-  return text.split(word).join(`<strong>${word}</strong>`);
+async function readAloud() {
+  const key = `${resultGeneration}:${resultPos}`;
+  if (ttsBusy && readingKey === key) {
+    await eel.stop_reading()();
+  } else {
+    readingKey = key;
+    await eel.read_context(resultPos >= 0 ? resultPos : null)();
+  }
+  refreshTtsStatus();
 }
 
 window.onload = async function () {
-  // Init kuromoji (non-blocking)
-  initKuromoji();
   initTheme();
 
   const select = document.getElementById("sourceSelect");
   const readingToggle = document.getElementById("readingToggle");
   if (readingToggle) {
-    readingToggle.addEventListener("change", () => {
+    readingToggle.addEventListener("change", async () => {
       readingsEnabled = readingToggle.checked;
-      const area = document.getElementById("contextArea");
-      // Always restore the base HTML, then optionally apply ruby
-      area.innerHTML = lastBaseHtml;
-      if (readingsEnabled && kuromojiReady) {
-        applyRubyToNode(area);
-      }
+      // The backend only sends readings while they are enabled.
+      const readings = await eel.set_readings_enabled(readingsEnabled)();
+      // Cached pages were rendered with the old setting.
+      resultPages = new Map();
+      if (resultPos >= 0) await showResult(resultPos);
+      else if (lastBlockText)
+        renderContext(lastBlockText, readings || lastReadings, lastSpans);
     });
   }
 
@@ -497,14 +868,32 @@ window.onload = async function () {
     select.appendChild(opt);
   }
 
+  // The backend loads the default source after the window opens; show
+  // where it is (progress pushed before the page connected is missed).
+  sourceLoadProgress(await eel.get_load_status()());
+  // Loading the dictionary can take a moment; do not hold up the page.
+  eel.get_morph_status()(applyMorphStatus);
+
+  // Switching between the context and concordance views redoes the search.
+  const view = document.getElementById("viewSelect");
+  if (view) {
+    view.addEventListener("change", () => {
+      if (currentWord) search();
+    });
+  }
+
   // Source change handler
   select.addEventListener("change", async () => {
     const file = select.value;
     const status = document.getElementById("status");
+    clearTimeout(statusPollTimer);
+    resetResults();
+    kwicWord = null;
     status.innerText = "Switching source...";
     const msg = await eel.set_source(file)();
     status.innerText = msg;
     document.getElementById("contextArea").innerHTML = "";
     document.getElementById("metadataArea").classList.add("hidden");
+    document.getElementById("facetArea").classList.add("hidden"); // Filters are per source
   });
 };